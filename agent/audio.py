@@ -1,19 +1,71 @@
+from concurrent.futures import ThreadPoolExecutor
 
-import subprocess
-import os
+from agent.audio_stream import SAMPLE_RATE, load_audio, stream_audio
+from agent.transcript_cache import audio_fingerprint, get_transcript_cache
+from agent.vad import EnergyVAD
+from agent.whisper_pool import get_whisper_pool
 
 class AudioAgent:
     @staticmethod
-    def transcribe(video_path):
-        audio_path = video_path.replace(".mp4", ".wav")
-        # Estrai audio dal video
-        subprocess.call(['ffmpeg', '-i', video_path, '-ar', '16000', '-ac', '1', audio_path, '-y'])
-
-        # Usa Whisper local (via subprocess o libreria)
+    def transcribe(video_path, model_name="base", language="it", chunk_seconds=None, vad=True, cache=True):
         try:
-            import whisper
-            model = whisper.load_model("base")
-            result = model.transcribe(audio_path, language="it")
-            return result['text']
+            segments = AudioAgent.transcribe_segments(video_path, model_name, language, chunk_seconds, vad, cache)
+            return " ".join(text for _, _, text in segments)
         except Exception as e:
             return f"[Errore Whisper] {e}"
+
+    @staticmethod
+    def transcribe_segments(video_path, model_name="base", language="it", chunk_seconds=None, vad=True, cache=True):
+        # Segmenti (inizio, fine, testo) in secondi dall'inizio del video
+        pool = get_whisper_pool(model_name)
+        detector = EnergyVAD(SAMPLE_RATE) if vad else None
+        if chunk_seconds:
+            # Modalità streaming: un blocco alla volta, la memoria non cresce con la durata del video
+            segments = []
+            for offset, audio in stream_audio(video_path, chunk_seconds):
+                segments.extend(AudioAgent._transcribe_audio(audio, offset, pool, language, detector))
+            return segments
+        # Audio decodificato in memoria (16 kHz mono float32), passato a Whisper senza file intermedi
+        audio = load_audio(video_path)
+        fingerprint = audio_fingerprint(audio, SAMPLE_RATE) if cache else b""
+        if fingerprint:
+            # Repost e download doppi dello stesso audio non vengono trascritti di nuovo
+            duration = len(audio) / SAMPLE_RATE
+            segments = get_transcript_cache().get(fingerprint, duration, model_name, language)
+            if segments is not None:
+                return segments
+        segments = AudioAgent._transcribe_audio(audio, 0.0, pool, language, detector)
+        if fingerprint:
+            get_transcript_cache().put(fingerprint, duration, model_name, language, segments)
+        return segments
+
+    @staticmethod
+    def _transcribe_audio(audio, offset, pool, language, detector):
+        # Il VAD scarta silenzio e musica: senza parlato Whisper non viene nemmeno chiamato
+        if detector is not None:
+            chunks = detector.segments(audio)
+        else:
+            chunks = [(0, len(audio))] if len(audio) else []
+        if not chunks:
+            return []
+
+        def run(chunk):
+            start, end = chunk
+            with pool.model() as model:
+                result = model.transcribe(audio[start:end], language=language)
+            # Timestamp del blocco riportati sulla timeline del video
+            shift = offset + start / SAMPLE_RATE
+            segments = [(shift + s['start'], shift + s['end'], s['text'].strip()) for s in result.get('segments', [])]
+            if not segments and result['text'].strip():
+                segments = [(shift, offset + end / SAMPLE_RATE, result['text'].strip())]
+            return segments
+
+        # Blocchi in parallelo su tutti i modelli del pool, ricuciti nell'ordine originale
+        with ThreadPoolExecutor(max_workers=min(pool.size, len(chunks))) as executor:
+            results = list(executor.map(run, chunks))
+        return [segment for segments in results for segment in segments if segment[2]]
+
+    @staticmethod
+    def warm_up(model_name="base", size=None):
+        # Da chiamare all'avvio per non pagare il caricamento sul primo video
+        return get_whisper_pool(model_name, size).warm_up()
@@ -0,0 +1,72 @@
+import subprocess
+import threading
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+# Byte finali di stderr di ffmpeg conservati per il messaggio d'errore
+STDERR_TAIL_BYTES = 64 * 1024
+
+
+def _ffmpeg_command(video_path, sample_rate):
+    # PCM 16 bit mono su stdout: niente file WAV temporanei accanto al video
+    return ['ffmpeg', '-nostdin', '-loglevel', 'error', '-i', video_path,
+            '-vn', '-f', 's16le', '-ac', '1', '-ar', str(sample_rate), '-']
+
+
+def _to_float(pcm):
+    # int16 -> float32 in [-1, 1], il formato che Whisper accetta direttamente
+    return np.frombuffer(pcm, np.int16).astype(np.float32) / 32768.0
+
+
+def load_audio(video_path, sample_rate=SAMPLE_RATE):
+    try:
+        result = subprocess.run(_ffmpeg_command(video_path, sample_rate), capture_output=True, check=True)
+    except FileNotFoundError:
+        raise RuntimeError("ffmpeg non trovato nel PATH")
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"ffmpeg non riesce a leggere l'audio di {video_path}: {e.stderr.decode(errors='replace').strip()}")
+    return _to_float(result.stdout)
+
+
+def _drain(stream, tail):
+    # Legge la pipe fino a EOF tenendo solo gli ultimi STDERR_TAIL_BYTES
+    for chunk in iter(lambda: stream.read(4096), b""):
+        tail += chunk
+        del tail[:-STDERR_TAIL_BYTES]
+
+
+def stream_audio(video_path, chunk_seconds=30, sample_rate=SAMPLE_RATE):
+    # Per i video lunghi: blocchi da chunk_seconds letti man mano dalla pipe, con il secondo di inizio
+    chunk_bytes = int(chunk_seconds * sample_rate) * 2
+    try:
+        proc = subprocess.Popen(_ffmpeg_command(video_path, sample_rate),
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except FileNotFoundError:
+        raise RuntimeError("ffmpeg non trovato nel PATH")
+    # stderr va svuotato in parallelo: con la pipe piena ffmpeg si blocca mentre qui si aspetta stdout
+    stderr_tail = bytearray()
+    stderr_thread = threading.Thread(target=_drain, args=(proc.stderr, stderr_tail), daemon=True)
+    stderr_thread.start()
+    offset = 0
+    try:
+        while True:
+            pcm = proc.stdout.read(chunk_bytes)
+            if not pcm:
+                break
+            # Un byte spaiato può restare solo alla fine dello stream
+            pcm = pcm[:len(pcm) - len(pcm) % 2]
+            yield offset / sample_rate, _to_float(pcm)
+            offset += len(pcm) // 2
+        if proc.wait() != 0:
+            stderr_thread.join()
+            raise RuntimeError(f"ffmpeg non riesce a leggere l'audio di {video_path}: "
+                               f"{stderr_tail.decode(errors='replace').strip()}")
+    finally:
+        # Anche se il consumatore si ferma prima della fine
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        stderr_thread.join()
+        proc.stdout.close()
+        proc.stderr.close()
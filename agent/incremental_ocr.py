@@ -0,0 +1,98 @@
+import cv2
+import numpy as np
+
+
+class _TextGroup:
+    # Regione OCRizzata una sola volta e riusata finché il suo contenuto non cambia
+    def __init__(self, box, reference, crop):
+        self.box = box
+        self.reference = reference
+        self.crop = crop
+        self.text = ""
+
+
+class IncrementalOCR:
+    def __init__(self, detector=None, diff_threshold=0.005, pixel_delta=25, min_iou=0.7):
+        # detector=None: ogni frame intero è un'unica regione
+        self.detector = detector
+        self.diff_threshold = diff_threshold
+        self.pixel_delta = pixel_delta
+        self.min_iou = min_iou
+
+    @staticmethod
+    def _signature(gray, box):
+        x, y, w, h = box
+        crop = gray[y:y + h, x:x + w]
+        # Mezza risoluzione basta per accorgersi di un carattere cambiato
+        return cv2.resize(crop, (max(1, w // 2), max(1, h // 2)), interpolation=cv2.INTER_AREA)
+
+    @staticmethod
+    def _iou(a, b):
+        ax, ay, aw, ah = a
+        bx, by, bw, bh = b
+        iw = min(ax + aw, bx + bw) - max(ax, bx)
+        ih = min(ay + ah, by + bh) - max(ay, by)
+        if iw <= 0 or ih <= 0:
+            return 0.0
+        inter = iw * ih
+        return inter / (aw * ah + bw * bh - inter)
+
+    def _unchanged(self, gray, group):
+        # Frazione di pixel cambiati in modo netto rispetto al frame in cui la regione è stata letta
+        current = self._signature(gray, group.box)
+        changed = cv2.absdiff(current, group.reference) > self.pixel_delta
+        return np.count_nonzero(changed) <= self.diff_threshold * changed.size
+
+    def plan(self, grays):
+        # Per ogni frame, i gruppi di testo visibili; solo i gruppi nuovi richiedono OCR
+        frames_groups = []
+        new_groups = []
+        active = []
+        for gray in grays:
+            if self.detector is not None:
+                boxes = self.detector.detect(gray)
+            else:
+                boxes = [(0, 0, gray.shape[1], gray.shape[0])]
+
+            groups = []
+            for box in boxes:
+                match = None
+                for group in active:
+                    if group not in groups and self._iou(box, group.box) >= self.min_iou and self._unchanged(gray, group):
+                        match = group
+                        break
+                if match is None:
+                    x, y, w, h = box
+                    match = _TextGroup(box, self._signature(gray, box), gray[y:y + h, x:x + w].copy())
+                    new_groups.append(match)
+                groups.append(match)
+            frames_groups.append(groups)
+            active = groups
+        return frames_groups, new_groups
+
+    def run(self, grays, ocr):
+        # ocr: lista di ritagli -> lista di testi (es. OCRWorkerPool.map); restituisce il testo di ogni frame
+        frames_groups, new_groups = self.plan(grays)
+        for group, text in zip(new_groups, ocr([group.crop for group in new_groups])):
+            group.text = text.strip()
+            group.crop = None
+        return [
+            "\n".join(group.text for group in groups if group.text)
+            for groups in frames_groups
+        ]
+
+
+def build_timeline(texts, timestamps, interval=None):
+    # Segmenti (start, end, text) deduplicati: frame consecutivi con lo stesso testo diventano uno solo.
+    # L'ultimo frame resta a schermo per un intervallo di campionamento: se non indicato si ricava
+    # dagli ultimi due timestamp, con un solo frame vale 1 (i timestamp di default sono posizioni)
+    if interval is None:
+        interval = timestamps[-1] - timestamps[-2] if len(timestamps) > 1 else 1
+    segments = []
+    for i, text in enumerate(texts):
+        end = timestamps[i + 1] if i + 1 < len(timestamps) else timestamps[i] + interval
+        if segments and segments[-1][2] == text and segments[-1][1] == timestamps[i]:
+            segments[-1] = (segments[-1][0], end, text)
+        elif text:
+            segments.append((timestamps[i], end, text))
+    return segments
@@ -0,0 +1,104 @@
+import atexit
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+try:
+    # Motore tesseract persistente (libtesseract): nessun processo né file temporaneo per frame
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+# Motore OCR del processo worker, creato una sola volta dall'initializer
+_engine = None
+
+
+def _init_worker(lang):
+    global _engine
+    # Un worker per core: tesseract non deve aprire altri thread OpenMP
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+    if tesserocr is not None:
+        _engine = tesserocr.PyTessBaseAPI(lang=lang)
+
+
+def _ocr_frame(gray, lang):
+    if _engine is not None:
+        height, width = gray.shape
+        _engine.SetImageBytes(gray.tobytes(), width, height, 1, width)
+        return _engine.GetUTF8Text()
+    if pytesseract is None:
+        raise RuntimeError("Né tesserocr né pytesseract installati: pip install pytesseract")
+    return pytesseract.image_to_string(gray, lang=lang)
+
+
+def _ocr_batch(batch, lang):
+    return [_ocr_frame(gray, lang) for gray in batch]
+
+
+class OCRWorkerPool:
+    def __init__(self, workers=None, batch_size=8, lang="eng"):
+        if batch_size < 1:
+            raise ValueError(f"batch_size deve essere >= 1, ricevuto {batch_size}")
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.lang = lang
+        self._executor = None
+
+    def _get_executor(self):
+        # I worker restano vivi tra una chiamata e l'altra (motore caricato una volta sola)
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.lang,)
+            )
+        return self._executor
+
+    def map(self, grays):
+        # Frame in scala di grigi -> testi, nello stesso ordine dei frame
+        if not grays:
+            return []
+        batches = [grays[i:i + self.batch_size] for i in range(0, len(grays), self.batch_size)]
+        executor = self._get_executor()
+        results = executor.map(_ocr_batch, batches, [self.lang] * len(batches))
+        return [text for batch in results for text in batch]
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_shared_pool = None
+
+
+def get_ocr_pool(workers=None, batch_size=8, lang="eng"):
+    # Pool condiviso dal processo; viene ricreato solo se cambia la configurazione
+    global _shared_pool
+    workers = workers or os.cpu_count() or 1
+    pool = _shared_pool
+    if pool is None or (pool.workers, pool.batch_size, pool.lang) != (workers, batch_size, lang):
+        if pool is not None:
+            pool.close()
+        _shared_pool = OCRWorkerPool(workers, batch_size, lang)
+    return _shared_pool
+
+
+def close_ocr_pool():
+    global _shared_pool
+    if _shared_pool is not None:
+        _shared_pool.close()
+        _shared_pool = None
+
+
+atexit.register(close_ocr_pool)
@@ -1,19 +1,30 @@
-
 import cv2
 import os
 
 class ScraperAgent:
     @staticmethod
-    def extract_frames(video_path, every_n_frames=30):
+    def extract_frames(video_path, every_n_frames=30, target_size=None, grayscale=False):
         cap = cv2.VideoCapture(video_path)
         frames = []
+        decoded = None
         count = 0
         while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
             if count % every_n_frames == 0:
+                # Riutilizza lo stesso buffer di decodifica se il frame viene ridotto/convertito
+                reuse = target_size is not None or grayscale
+                ret, frame = cap.read(decoded if reuse else None)
+                if not ret:
+                    break
+                if reuse:
+                    decoded = frame
+                if target_size is not None:
+                    frame = cv2.resize(frame, target_size, interpolation=cv2.INTER_AREA)
+                if grayscale:
+                    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
                 frames.append(frame)
+            # grab() avanza senza convertire il frame: decodifichiamo solo quelli tenuti
+            elif not cap.grab():
+                break
             count += 1
         cap.release()
         return frames
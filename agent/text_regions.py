@@ -0,0 +1,85 @@
+import cv2
+
+# Copia gemella di src/tokintel_v2/agent/text_regions.py: i due alberi girano ciascuno con la propria
+# radice nel sys.path ed entrambi chiamano il package "agent", quindi nessuno dei due può importare
+# l'altro. Le modifiche vanno riportate in entrambi.
+
+
+class TextRegionDetector:
+    def __init__(self, work_width=540, min_area_ratio=0.0005, min_aspect=1.5, min_fill=0.2, padding=6,
+                 max_height_ratio=0.2):
+        self.work_width = work_width
+        self.min_area_ratio = min_area_ratio
+        self.min_aspect = min_aspect
+        self.min_fill = min_fill
+        self.padding = padding
+        self.max_height_ratio = max_height_ratio
+        self._gradient_kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+        self._line_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (9, 1))
+
+    def detect(self, gray):
+        # Restituisce i box (x, y, w, h) in coordinate del frame originale, dall'alto verso il basso
+        height, width = gray.shape[:2]
+        scale = min(1.0, self.work_width / width)
+        small = gray if scale == 1.0 else cv2.resize(gray, (round(width * scale), round(height * scale)),
+                                                     interpolation=cv2.INTER_AREA)
+
+        # Il gradiente morfologico mette in risalto i bordi netti dei caratteri
+        gradient = cv2.morphologyEx(small, cv2.MORPH_GRADIENT, self._gradient_kernel)
+        _, binary = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+        # Chiusura orizzontale: le lettere di una riga diventano un unico blocco
+        connected = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, self._line_kernel)
+        contours, _ = cv2.findContours(connected, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        min_area = self.min_area_ratio * small.shape[0] * small.shape[1]
+        boxes = []
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            if h < 4:
+                continue
+            # Le righe di testo riempiono buona parte del loro box, i bordi degli oggetti no
+            if cv2.countNonZero(binary[y:y + h, x:x + w]) < self.min_fill * w * h:
+                continue
+            boxes.append((x, y, w, h))
+
+        regions = []
+        for x, y, w, h in self._merge_lines(boxes):
+            # Forma e dimensione si valutano sulla riga intera, non sulle singole lettere
+            if w * h < min_area or w < self.min_aspect * h:
+                continue
+            # Una riga di testo non occupa un quinto del frame: blocchi così alti sono rumore o texture
+            if h > self.max_height_ratio * small.shape[0]:
+                continue
+            x0 = max(0, int(x / scale) - self.padding)
+            y0 = max(0, int(y / scale) - self.padding)
+            x1 = min(width, int((x + w) / scale) + self.padding)
+            y1 = min(height, int((y + h) / scale) + self.padding)
+            regions.append((x0, y0, x1 - x0, y1 - y0))
+        return regions
+
+    @staticmethod
+    def _merge_lines(boxes):
+        # Unisce box sovrapposti verticalmente e vicini in orizzontale (stessa riga di didascalia),
+        # ripetendo finché un'unione non ne rende possibili altre
+        merged = sorted(boxes, key=lambda box: (box[1], box[0]))
+        changed = True
+        while changed:
+            changed = False
+            result = []
+            for x, y, w, h in merged:
+                for i, (mx, my, mw, mh) in enumerate(result):
+                    overlap = min(y + h, my + mh) - max(y, my)
+                    gap = max(x, mx) - min(x + w, mx + mw)
+                    if overlap > 0.5 * min(h, mh) and gap < 1.5 * max(h, mh):
+                        nx, ny = min(x, mx), min(y, my)
+                        result[i] = (nx, ny, max(x + w, mx + mw) - nx, max(y + h, my + mh) - ny)
+                        changed = True
+                        break
+                else:
+                    result.append((x, y, w, h))
+            merged = result
+        return sorted(merged, key=lambda box: (box[1], box[0]))
+
+    def crop(self, gray):
+        # Ritagli delle regioni di testo; lista vuota se il frame non contiene candidati
+        return [gray[y:y + h, x:x + w] for x, y, w, h in self.detect(gray)]
@@ -0,0 +1,143 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+# Impronta in stile Haitsma-Kalker: per ogni frame, 16 bit dal segno della variazione
+# (tra bande adiacenti e tra frame consecutivi) dell'energia nella banda del parlato
+FRAME = 2048
+HOP = 1024
+BAND_EDGES_HZ = np.geomspace(300, 3000, 18)
+BITS_PER_FRAME = len(BAND_EDGES_HZ) - 2
+# Allineamento tollerato tra due copie dello stesso audio (in frame da HOP campioni)
+MAX_SHIFT = 8
+
+
+def audio_fingerprint(audio, sample_rate=16000):
+    count = 1 + (len(audio) - FRAME) // HOP if len(audio) >= FRAME else 0
+    if count < 2:
+        return b""
+    freqs = np.fft.rfftfreq(FRAME, 1 / sample_rate)
+    bands = np.searchsorted(freqs, BAND_EDGES_HZ)
+    window = np.hanning(FRAME).astype(np.float32)
+    energies = np.empty((count, len(bands) - 1), dtype=np.float64)
+    # A blocchi di frame, per non materializzare tutta la STFT dei video lunghi
+    for first in range(0, count, 512):
+        last = min(count, first + 512)
+        index = np.arange(first, last)[:, None] * HOP + np.arange(FRAME)
+        power = np.square(np.abs(np.fft.rfft(audio[index] * window, axis=1)))
+        energies[first:last] = np.add.reduceat(power, bands, axis=1)[:, :-1]
+    diff = energies[:, :-1] - energies[:, 1:]
+    bits = (diff[1:] - diff[:-1]) > 0
+    return np.packbits(bits, axis=1).tobytes()
+
+
+def _unpack(fingerprint):
+    rows = np.frombuffer(fingerprint, np.uint8).reshape(-1, BITS_PER_FRAME // 8)
+    return np.unpackbits(rows, axis=1).astype(bool)
+
+
+def bit_error_rate(a, b):
+    # Frazione di bit diversi, al miglior allineamento entro MAX_SHIFT frame
+    best = 1.0
+    for shift in range(-MAX_SHIFT, MAX_SHIFT + 1):
+        x = a[shift:] if shift > 0 else a
+        y = b[-shift:] if shift < 0 else b
+        overlap = min(len(x), len(y))
+        if overlap and overlap >= 0.9 * max(len(a), len(b)):
+            best = min(best, float(np.mean(x[:overlap] != y[:overlap])))
+    return best
+
+
+class TranscriptCache:
+    def __init__(self, db_path="cache/transcripts.db", max_entries=20000, max_bit_error_rate=0.2):
+        if max_entries < 1:
+            raise ValueError(f"max_entries deve essere >= 1, ricevuto {max_entries}")
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_bit_error_rate = max_bit_error_rate
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS transcripts (
+            model TEXT NOT NULL,
+            language TEXT NOT NULL,
+            duration REAL NOT NULL,
+            fingerprint BLOB NOT NULL,
+            segments TEXT NOT NULL,
+            last_used REAL NOT NULL
+        )''')
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_transcripts_lookup ON transcripts (model, language, duration)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_transcripts_last_used ON transcripts (last_used)")
+        self._conn.commit()
+
+    def get(self, fingerprint, duration, model, language):
+        # Stesso modello e lingua, durata simile, impronta quasi identica (re-encoding, repost)
+        bits = _unpack(fingerprint)
+        tolerance = max(1.0, 0.02 * duration)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT rowid, fingerprint, segments FROM transcripts "
+                "WHERE model = ? AND language = ? AND duration BETWEEN ? AND ?",
+                (model, language, duration - tolerance, duration + tolerance)
+            ).fetchall()
+            best = None
+            for rowid, candidate, segments in rows:
+                error = bit_error_rate(bits, _unpack(candidate))
+                if error <= self.max_bit_error_rate and (best is None or error < best[0]):
+                    best = (error, rowid, segments)
+            if best is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE transcripts SET last_used = ? WHERE rowid = ?", (time.time(), best[1]))
+            self._conn.commit()
+            self.hits += 1
+        return [tuple(segment) for segment in json.loads(best[2])]
+
+    def put(self, fingerprint, duration, model, language, segments):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO transcripts (model, language, duration, fingerprint, segments, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (model, language, duration, fingerprint, json.dumps(segments), time.time())
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM transcripts").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM transcripts WHERE rowid IN "
+                    "(SELECT rowid FROM transcripts ORDER BY last_used ASC LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM transcripts").fetchone()[0]
+            return {"entries": entries, "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_transcript_cache(db_path="cache/transcripts.db"):
+    # Cache condivisa dal processo; viene riaperta solo se cambia il file
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None or _shared_cache.db_path != db_path:
+            if _shared_cache is not None:
+                _shared_cache.close()
+            _shared_cache = TranscriptCache(db_path)
+        return _shared_cache
@@ -0,0 +1,97 @@
+import numpy as np
+
+
+def _runs(mask):
+    # Intervalli [inizio, fine) dei tratti True di una maschera booleana
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+
+class EnergyVAD:
+    def __init__(self, sample_rate=16000, frame_ms=30, threshold_db=-45, noise_margin_db=10, max_threshold_db=-35,
+                 min_speech_ms=250, min_silence_ms=400, padding_ms=200, max_chunk_seconds=30,
+                 music_filter=True, min_low_energy_ratio=0.1, min_spectral_flux=0.05, evidence_ms=1000):
+        self.sample_rate = sample_rate
+        self.frame = int(sample_rate * frame_ms / 1000)
+        self.threshold_db = threshold_db
+        self.noise_margin_db = noise_margin_db
+        self.max_threshold_db = max_threshold_db
+        self.min_speech = max(1, int(min_speech_ms / frame_ms))
+        self.min_silence = max(1, int(min_silence_ms / frame_ms))
+        self.padding = int(sample_rate * padding_ms / 1000)
+        self.max_chunk = max(2, int(max_chunk_seconds * 1000 / frame_ms))
+        self.music_filter = music_filter
+        self.min_low_energy_ratio = min_low_energy_ratio
+        self.min_spectral_flux = min_spectral_flux
+        self.evidence_frames = max(2, int(evidence_ms / frame_ms))
+        self._window = np.hanning(self.frame)
+
+    def frame_energy(self, audio):
+        # Energia RMS in dBFS per frame (l'ultimo frame incompleto viene ignorato)
+        count = len(audio) // self.frame
+        frames = audio[:count * self.frame].reshape(count, self.frame)
+        rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+        return 20 * np.log10(rms + 1e-10)
+
+    def segments(self, audio):
+        # Tratti con voce come (campione iniziale, campione finale), al massimo max_chunk_seconds ciascuno
+        db = self.frame_energy(audio)
+        if not len(db):
+            return []
+        # Soglia adattiva: sopra il rumore di fondo del video, mai sotto la soglia assoluta.
+        # Il tetto evita che una base musicale sempre presente venga presa per rumore di fondo
+        # e nasconda la voce che ci parla sopra
+        noise_floor = np.percentile(db, 10) + self.noise_margin_db
+        threshold = max(self.threshold_db, min(noise_floor, self.max_threshold_db))
+        active = db > threshold
+        if self.music_filter:
+            # Il suono senza indizi di parlato (musica, toni) viene scartato prima di cercare le frasi
+            active &= self.speech_evidence(audio, db)
+
+        # Le pause brevi restano dentro la frase, i picchi isolati vengono scartati
+        for start, end in _runs(~active):
+            if start > 0 and end < len(active) and end - start < self.min_silence:
+                active[start:end] = True
+        result = []
+        for start, end in _runs(active):
+            if end - start < self.min_speech:
+                continue
+            for chunk_start, chunk_end in self._split(db, start, end):
+                # Margine solo ai bordi del tratto: i tagli interni non si sovrappongono
+                pad_start = self.padding if chunk_start == start else 0
+                pad_end = self.padding if chunk_end == end else 0
+                result.append((max(0, chunk_start * self.frame - pad_start),
+                               min(len(audio), chunk_end * self.frame + pad_end)))
+        return result
+
+    def speech_evidence(self, audio, db):
+        # Per blocchi di circa un secondo: c'è parlato se l'energia ha le pause tra le sillabe
+        # (molti frame sotto metà della media) oppure se lo spettro cambia forma da un frame
+        # all'altro (flusso spettrale). Una base musicale o un tono tenuto non hanno né l'una
+        # né l'altro; una voce sopra la base musicale ha almeno il secondo
+        rms = np.power(10, db / 20)
+        evidence = np.zeros(len(db), dtype=bool)
+        for start in range(0, len(db), self.evidence_frames):
+            end = min(len(db), start + self.evidence_frames)
+            block = rms[start:end]
+            if np.mean(block < 0.5 * block.mean()) >= self.min_low_energy_ratio:
+                evidence[start:end] = True
+                continue
+            if end - start < 2:
+                continue
+            frames = audio[start * self.frame:end * self.frame].reshape(end - start, self.frame)
+            power = np.square(np.abs(np.fft.rfft(frames * self._window, axis=1)))
+            # Spettri normalizzati (radice della potenza relativa): conta la forma, non il volume
+            shape = np.sqrt(power / (power.sum(axis=1, keepdims=True) + 1e-12))
+            flux = np.sqrt(np.sum(np.square(np.diff(shape, axis=0)), axis=1))
+            evidence[start:end] = np.median(flux) >= self.min_spectral_flux
+        return evidence
+
+    def _split(self, db, start, end):
+        # I tratti troppo lunghi vengono tagliati nel frame più silenzioso della seconda metà del blocco
+        while end - start > self.max_chunk:
+            lo = start + self.max_chunk // 2
+            cut = lo + int(np.argmin(db[lo:start + self.max_chunk]))
+            yield start, cut
+            start = cut
+        yield start, end
@@ -1,14 +1,46 @@
-
-import pytesseract
 import cv2
 
+from agent.incremental_ocr import IncrementalOCR, build_timeline
+from agent.ocr_pool import get_ocr_pool
+from agent.text_regions import TextRegionDetector
+
+_detector = TextRegionDetector()
+
 class VisionAgent:
     @staticmethod
-    def extract_text(frames):
-        texts = []
-        for idx, frame in enumerate(frames):
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            text = pytesseract.image_to_string(gray)
-            if text.strip():
-                texts.append(text.strip())
-        return "\n".join(texts)
+    def extract_text(frames, workers=None, batch_size=8, lang="eng", detect_regions=True, incremental=True):
+        if incremental:
+            # Una riga per segmento: le didascalie che restano a schermo non vengono ripetute
+            segments = VisionAgent.extract_timeline(frames, None, workers, batch_size, lang, detect_regions)
+            return "\n".join(text for _, _, text in segments)
+
+        # I frame possono arrivare già in scala di grigi dallo ScraperAgent
+        grays = [frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) for frame in frames]
+
+        # Solo le regioni candidate vanno all'OCR; i frame senza testo vengono saltati del tutto
+        if detect_regions:
+            crops = [_detector.crop(gray) for gray in grays]
+        else:
+            crops = [[gray] for gray in grays]
+
+        # OCR in parallelo su un pool persistente (un motore tesseract per core), testi in ordine
+        texts = iter(get_ocr_pool(workers, batch_size, lang).map([crop for regions in crops for crop in regions]))
+        lines = []
+        for regions in crops:
+            text = "\n".join(t.strip() for t in (next(texts) for _ in regions) if t.strip())
+            if text:
+                lines.append(text)
+        return "\n".join(lines)
+
+    @staticmethod
+    def extract_timeline(frames, timestamps=None, workers=None, batch_size=8, lang="eng", detect_regions=True,
+                         diff_threshold=0.005, interval=None):
+        # Senza timestamp i segmenti usano la posizione del frame campionato
+        if timestamps is None:
+            timestamps = list(range(len(frames)))
+        grays = [frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) for frame in frames]
+
+        # L'OCR riparte solo per le regioni il cui contenuto è cambiato rispetto a quando sono state lette
+        tracker = IncrementalOCR(_detector if detect_regions else None, diff_threshold)
+        texts = tracker.run(grays, get_ocr_pool(workers, batch_size, lang).map)
+        return build_timeline(texts, timestamps, interval)
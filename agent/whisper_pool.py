@@ -0,0 +1,113 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+
+class WhisperModelPool:
+    def __init__(self, model_name="base", size=1, device=None):
+        if size < 1:
+            raise ValueError(f"size deve essere >= 1, ricevuto {size}")
+        self.model_name = model_name
+        self.size = size
+        self.device = device
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._loaded = 0
+        self._model_bytes = 0
+        self.load_seconds = 0.0
+        self.transcriptions = 0
+
+    def _load(self):
+        import whisper
+        start = time.perf_counter()
+        model = whisper.load_model(self.model_name, device=self.device)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.load_seconds += elapsed
+            self._model_bytes = sum(p.numel() * p.element_size() for p in model.parameters())
+        return model
+
+    def acquire(self, timeout=None):
+        # Prima un modello libero, poi uno nuovo se il pool non è pieno, altrimenti si attende
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = self._loaded < self.size
+            if create:
+                self._loaded += 1
+        if create:
+            try:
+                return self._load()
+            except Exception:
+                with self._lock:
+                    self._loaded -= 1
+                raise
+        return self._idle.get(timeout=timeout)
+
+    def release(self, model):
+        with self._lock:
+            self.transcriptions += 1
+        self._idle.put(model)
+
+    @contextmanager
+    def model(self, timeout=None):
+        # Uso esclusivo: lo stesso modello Whisper non va usato da due thread insieme
+        model = self.acquire(timeout)
+        try:
+            yield model
+        finally:
+            self.release(model)
+
+    def warm_up(self, count=None):
+        # Carica subito i modelli (es. all'avvio) e li fa girare su un secondo di silenzio
+        count = min(count or self.size, self.size)
+        models = []
+        try:
+            for _ in range(count):
+                models.append(self.acquire())
+            for model in models:
+                model.transcribe(np.zeros(16000, dtype=np.float32), fp16=False)
+        finally:
+            for model in models:
+                self._idle.put(model)
+        return self.stats()
+
+    def stats(self):
+        with self._lock:
+            loaded = self._loaded
+            idle = self._idle.qsize()
+            return {
+                "model": self.model_name,
+                "size": self.size,
+                "loaded": loaded,
+                "idle": idle,
+                "in_use": loaded - idle,
+                "load_seconds": round(self.load_seconds, 3),
+                "transcriptions": self.transcriptions,
+                "memory_bytes": self._model_bytes * loaded
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_whisper_pool(model_name="base", size=None, device=None):
+    # Un pool per modello in tutto il processo; la dimensione si fissa alla prima richiesta
+    with _pools_lock:
+        pool = _pools.get(model_name)
+        if pool is None:
+            size = size or int(os.environ.get("TOKINTEL_WHISPER_POOL_SIZE", "1"))
+            pool = _pools[model_name] = WhisperModelPool(model_name, size, device)
+        return pool
+
+
+def whisper_stats():
+    with _pools_lock:
+        return [pool.stats() for pool in _pools.values()]
@@ -41,5 +41,9 @@ if __name__ == "__main__":
     config = load_config(args.config)
     videos = [f for f in os.listdir(args.input) if f.endswith(".mp4")]
 
+    # Modello Whisper caricato una volta prima del primo video
+    if videos:
+        AudioAgent.warm_up()
+
     for video in videos:
         process_video(os.path.join(args.input, video), config)
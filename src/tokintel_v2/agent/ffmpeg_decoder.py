@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+TokIntel v2 - FFmpeg Frame Reader
+Streams sampled frames from an ``ffmpeg -f rawvideo`` pipe straight into NumPy arrays
+"""
+
+from typing import Dict, List, Any, Optional, Tuple, Iterator
+from functools import lru_cache
+import json
+import re
+import shutil
+import subprocess
+import threading
+import numpy as np
+from core.exceptions import VideoProcessingError
+from core.video_probe import probe_cache
+from agent.frame_pool import FrameBufferPool
+
+# Bytes of ffmpeg's stderr kept for error messages
+STDERR_TAIL_BYTES = 64 * 1024
+
+@lru_cache(maxsize=None)
+def _passthrough_args(ffmpeg_path: str) -> Tuple[str, ...]:
+    """Options that keep every selected frame exactly once (no duplication or dropping)
+
+    ``-fps_mode`` replaced the deprecated ``-vsync`` in ffmpeg 5.1; older builds only know ``-vsync``.
+    """
+    try:
+        banner = subprocess.run([ffmpeg_path, "-version"], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        banner = ""
+    match = re.search(r"version n?(\d+)\.(\d+)", banner)
+    if match and (int(match.group(1)), int(match.group(2))) < (5, 1):
+        return ("-vsync", "passthrough")
+    return ("-fps_mode", "passthrough")
+
+class FFmpegFrameReader:
+    """Decoder backend that lets ffmpeg do frame selection, scaling and gray conversion.
+
+    Frame selection (``select``), scaling (``scale``) and the pixel format
+    conversion all run inside ffmpeg's multithreaded native code; Python only
+    copies finished frames off the pipe.
+    """
+
+    def __init__(self, ffmpeg_path: str = "ffmpeg", ffprobe_path: str = "ffprobe", threads: int = 0):
+        """Initialize reader; ``threads=0`` lets ffmpeg pick its decoder thread count"""
+        self.ffmpeg_path = ffmpeg_path
+        self.ffprobe_path = ffprobe_path
+        self.threads = threads
+
+    def is_available(self) -> bool:
+        """Check that both ffmpeg and ffprobe are on PATH"""
+        return shutil.which(self.ffmpeg_path) is not None and shutil.which(self.ffprobe_path) is not None
+
+    def probe(self, video_path: str) -> Dict[str, Any]:
+        """Read width, height (after rotation), fps and frame count with ffprobe (cached)"""
+        return probe_cache.get_or_probe(video_path, self._run_ffprobe, namespace="ffprobe")
+    
+    def _run_ffprobe(self, video_path: str) -> Dict[str, Any]:
+        """Run ffprobe on the first video stream"""
+        cmd = [
+            self.ffprobe_path, "-v", "error", "-select_streams", "v:0",
+            "-show_entries", "stream=width,height,avg_frame_rate,nb_frames,codec_name:stream_tags=rotate:stream_side_data=rotation",
+            "-of", "json", video_path
+        ]
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            streams = json.loads(result.stdout).get("streams", [])
+        except (OSError, subprocess.CalledProcessError, ValueError) as e:
+            raise VideoProcessingError(f"ffprobe failed for {video_path}: {e}")
+        if not streams:
+            raise VideoProcessingError(f"No video stream found in: {video_path}")
+
+        stream = streams[0]
+        width, height = int(stream["width"]), int(stream["height"])
+        rotation = int(stream.get("tags", {}).get("rotate", 0) or 0)
+        for side_data in stream.get("side_data_list", []):
+            rotation = int(side_data.get("rotation", rotation) or 0)
+        # ffmpeg auto-rotates on decode, so portrait clips stored sideways swap dimensions
+        if abs(rotation) % 180 == 90:
+            width, height = height, width
+
+        numerator, _, denominator = stream.get("avg_frame_rate", "0/1").partition("/")
+        fps = float(numerator) / float(denominator or 1) if float(denominator or 1) else 0.0
+        frame_count = int(stream.get("nb_frames") or 0)
+
+        return {
+            "fps": fps,
+            "frame_count": frame_count,
+            "width": width,
+            "height": height,
+            "duration": frame_count / fps if fps > 0 else 0,
+            "codec": stream.get("codec_name", "")
+        }
+
+    def build_command(self, video_path: str, every_n_frames: int, target_size: Optional[Tuple[int, int]],
+                      gray: bool, start_time: float = 0.0, max_frames: Optional[int] = None) -> List[str]:
+        """ffmpeg command line that writes the selected frames as raw video to stdout"""
+        filters = []
+        if every_n_frames > 1:
+            filters.append(f"select=not(mod(n\\,{every_n_frames}))")
+        if target_size is not None:
+            filters.append(f"scale={target_size[0]}:{target_size[1]}:flags=area")
+
+        cmd = [self.ffmpeg_path, "-v", "error", "-nostdin", "-threads", str(self.threads)]
+        if start_time > 0:
+            # Input seeking jumps to the nearest keyframe and decodes only from there
+            cmd += ["-ss", f"{start_time:.6f}"]
+        cmd += ["-i", video_path, "-map", "0:v:0"]
+        if filters:
+            cmd += ["-vf", ",".join(filters)]
+        if max_frames is not None:
+            cmd += ["-frames:v", str(max_frames)]
+        # Passthrough timestamps so dropped frames are not duplicated back in
+        cmd += [*_passthrough_args(self.ffmpeg_path), "-f", "rawvideo", "-pix_fmt", "gray" if gray else "bgr24", "-"]
+        return cmd
+
+    def iter_frames(self, video_path: str, every_n_frames: int, target_size: Optional[Tuple[int, int]] = None,
+                    gray: bool = False, pool: Optional[FrameBufferPool] = None, start_frame: int = 0,
+                    end_frame: Optional[int] = None) -> Iterator[Tuple[int, float, np.ndarray]]:
+        """Yield (frame_index, timestamp, frame) for every ``every_n_frames``-th frame
+
+        Only frames in [``start_frame``, ``end_frame``) are decoded. When a pool
+        is given, frames are read into pool buffers that the caller must release
+        once it is done with them.
+        """
+        if every_n_frames < 1:
+            raise VideoProcessingError(f"every_n_frames must be >= 1, got {every_n_frames}")
+        if end_frame is not None and end_frame <= start_frame:
+            return
+
+        info = self.probe(video_path)
+        width, height = target_size if target_size is not None else (info["width"], info["height"])
+        shape = (height, width) if gray else (height, width, 3)
+        if pool is not None:
+            pool.ensure_shape(shape)
+
+        fps = info["fps"]
+        if start_frame > 0 and fps <= 0:
+            raise VideoProcessingError(f"Cannot seek in video without a frame rate: {video_path}")
+        max_frames = None
+        if end_frame is not None:
+            max_frames = -(-(end_frame - start_frame) // every_n_frames)
+        command = self.build_command(video_path, every_n_frames, target_size, gray,
+                                     start_frame / fps if start_frame > 0 else 0.0, max_frames)
+        try:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except OSError as e:
+            raise VideoProcessingError(f"Cannot start ffmpeg: {e}")
+        # Drained concurrently: a full stderr pipe would block ffmpeg while we wait on stdout
+        stderr_tail = bytearray()
+        stderr_thread = threading.Thread(target=self._drain, args=(process.stderr, stderr_tail), daemon=True)
+        stderr_thread.start()
+
+        count = 0
+        finished = False
+        try:
+            while True:
+                frame = pool.acquire() if pool is not None else np.empty(shape, dtype=np.uint8)
+                if not self._read_exact(process.stdout, memoryview(frame).cast("B")):
+                    if pool is not None:
+                        pool.release(frame)
+                    finished = True
+                    break
+                index = start_frame + count * every_n_frames
+                count += 1
+                yield index, (index / fps if fps > 0 else 0), frame
+        finally:
+            process.stdout.close()
+            # The consumer stopped early (or failed): ffmpeg is not needed any more
+            if not finished and process.poll() is None:
+                process.kill()
+            returncode = process.wait()
+            stderr_thread.join()
+            process.stderr.close()
+
+        # A decode error after some frames must not pass for a shorter video
+        if returncode != 0:
+            stderr = stderr_tail.decode("utf-8", errors="replace").strip()
+            raise VideoProcessingError(f"ffmpeg failed for {video_path} after {count} frames: {stderr or returncode}")
+
+    @staticmethod
+    def _drain(stream: Any, tail: bytearray):
+        """Read a pipe to EOF, keeping only its last STDERR_TAIL_BYTES"""
+        for chunk in iter(lambda: stream.read(4096), b""):
+            tail += chunk
+            del tail[:-STDERR_TAIL_BYTES]
+
+    @staticmethod
+    def _read_exact(stream: Any, view: memoryview) -> bool:
+        """Fill ``view`` from the pipe; False on a clean or truncated end of stream"""
+        filled = 0
+        while filled < len(view):
+            read = stream.readinto(view[filled:])
+            if not read:
+                return False
+            filled += read
+        return True
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+TokIntel v2 - Frame Cache
+On-disk cache of sampled frames, mapped back zero-copy instead of re-decoding the video
+"""
+
+from typing import Dict, List, Any, Optional, Tuple, Iterator
+import hashlib
+import json
+import os
+import threading
+import uuid
+from pathlib import Path
+import numpy as np
+from core.logger import LoggerMixin
+from core.video_probe import probe_cache
+
+# Bump when the on-disk layout changes so old entries are never misread
+CACHE_FORMAT_VERSION = 1
+
+class FrameCacheWriter:
+    """Appends frames of one cache entry to a temporary raw file until committed"""
+
+    def __init__(self, cache: "FrameCache", key: str):
+        """Open a private temporary file for the entry"""
+        self.cache = cache
+        self.key = key
+        suffix = f".{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        self._frames_tmp = cache.frames_path(key).with_name(cache.frames_path(key).name + suffix)
+        self._meta_tmp = cache.meta_path(key).with_name(cache.meta_path(key).name + suffix)
+        self._file = open(self._frames_tmp, "wb")
+        self.shape: Optional[Tuple[int, ...]] = None
+        self.dtype: Optional[str] = None
+        self.indices: List[int] = []
+        self.timestamps: List[float] = []
+
+    def append(self, index: int, timestamp: float, frame: np.ndarray):
+        """Write one frame; all frames of an entry share shape and dtype"""
+        if self.shape is None:
+            self.shape, self.dtype = tuple(frame.shape), frame.dtype.str
+        np.ascontiguousarray(frame).tofile(self._file)
+        self.indices.append(int(index))
+        self.timestamps.append(float(timestamp))
+
+    def commit(self) -> bool:
+        """Publish the entry atomically; False if it is too large or cannot be published"""
+        self._file.close()
+        size = self._frames_tmp.stat().st_size
+        if size > self.cache.max_bytes:
+            self.abort()
+            return False
+
+        meta = {
+            "version": CACHE_FORMAT_VERSION,
+            "count": len(self.indices),
+            "shape": list(self.shape) if self.shape is not None else None,
+            "dtype": self.dtype,
+            "indices": self.indices,
+            "timestamps": self.timestamps
+        }
+        try:
+            with open(self._meta_tmp, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            # Frames first: a visible metadata file always points at complete frames
+            os.replace(self._frames_tmp, self.cache.frames_path(self.key))
+            os.replace(self._meta_tmp, self.cache.meta_path(self.key))
+        except OSError as e:
+            # e.g. Windows refuses to replace a file another reader still has mapped
+            self.cache.log_warning(f"Could not publish frame cache entry {self.key}: {e}")
+            self.abort()
+            return False
+        self.cache._record_write()
+        return True
+
+    def abort(self):
+        """Discard a partial entry (decode failed or consumer stopped early)"""
+        if not self._file.closed:
+            self._file.close()
+        for path in (self._frames_tmp, self._meta_tmp):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                self.cache.log_warning(f"Could not delete temporary frame cache file {path}: {e}")
+
+class FrameCache(LoggerMixin):
+    """Size-capped LRU cache of sampled frames keyed by video content hash and sampling params.
+
+    Each entry is a raw frame array (``<key>.frames``) plus a small JSON
+    sidecar (``<key>.json``) with shape, dtype, frame indices and timestamps.
+    Hits are mapped read-only with ``np.memmap``, so frames are paged in on
+    demand instead of decoded. The sidecar mtime is the LRU clock: hits touch
+    it, and the oldest entries are evicted once ``max_bytes`` is exceeded.
+    """
+
+    def __init__(self, cache_dir: str = "cache/frames", max_bytes: int = 2 * 1024 ** 3):
+        """Initialize cache directory"""
+        super().__init__()
+        if max_bytes < 1:
+            raise ValueError(f"max_bytes must be >= 1, got {max_bytes}")
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    def frames_path(self, key: str) -> Path:
+        """Raw frame array of an entry"""
+        return self.cache_dir / f"{key}.frames"
+
+    def meta_path(self, key: str) -> Path:
+        """JSON sidecar of an entry"""
+        return self.cache_dir / f"{key}.json"
+
+    @staticmethod
+    def content_hash(video_path: str) -> str:
+        """SHA-256 of the video bytes, computed once per (path, size, mtime)"""
+        def hash_file(path: str) -> Dict[str, Any]:
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            return {"sha256": digest.hexdigest()}
+
+        return probe_cache.get_or_probe(video_path, hash_file, namespace="sha256")["sha256"]
+
+    def make_key(self, video_path: str, params: Dict[str, Any]) -> str:
+        """Entry key for a video's content and the sampling parameters that shaped its frames"""
+        payload = json.dumps({"video": self.content_hash(video_path), "params": params,
+                              "version": CACHE_FORMAT_VERSION}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def load(self, key: str) -> Optional[Iterator[Tuple[int, float, np.ndarray]]]:
+        """Map a cached entry as (frame_index, timestamp, frame) views, or None on a miss"""
+        try:
+            with open(self.meta_path(key), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("version") != CACHE_FORMAT_VERSION:
+                raise ValueError(f"unsupported cache format {meta.get('version')}")
+            frames: Any = []
+            if meta["count"]:
+                frames = np.memmap(self.frames_path(key), dtype=np.dtype(meta["dtype"]), mode="r",
+                                   shape=(meta["count"],) + tuple(meta["shape"]))
+        except FileNotFoundError:
+            self._record_lookup(hit=False)
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.log_warning(f"Discarding unreadable frame cache entry {key}: {e}")
+            self._remove(key)
+            self._record_lookup(hit=False)
+            return None
+
+        try:
+            os.utime(self.meta_path(key))
+        except OSError:
+            # A missed LRU touch only makes the entry look older; the frames are still valid
+            pass
+        self._record_lookup(hit=True)
+        return zip(meta["indices"], meta["timestamps"], frames)
+
+    def open_writer(self, key: str) -> FrameCacheWriter:
+        """Start writing a new entry"""
+        return FrameCacheWriter(self, key)
+
+    def evict(self) -> int:
+        """Drop least recently used entries until the cache fits in ``max_bytes``"""
+        entries = []
+        total = 0
+        for meta_path in self.cache_dir.glob("*.json"):
+            key = meta_path.stem
+            try:
+                size = meta_path.stat().st_size + self.frames_path(key).stat().st_size
+                entries.append((meta_path.stat().st_mtime_ns, key, size))
+            except OSError:
+                # Removed by a concurrent writer or evictor, or locked by another process
+                continue
+            total += size
+
+        evicted = 0
+        for _, key, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if not self._remove(key):
+                # Still in use (Windows keeps mapped files locked): retried on the next eviction
+                continue
+            total -= size
+            evicted += 1
+
+        if evicted:
+            with self._lock:
+                self.evictions += evicted
+            self.log_debug(f"Frame cache evicted {evicted} entries ({total} bytes kept)")
+        return evicted
+
+    def _remove(self, key: str) -> bool:
+        """Delete an entry; mapped frames stay readable on POSIX. False if a file could not be deleted"""
+        # Frames first: if they are locked, the sidecar stays so the entry is still found and retried
+        for path in (self.frames_path(key), self.meta_path(key)):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                self.log_warning(f"Could not delete frame cache file {path}: {e}")
+                return False
+        return True
+
+    def _record_lookup(self, hit: bool):
+        """Count a cache lookup"""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _record_write(self):
+        """Count a committed entry and enforce the size cap"""
+        with self._lock:
+            self.writes += 1
+        self.evict()
+
+    def clear(self):
+        """Delete every cached entry"""
+        for meta_path in self.cache_dir.glob("*.json"):
+            self._remove(meta_path.stem)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        entries = list(self.cache_dir.glob("*.json"))
+        size = 0
+        for meta_path in entries:
+            try:
+                size += meta_path.stat().st_size + self.frames_path(meta_path.stem).stat().st_size
+            except OSError:
+                continue
+        with self._lock:
+            return {
+                "entries": len(entries),
+                "bytes": size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evictions": self.evictions
+            }
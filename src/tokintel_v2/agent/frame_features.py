@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+TokIntel v2 - Frame Feature Extractors
+Pluggable per-frame visual features computed during a single decode pass
+"""
+
+from typing import Dict, List, Any, Optional, Tuple
+from abc import ABC, abstractmethod
+import cv2
+import numpy as np
+from agent.scene_detector import SceneChangeDetector
+
+class FrameFeatureExtractor(ABC):
+    """Base class for features fed by ScraperAgent.extract_features.
+
+    ``update`` receives every sampled frame in order. Frames may be recycled
+    buffers, so extractors that keep a frame must copy it. ``result`` is
+    called once after the last frame and its value is stored under ``name``,
+    which must not be one of the keys the scraper adds itself
+    (``frame_count``, ``duration``).
+    """
+
+    name = "feature"
+
+    def reset(self, video_info: Dict[str, Any]):
+        """Prepare for a new video (called before the first frame)"""
+
+    @abstractmethod
+    def update(self, frame: np.ndarray, index: int, timestamp: float):
+        """Consume one sampled frame"""
+
+    @abstractmethod
+    def result(self) -> Any:
+        """Final value for this video"""
+
+    @staticmethod
+    def to_gray(frame: np.ndarray) -> np.ndarray:
+        """Gray view of a BGR or already gray frame"""
+        return frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+class OCRFramesExtractor(FrameFeatureExtractor):
+    """Keeps copies of the sampled frames (and timestamps) for the OCR stage"""
+
+    name = "ocr_frames"
+
+    def __init__(self, every_n_samples: int = 1, gray: bool = False):
+        """Keep one sampled frame out of ``every_n_samples``, optionally as gray"""
+        if every_n_samples < 1:
+            raise ValueError(f"every_n_samples must be >= 1, got {every_n_samples}")
+        self.every_n_samples = every_n_samples
+        self.gray = gray
+
+    def reset(self, video_info: Dict[str, Any]):
+        """Drop frames of the previous video"""
+        self._frames: List[Tuple[np.ndarray, float]] = []
+        self._seen = 0
+
+    def update(self, frame: np.ndarray, index: int, timestamp: float):
+        """Copy every ``every_n_samples``-th frame"""
+        if self._seen % self.every_n_samples == 0:
+            kept = self.to_gray(frame) if self.gray else frame
+            self._frames.append((np.array(kept, copy=True), timestamp))
+        self._seen += 1
+
+    def result(self) -> List[Tuple[np.ndarray, float]]:
+        """(frame, timestamp) tuples, the format of extract_frames_with_timestamps"""
+        return self._frames
+
+class ThumbnailExtractor(FrameFeatureExtractor):
+    """Picks the sampled frame closest to ``at_seconds`` as the library thumbnail"""
+
+    name = "thumbnail"
+
+    def __init__(self, at_seconds: float = 1.0, max_width: int = 320):
+        """Initialize thumbnail position and size"""
+        self.at_seconds = at_seconds
+        self.max_width = max_width
+
+    def reset(self, video_info: Dict[str, Any]):
+        """Forget the previous video's thumbnail"""
+        # Short clips: fall back to the middle of the video
+        duration = video_info.get("duration") or 0
+        self._target = min(self.at_seconds, duration / 2) if duration > 0 else self.at_seconds
+        self._best: Optional[np.ndarray] = None
+        self._best_distance = float("inf")
+
+    def update(self, frame: np.ndarray, index: int, timestamp: float):
+        """Keep a resized copy of the closest frame so far"""
+        distance = abs(timestamp - self._target)
+        if distance >= self._best_distance:
+            return
+        self._best_distance = distance
+        height, width = frame.shape[:2]
+        if width > self.max_width:
+            size = (self.max_width, max(1, round(height * self.max_width / width)))
+            self._best = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        else:
+            self._best = np.array(frame, copy=True)
+
+    def result(self) -> Optional[np.ndarray]:
+        """Thumbnail image (same colour mode as the sampled frames)"""
+        return self._best
+
+class MotionEnergyExtractor(FrameFeatureExtractor):
+    """Mean absolute difference between consecutive sampled frames (0-255 scale)"""
+
+    name = "motion_energy"
+
+    def __init__(self, signature_size: Tuple[int, int] = (64, 112)):
+        """Initialize with the (width, height) frames are compared at"""
+        self.signature_size = signature_size
+
+    def reset(self, video_info: Dict[str, Any]):
+        """Forget the previous video's frames"""
+        self._previous: Optional[np.ndarray] = None
+        self._values: List[float] = []
+
+    def update(self, frame: np.ndarray, index: int, timestamp: float):
+        """Compare with the previous sampled frame on a small gray signature"""
+        small = cv2.resize(self.to_gray(frame), self.signature_size, interpolation=cv2.INTER_AREA).astype(np.int16)
+        if self._previous is not None:
+            self._values.append(float(np.abs(small - self._previous).mean()))
+        self._previous = small
+
+    def result(self) -> Dict[str, Any]:
+        """Mean and peak motion plus the per-sample series"""
+        return {
+            "mean": float(np.mean(self._values)) if self._values else 0.0,
+            "max": max(self._values, default=0.0),
+            "series": self._values
+        }
+
+class CutCountExtractor(FrameFeatureExtractor):
+    """Counts hard cuts as large jumps in the intensity histogram between sampled frames"""
+
+    name = "cut_count"
+
+    def __init__(self, hist_threshold: float = 0.4):
+        """Initialize with the histogram distance that counts as a cut"""
+        self.hist_threshold = hist_threshold
+        self._detector = SceneChangeDetector()
+
+    def reset(self, video_info: Dict[str, Any]):
+        """Restart counting"""
+        self._previous: Optional[np.ndarray] = None
+        self._cuts: List[float] = []
+
+    def update(self, frame: np.ndarray, index: int, timestamp: float):
+        """Record a cut at this timestamp if the histogram changed abruptly"""
+        histogram = self._detector.histogram(self._detector.signature(frame))
+        if self._previous is not None and np.abs(histogram - self._previous).sum() / 2 >= self.hist_threshold:
+            self._cuts.append(timestamp)
+        self._previous = histogram
+
+    def result(self) -> Dict[str, Any]:
+        """Number of cuts and when they happen"""
+        return {"count": len(self._cuts), "timestamps": self._cuts}
+
+class BrightnessExtractor(FrameFeatureExtractor):
+    """Mean luma of the sampled frames"""
+
+    name = "brightness"
+
+    def reset(self, video_info: Dict[str, Any]):
+        """Restart statistics"""
+        self._values: List[float] = []
+
+    def update(self, frame: np.ndarray, index: int, timestamp: float):
+        """Average gray level of the frame"""
+        self._values.append(float(self.to_gray(frame).mean()))
+
+    def result(self) -> Dict[str, Any]:
+        """Mean, min and max brightness (0-255)"""
+        return {
+            "mean": float(np.mean(self._values)) if self._values else 0.0,
+            "min": min(self._values, default=0.0),
+            "max": max(self._values, default=0.0)
+        }
+
+def default_feature_extractors() -> List[FrameFeatureExtractor]:
+    """Extractors for OCR frames, thumbnail, motion energy, cut count and brightness"""
+    return [
+        OCRFramesExtractor(),
+        ThumbnailExtractor(),
+        MotionEnergyExtractor(),
+        CutCountExtractor(),
+        BrightnessExtractor()
+    ]
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+TokIntel v2 - Frame Buffer Pool
+Recycles preallocated NumPy frame buffers so the decode loop stops allocating per frame
+"""
+
+from typing import Dict, List, Any, Optional, Tuple
+import threading
+import numpy as np
+
+class FrameBufferPool:
+    """Thread-safe pool of equally shaped frame buffers"""
+    
+    def __init__(self, shape: Optional[Tuple[int, ...]] = None, dtype: Any = np.uint8, capacity: int = 10):
+        """Initialize pool; buffers are preallocated as soon as the shape is known"""
+        self.shape: Optional[Tuple[int, ...]] = None
+        self.dtype = np.dtype(dtype)
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._free: List[np.ndarray] = []
+        self.allocations = 0
+        self.allocated_bytes = 0
+        self.reuses = 0
+        if shape is not None:
+            self.ensure_shape(shape)
+    
+    def ensure_shape(self, shape: Tuple[int, ...]):
+        """Set the buffer shape, preallocating ``capacity`` buffers if it changed"""
+        shape = tuple(shape)
+        with self._lock:
+            if shape == self.shape:
+                return
+            self.shape = shape
+            self._free = [self._allocate() for _ in range(self.capacity)]
+    
+    def _allocate(self) -> np.ndarray:
+        """Allocate a new buffer and account for it"""
+        buffer = np.empty(self.shape, dtype=self.dtype)
+        self.allocations += 1
+        self.allocated_bytes += buffer.nbytes
+        return buffer
+    
+    def acquire(self) -> np.ndarray:
+        """Take a free buffer, allocating a new one if the pool is exhausted"""
+        if self.shape is None:
+            raise ValueError("FrameBufferPool shape not set. Call ensure_shape() first.")
+        with self._lock:
+            if self._free:
+                self.reuses += 1
+                return self._free.pop()
+            return self._allocate()
+    
+    def release(self, buffer: np.ndarray):
+        """Return a buffer to the pool; foreign or surplus buffers are dropped"""
+        if buffer is None or buffer.shape != self.shape or buffer.dtype != self.dtype:
+            return
+        with self._lock:
+            if len(self._free) < self.capacity:
+                self._free.append(buffer)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get pool statistics"""
+        with self._lock:
+            free = len(self._free)
+        return {
+            "shape": self.shape,
+            "capacity": self.capacity,
+            "free": free,
+            "allocations": self.allocations,
+            "allocated_bytes": self.allocated_bytes,
+            "reuses": self.reuses
+        }
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+TokIntel v2 - OCR Cache
+Cross-video cache of OCR results keyed by a perceptual hash of the text region, persisted in SQLite
+"""
+
+from typing import Dict, List, Any, Optional, Tuple
+from pathlib import Path
+import sqlite3
+import threading
+import time
+import cv2
+import numpy as np
+from core.logger import LoggerMixin
+
+def region_hash(crop: np.ndarray) -> str:
+    """256-bit DCT perceptual hash of a gray text crop, plus a coarse aspect-ratio bucket
+
+    The crop is normalized to 128x32, so re-encoded or slightly rescaled copies
+    of the same overlay hash alike. Keeping 8x32 low-frequency coefficients
+    (more horizontally than a square pHash) keeps different words on the same
+    band apart.
+    """
+    height, width = crop.shape[:2]
+    small = cv2.resize(crop, (128, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    coefficients = cv2.dct(small)[:8, :32].ravel()
+    bits = coefficients > np.median(coefficients[1:])
+    aspect = int(round(np.log2(max(width, 1) / max(height, 1)) * 4))
+    return f"{aspect}:{np.packbits(bits).tobytes().hex()}"
+
+# The 256-bit hash is split into bands of 32 bits: two hashes within
+# HASH_BANDS - 1 bits of each other share at least one identical band
+HASH_BANDS = 8
+
+def _hash_parts(key: str) -> Tuple[int, int, List[int]]:
+    """(aspect bucket, hash as int, band values) of a region hash"""
+    aspect, digest = key.split(":")
+    bands = [int(digest[i * 8:(i + 1) * 8], 16) for i in range(HASH_BANDS)]
+    return int(aspect), int(digest, 16), bands
+
+class OCRCache(LoggerMixin):
+    """SQLite-backed LRU map from (language, region hash) to recognized text.
+
+    A lookup matches the nearest stored hash within ``max_distance`` bits, so
+    a bit flipped by re-encoding still hits; candidates are found through
+    indexed 32-bit bands of the hash. Lookups refresh ``last_used`` in memory;
+    the refreshes are written in one batch once ``touch_batch`` rows are
+    pending, and before evicting, so eviction order stays exact. Once
+    ``max_entries`` is exceeded the least recently used rows are deleted. The
+    row count is kept in memory, so a put does not scan the table. One
+    connection is shared by the OCR executor threads behind a lock.
+    """
+
+    def __init__(self, db_path: str = "cache/ocr_cache.db", max_entries: int = 50000, max_distance: int = 6,
+                 touch_batch: int = 256):
+        """Open (or create) the cache database"""
+        super().__init__()
+        if max_entries < 1:
+            raise ValueError(f"max_entries must be >= 1, got {max_entries}")
+        if touch_batch < 1:
+            raise ValueError(f"touch_batch must be >= 1, got {touch_batch}")
+        if not 0 <= max_distance < HASH_BANDS:
+            raise ValueError(f"max_distance must be in [0, {HASH_BANDS - 1}], got {max_distance}")
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.touch_batch = touch_batch
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        band_columns = "".join(f"b{i} INTEGER NOT NULL, " for i in range(HASH_BANDS))
+        self._conn.execute(f'''CREATE TABLE IF NOT EXISTS ocr_cache (
+            lang TEXT NOT NULL,
+            region_hash TEXT NOT NULL,
+            aspect INTEGER NOT NULL,
+            {band_columns}
+            text TEXT NOT NULL,
+            last_used REAL NOT NULL,
+            PRIMARY KEY (lang, region_hash)
+        )''')
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_ocr_cache_last_used ON ocr_cache (last_used)")
+        for i in range(HASH_BANDS):
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_ocr_cache_b{i} ON ocr_cache (b{i})")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM ocr_cache").fetchone()[0]
+        # (lang, region hash) -> last_used not yet written to the database
+        self._touched: Dict[Tuple[str, str], float] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _flush_touched(self):
+        """Write the pending ``last_used`` refreshes; caller holds the lock and commits"""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE ocr_cache SET last_used = ? WHERE lang = ? AND region_hash = ?",
+                [(used, lang, key) for (lang, key), used in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def get(self, key: str, lang: str) -> Optional[str]:
+        """Cached text for the nearest stored region hash, or None"""
+        aspect, value, bands = _hash_parts(key)
+        band_filter = " OR ".join(f"b{i} = ?" for i in range(HASH_BANDS))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT region_hash, text FROM ocr_cache WHERE lang = ? AND aspect = ? AND ({band_filter})",
+                (lang, aspect, *bands)
+            ).fetchall()
+            best = None
+            for candidate, text in rows:
+                distance = bin(value ^ _hash_parts(candidate)[1]).count("1")
+                if distance <= self.max_distance and (best is None or distance < best[0]):
+                    best = (distance, candidate, text)
+            if best is None:
+                self.misses += 1
+                return None
+            self._touched[(lang, best[1])] = time.time()
+            if len(self._touched) >= self.touch_batch:
+                self._flush_touched()
+                self._conn.commit()
+            self.hits += 1
+            return best[2]
+
+    def put(self, key: str, lang: str, text: str):
+        """Store the text for a region hash and evict least recently used rows"""
+        aspect, _, bands = _hash_parts(key)
+        band_columns = "".join(f"b{i}, " for i in range(HASH_BANDS))
+        with self._lock:
+            exists = self._conn.execute(
+                "SELECT 1 FROM ocr_cache WHERE lang = ? AND region_hash = ?", (lang, key)
+            ).fetchone()
+            self._touched.pop((lang, key), None)
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO ocr_cache (lang, region_hash, aspect, {band_columns}text, last_used) "
+                f"VALUES (?, ?, ?, {'?, ' * HASH_BANDS}?, ?)",
+                (lang, key, aspect, *bands, text, time.time())
+            )
+            if exists is None:
+                self._count += 1
+            if self._count > self.max_entries:
+                self._flush_touched()
+                deleted = self._conn.execute(
+                    "DELETE FROM ocr_cache WHERE rowid IN "
+                    "(SELECT rowid FROM ocr_cache ORDER BY last_used ASC LIMIT ?)",
+                    (self._count - self.max_entries,)
+                ).rowcount
+                self._count -= deleted
+            self._conn.commit()
+
+    def clear(self):
+        """Delete every cached result"""
+        with self._lock:
+            self._touched.clear()
+            self._conn.execute("DELETE FROM ocr_cache")
+            self._conn.commit()
+            self._count = 0
+            self.hits = 0
+            self.misses = 0
+
+    def close(self):
+        """Write pending refreshes and close the database connection"""
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+            self._conn.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            return {
+                "entries": self._count,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses
+            }
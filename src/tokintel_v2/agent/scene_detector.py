@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+TokIntel v2 - Scene Change Detector
+Adaptive frame selection: keeps a frame only when the picture or its captions change
+"""
+
+from typing import Dict, List, Any, Optional, Tuple
+import cv2
+import numpy as np
+
+class SceneChangeDetector:
+    """Compares each candidate frame with the last kept one on a tiny gray signature.
+
+    Two vectorized metrics are computed on the signature:
+      - the largest per-block mean absolute difference, which catches local
+        changes such as a new caption on an otherwise static shot
+      - the L1 distance between 16-bin intensity histograms, which catches cuts
+    A frame is kept when either metric crosses its threshold, or when
+    ``max_gap_frames`` have passed since the last kept frame.
+    """
+
+    def __init__(self, threshold: float = 12.0, hist_threshold: float = 0.25,
+                 max_gap_frames: Optional[int] = None, signature_size: Tuple[int, int] = (64, 112),
+                 grid: Tuple[int, int] = (4, 8)):
+        """Initialize detector; ``signature_size`` is (width, height) and must divide by ``grid`` (cols, rows)"""
+        width, height = signature_size
+        cols, rows = grid
+        if width % cols or height % rows:
+            raise ValueError(f"Signature size {signature_size} is not divisible by grid {grid}")
+        self.threshold = threshold
+        self.hist_threshold = hist_threshold
+        self.max_gap_frames = max_gap_frames
+        self.signature_size = (width, height)
+        self.grid = (cols, rows)
+        self.reset()
+
+    def reset(self):
+        """Forget the last kept frame (call between videos)"""
+        self._last_signature: Optional[np.ndarray] = None
+        self._last_histogram: Optional[np.ndarray] = None
+        self._last_index: Optional[int] = None
+        self.checked = 0
+        self.kept = 0
+
+    def signature(self, frame: np.ndarray) -> np.ndarray:
+        """Downsampled gray signature of a BGR or gray frame"""
+        small = cv2.resize(frame, self.signature_size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small.astype(np.int16)
+
+    @staticmethod
+    def histogram(signature: np.ndarray) -> np.ndarray:
+        """Normalized 16-bin intensity histogram"""
+        counts = np.bincount((signature >> 4).ravel(), minlength=16)
+        return counts / signature.size
+
+    def difference(self, signature: np.ndarray, histogram: np.ndarray) -> Tuple[float, float]:
+        """(max block MAD, histogram distance) against the last kept frame"""
+        width, height = self.signature_size
+        cols, rows = self.grid
+        diff = np.abs(signature - self._last_signature)
+        blocks = diff.reshape(rows, height // rows, cols, width // cols).mean(axis=(1, 3))
+        hist_distance = np.abs(histogram - self._last_histogram).sum() / 2
+        return float(blocks.max()), float(hist_distance)
+
+    def should_keep(self, frame: np.ndarray, index: int) -> bool:
+        """Decide whether a candidate frame differs enough to be kept"""
+        self.checked += 1
+        signature = self.signature(frame)
+        histogram = self.histogram(signature)
+
+        keep = self._last_signature is None
+        if not keep and self.max_gap_frames is not None:
+            keep = index - self._last_index >= self.max_gap_frames
+        if not keep:
+            block_mad, hist_distance = self.difference(signature, histogram)
+            keep = block_mad >= self.threshold or hist_distance >= self.hist_threshold
+
+        if keep:
+            self._last_signature = signature
+            self._last_histogram = histogram
+            self._last_index = index
+            self.kept += 1
+        return keep
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get selection statistics"""
+        return {
+            "checked": self.checked,
+            "kept": self.kept,
+            "skipped": self.checked - self.kept
+        }
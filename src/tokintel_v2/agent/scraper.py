@@ -4,14 +4,29 @@ TokIntel v2 - Scraper Agent
 Extracts frames from video files for analysis
 """
 
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Set, Tuple, Iterator, AsyncIterator
 from functools import wraps
+import concurrent.futures
+import threading
+import tempfile
+import shutil
+import weakref
+import uuid
+import gc
 import cv2
+import numpy as np
 import os
 import asyncio
+import math
 import time
 from core.logger import LoggerMixin
 from core.exceptions import VideoProcessingError
+from core.video_probe import probe_video
+from agent.frame_pool import FrameBufferPool
+from agent.scene_detector import SceneChangeDetector
+from agent.ffmpeg_decoder import FFmpegFrameReader
+from agent.frame_cache import FrameCache
+from agent.frame_features import FrameFeatureExtractor, default_feature_extractors
 
 def async_retry(max_retries: int = 3, base_delay: float = 1.0, max_delay: float = 60.0):
     """Decorator for async retry logic with exponential backoff"""
@@ -35,15 +50,91 @@ def async_retry(max_retries: int = 3, base_delay: float = 1.0, max_delay: float
         return wrapper
     return decorator
 
+# Frame sampling strategies:
+#   grab   - grab() every frame, retrieve() only the sampled ones (skips colour conversion and copies)
+#   seek   - jump straight to each sampled frame index (skips whole GOPs on sparse sampling)
+#   decode - read() and convert every frame (legacy behaviour, kept for benchmarking)
+SAMPLING_MODES = ("grab", "seek", "decode")
+
+# Output colour modes; "gray" converts at decode time so consumers skip cvtColor
+COLOR_MODES = ("bgr", "gray")
+
+# Decoder backends; "ffmpeg" streams frames from an ffmpeg rawvideo pipe and falls back to OpenCV
+DECODER_BACKENDS = ("opencv", "ffmpeg")
+
+# Executors for batch_extract_frames: shared thread pool, or one decoder process per core
+BATCH_EXECUTORS = ("thread", "process")
+
+# Keys extract_features adds next to the extractor results
+RESERVED_FEATURE_NAMES = ("frame_count", "duration")
+
+# Sentinel pushed by the decode thread once the stream is exhausted
+_END_OF_STREAM = object()
+
 class ScraperAgent(LoggerMixin):
     """Agent responsible for extracting frames from video files"""
     
-    def __init__(self, every_n_frames: int = 30, max_retries: int = 3):
-        """Initialize scraper agent"""
+    def __init__(self, every_n_frames: int = 30, max_retries: int = 3, sampling_mode: str = "grab",
+                 max_buffered_frames: int = 8, target_size: Optional[Tuple[int, int]] = None,
+                 color_mode: str = "bgr", scene_threshold: Optional[float] = None,
+                 max_scene_gap: Optional[int] = None, batch_executor: str = "thread",
+                 max_concurrent_videos: Optional[int] = None, decoder_backend: str = "opencv",
+                 frame_cache_dir: Optional[str] = None, frame_cache_max_bytes: int = 2 * 1024 ** 3):
+        """Initialize scraper agent
+        
+        ``target_size`` is an optional (width, height) every sampled frame is
+        downscaled to, ``color_mode`` selects BGR or single-channel gray output.
+        Setting ``scene_threshold`` turns on adaptive selection: every
+        ``every_n_frames``-th frame becomes a candidate that is only kept when
+        it differs from the last kept one (see SceneChangeDetector), so pair it
+        with a smaller stride. ``max_scene_gap`` forces a frame at least every
+        that many frames. ``batch_executor`` and ``max_concurrent_videos``
+        (default: one per CPU core) control batch_extract_frames.
+        With ``decoder_backend="ffmpeg"`` frame selection, scaling and gray
+        conversion run inside ffmpeg (``sampling_mode`` does not apply); OpenCV
+        is used whenever ffmpeg is missing or cannot read a file.
+        With ``frame_cache_dir`` set, sampled frames are kept on disk (see
+        FrameCache, capped at ``frame_cache_max_bytes``) and later runs with
+        the same video content and sampling settings map them instead of decoding.
+        """
         super().__init__()
+        if sampling_mode not in SAMPLING_MODES:
+            raise ValueError(f"Invalid sampling mode: {sampling_mode}. Valid modes: {list(SAMPLING_MODES)}")
+        if max_buffered_frames < 1:
+            raise ValueError(f"max_buffered_frames must be >= 1, got {max_buffered_frames}")
+        if color_mode not in COLOR_MODES:
+            raise ValueError(f"Invalid color mode: {color_mode}. Valid modes: {list(COLOR_MODES)}")
+        if target_size is not None and (len(target_size) != 2 or min(target_size) < 1):
+            raise ValueError(f"Invalid target size: {target_size}. Expected (width, height)")
+        if decoder_backend not in DECODER_BACKENDS:
+            raise ValueError(f"Invalid decoder backend: {decoder_backend}. Valid backends: {list(DECODER_BACKENDS)}")
+        if batch_executor not in BATCH_EXECUTORS:
+            raise ValueError(f"Invalid batch executor: {batch_executor}. Valid executors: {list(BATCH_EXECUTORS)}")
         self.every_n_frames = every_n_frames
         self.max_retries = max_retries
-        self.log_info("ScraperAgent initialized with async support")
+        self.sampling_mode = sampling_mode
+        self.max_buffered_frames = max_buffered_frames
+        self.target_size = tuple(target_size) if target_size is not None else None
+        self.color_mode = color_mode
+        self.scene_threshold = scene_threshold
+        self.max_scene_gap = max_scene_gap
+        self.batch_executor = batch_executor
+        self.max_concurrent_videos = max_concurrent_videos or os.cpu_count() or 1
+        self.decoder_backend = decoder_backend
+        self.ffmpeg_reader = FFmpegFrameReader()
+        if decoder_backend == "ffmpeg" and not self.ffmpeg_reader.is_available():
+            self.log_warning("ffmpeg/ffprobe not found, falling back to OpenCV decoding")
+            self.decoder_backend = "opencv"
+        self.frame_cache_dir = frame_cache_dir
+        self.frame_cache_max_bytes = frame_cache_max_bytes
+        self.frame_cache = FrameCache(frame_cache_dir, frame_cache_max_bytes) if frame_cache_dir else None
+        # Process executor and output directory of batch_extract_frames, created on first use
+        self._process_pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+        self._frames_dir: Optional[str] = None
+        self._active_batches: Set[str] = set()
+        self._process_lock = threading.Lock()
+        self.log_info(f"ScraperAgent initialized with async support (sampling mode: {sampling_mode}, "
+                      f"decoder: {self.decoder_backend})")
     
     async def extract_frames(self, video_path: str, every_n_frames: Optional[int] = None) -> List:
         """Extract frames from video file asynchronously"""
@@ -76,46 +167,229 @@ class ScraperAgent(LoggerMixin):
     
     def _extract_frames_sync(self, video_path: str, every_n_frames: int) -> List:
         """Synchronous frame extraction (runs in thread pool)"""
+        return [frame for _, _, frame in self._iter_video(video_path, every_n_frames)]
+    
+    def _iter_video(self, video_path: str, every_n_frames: int, pool: Optional[FrameBufferPool] = None,
+                    start_frame: int = 0, end_frame: Optional[int] = None) -> Iterator[Tuple[int, float, Any]]:
+        """Yield (frame_index, timestamp, frame) from the frame cache or the configured decoder backend
+        
+        Only frames in [``start_frame``, ``end_frame``) are sampled. Adaptive
+        scene selection is applied here, on top of either backend.
+        """
+        if self.frame_cache is None:
+            yield from self._iter_decoded(video_path, every_n_frames, pool, start_frame, end_frame)
+            return
+        
+        params = self._sampling_params(every_n_frames)
+        params.update(start_frame=start_frame, end_frame=end_frame)
+        key = self.frame_cache.make_key(video_path, params)
+        cached = self.frame_cache.load(key)
+        if cached is not None:
+            self.log_debug(f"Frame cache hit for: {video_path}")
+            yield from cached
+            return
+        
+        writer = self.frame_cache.open_writer(key)
+        try:
+            for index, timestamp, frame in self._iter_decoded(video_path, every_n_frames, pool,
+                                                              start_frame, end_frame):
+                writer.append(index, timestamp, frame)
+                yield index, timestamp, frame
+        except BaseException:
+            # Failed or abandoned (GeneratorExit) runs must not leave a truncated entry behind
+            writer.abort()
+            raise
+        writer.commit()
+    
+    def _iter_decoded(self, video_path: str, every_n_frames: int, pool: Optional[FrameBufferPool] = None,
+                      start_frame: int = 0, end_frame: Optional[int] = None) -> Iterator[Tuple[int, float, Any]]:
+        """Decode and select frames (the uncached path of _iter_video)"""
+        detector = None
+        if self.scene_threshold is not None:
+            detector = SceneChangeDetector(self.scene_threshold, max_gap_frames=self.max_scene_gap)
+        
+        for index, timestamp, frame in self._iter_backend(video_path, every_n_frames, pool, start_frame, end_frame):
+            if self._keep_candidate(detector, frame, index, pool):
+                yield index, timestamp, frame
+        
+        self._log_scene_stats(detector)
+    
+    def _iter_backend(self, video_path: str, every_n_frames: int, pool: Optional[FrameBufferPool],
+                      start_frame: int = 0, end_frame: Optional[int] = None) -> Iterator[Tuple[int, float, Any]]:
+        """Decode sampled frames with ffmpeg when configured, otherwise with OpenCV"""
+        if self.decoder_backend == "ffmpeg":
+            frames = self.ffmpeg_reader.iter_frames(
+                video_path, every_n_frames, self.target_size, self.color_mode == "gray", pool,
+                start_frame, end_frame
+            )
+            try:
+                first = next(frames, None)
+            except VideoProcessingError as e:
+                self.log_warning(f"ffmpeg decoding failed, falling back to OpenCV: {e}")
+            else:
+                if first is not None:
+                    yield first
+                    yield from frames
+                return
+        
         cap = cv2.VideoCapture(video_path)
         if not cap.isOpened():
             raise VideoProcessingError(f"Cannot open video file: {video_path}")
         
-        frames = []
-        count = 0
+        try:
+            if pool is not None:
+                pool.ensure_shape(self._output_shape(cap))
+            fps = probe_video(video_path)["fps"]
+            for index, frame in self._iter_sampled_frames(cap, every_n_frames, pool, start_frame, end_frame):
+                yield index, (index / fps if fps > 0 else 0), frame
+        finally:
+            cap.release()
+    
+    def _iter_sampled_frames(self, cap: cv2.VideoCapture, every_n_frames: int,
+                             pool: Optional[FrameBufferPool] = None, start_frame: int = 0,
+                             end_frame: Optional[int] = None) -> Iterator[Tuple[int, Any]]:
+        """Yield (frame_index, frame) for each sampled frame, decoding only what is kept
+        
+        Sampling starts at ``start_frame`` (reached with a single seek) and stops
+        before ``end_frame``. When a pool is given, yielded frames are pool
+        buffers that the caller must release once it is done with them.
+        """
+        if every_n_frames < 1:
+            raise VideoProcessingError(f"every_n_frames must be >= 1, got {every_n_frames}")
+        
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        sampled = 0
+        scratch: Dict[str, Any] = {}
         
-        try:
-            while cap.isOpened():
-                ret, frame = cap.read()
+        if self.sampling_mode == "seek" and total_frames > 0:
+            stop = total_frames if end_frame is None else min(end_frame, total_frames)
+            for index in range(start_frame, stop, every_n_frames):
+                if index > 0 and not cap.set(cv2.CAP_PROP_POS_FRAMES, index):
+                    break
+                ret, frame = self._read_frame(cap, pool, scratch)
                 if not ret:
                     break
-                
-                if count % every_n_frames == 0:
-                    frames.append(frame)
-                    # Log progress every 100 frames
-                    if len(frames) % 100 == 0:
-                        progress = (count / total_frames) * 100 if total_frames > 0 else 0
-                        self.log_info(f"[REPORT] Extraction progress: {progress:.1f}% ({len(frames)} frames)")
-                
-                count += 1
-                
-                # Yield control periodically to avoid blocking
-                if count % 1000 == 0:
-                    time.sleep(0.001)
+                sampled += 1
+                self._log_sampling_progress(sampled, index, total_frames)
+                yield index, frame
+            return
+        
+        if start_frame > 0 and not cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame):
+            return
+        
+        count = start_frame
+        while cap.isOpened() and (end_frame is None or count < end_frame):
+            keep = (count - start_frame) % every_n_frames == 0
+            if keep:
+                ret, frame = self._read_frame(cap, pool, scratch)
+            elif self.sampling_mode == "decode":
+                ret, frame = cap.read()
+            else:
+                # grab() advances the stream without converting the frame to BGR
+                ret, frame = cap.grab(), None
+            if not ret:
+                break
             
-            return frames
+            if keep:
+                sampled += 1
+                self._log_sampling_progress(sampled, count, total_frames)
+                yield count, frame
             
-        finally:
-            cap.release()
+            count += 1
+            
+            # Yield control periodically to avoid blocking
+            if count % 1000 == 0:
+                time.sleep(0.001)
+    
+    def _log_scene_stats(self, detector: Optional[SceneChangeDetector]):
+        """Log how many candidates adaptive selection dropped"""
+        if detector is not None:
+            stats = detector.get_stats()
+            self.log_debug(f"Scene selection kept {stats['kept']}/{stats['checked']} candidate frames")
+    
+    @staticmethod
+    def _keep_candidate(detector: Optional[SceneChangeDetector], frame: Any, index: int,
+                        pool: Optional[FrameBufferPool]) -> bool:
+        """Apply adaptive selection to a sampled frame, recycling rejected buffers"""
+        if detector is None or detector.should_keep(frame, index):
+            return True
+        if pool is not None:
+            pool.release(frame)
+        return False
+    
+    def _read_frame(self, cap: cv2.VideoCapture, pool: Optional[FrameBufferPool],
+                    scratch: Dict[str, Any]) -> Tuple[bool, Any]:
+        """Decode the current frame into a pooled buffer, downscaling/converting if configured"""
+        out = pool.acquire() if pool is not None else None
+        
+        if self.target_size is None and self.color_mode == "bgr":
+            ret, frame = cap.read(out)
+        else:
+            # Decode into a reused full-resolution scratch buffer, then shrink into the output
+            ret, decoded = cap.read(scratch.get("decoded"))
+            frame = None
+            if ret:
+                scratch["decoded"] = decoded
+                frame = self._prepare_frame(decoded, out, scratch)
+        
+        if not ret and out is not None:
+            pool.release(out)
+        return ret, frame
+    
+    def _prepare_frame(self, frame: Any, out: Any, scratch: Dict[str, Any]) -> Any:
+        """Apply target size and colour mode, writing into ``out`` when provided"""
+        if self.target_size is not None and self.color_mode == "gray":
+            # Resize first so the colour conversion touches fewer pixels
+            resized = cv2.resize(frame, self.target_size, dst=scratch.get("resized"), interpolation=cv2.INTER_AREA)
+            scratch["resized"] = resized
+            return cv2.cvtColor(resized, cv2.COLOR_BGR2GRAY, dst=out)
+        if self.target_size is not None:
+            return cv2.resize(frame, self.target_size, dst=out, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=out)
+    
+    def _output_shape(self, cap: cv2.VideoCapture) -> Tuple[int, ...]:
+        """Shape of the frames this agent yields for the given capture"""
+        if self.target_size is not None:
+            width, height = self.target_size
+        else:
+            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        return (height, width) if self.color_mode == "gray" else (height, width, 3)
+    
+    def _log_sampling_progress(self, sampled: int, index: int, total_frames: int):
+        """Log extraction progress every 100 sampled frames"""
+        if sampled % 100 == 0:
+            progress = (index / total_frames) * 100 if total_frames > 0 else 0
+            self.log_info(f"[REPORT] Extraction progress: {progress:.1f}% ({sampled} frames)")
+    
+    async def extract_frames_with_timestamps(self, video_path: str, every_n_frames: Optional[int] = None,
+                                             every_n_seconds: Optional[float] = None,
+                                             start_seconds: Optional[float] = None,
+                                             end_seconds: Optional[float] = None) -> List[Tuple]:
+        """Extract frames with their timestamps asynchronously with retry logic
+        
+        ``every_n_seconds`` samples at a fixed time interval whatever the frame
+        rate (instead of ``every_n_frames``). ``start_seconds``/``end_seconds``
+        restrict extraction to a window, e.g. ``end_seconds=3`` for the hook;
+        decoding seeks straight to the window start and stops at its end.
+        Invalid sampling arguments raise ValueError at once, without retries.
+        """
+        self._validate_sampling(every_n_frames, every_n_seconds, start_seconds, end_seconds)
+        return await self._extract_frames_with_timestamps_retry(
+            video_path, every_n_frames, every_n_seconds, start_seconds, end_seconds
+        )
     
     @async_retry(max_retries=3)
-    async def extract_frames_with_timestamps(self, video_path: str, every_n_frames: Optional[int] = None) -> List[Tuple]:
-        """Extract frames with their timestamps asynchronously with retry logic"""
+    async def _extract_frames_with_timestamps_retry(self, video_path: str, every_n_frames: Optional[int],
+                                                    every_n_seconds: Optional[float],
+                                                    start_seconds: Optional[float],
+                                                    end_seconds: Optional[float]) -> List[Tuple]:
+        """Timestamped extraction retried on (possibly transient) decoding failures"""
         start_time = time.time()
         self.log_info(f"[INFO] Starting timestamped frame extraction from: {video_path}")
         
         try:
-            if every_n_frames is None:
+            if every_n_frames is None and every_n_seconds is None:
                 every_n_frames = self.every_n_frames
             
             # Run the actual extraction in a thread pool
@@ -124,7 +398,10 @@ class ScraperAgent(LoggerMixin):
                 None, 
                 self._extract_frames_with_timestamps_sync, 
                 video_path, 
-                every_n_frames
+                every_n_frames,
+                every_n_seconds,
+                start_seconds,
+                end_seconds
             )
             
             end_time = time.time()
@@ -138,42 +415,198 @@ class ScraperAgent(LoggerMixin):
             self.log_error(f"[ERROR] Timestamped extraction failed after {duration:.2f}s: {e}", exc_info=True)
             raise VideoProcessingError(f"Frame extraction with timestamps failed: {e}")
     
-    def _extract_frames_with_timestamps_sync(self, video_path: str, every_n_frames: int) -> List[Tuple]:
+    def _extract_frames_with_timestamps_sync(self, video_path: str, every_n_frames: Optional[int],
+                                             every_n_seconds: Optional[float] = None,
+                                             start_seconds: Optional[float] = None,
+                                             end_seconds: Optional[float] = None) -> List[Tuple]:
         """Synchronous timestamped frame extraction (runs in thread pool)"""
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            raise VideoProcessingError(f"Cannot open video file: {video_path}")
+        every_n_frames, start_frame, end_frame = self._resolve_sampling(
+            video_path, every_n_frames, every_n_seconds, start_seconds, end_seconds
+        )
+        return [
+            (frame, timestamp)
+            for _, timestamp, frame in self._iter_video(video_path, every_n_frames, None, start_frame, end_frame)
+        ]
+    
+    @staticmethod
+    def _validate_sampling(every_n_frames: Optional[int], every_n_seconds: Optional[float],
+                           start_seconds: Optional[float], end_seconds: Optional[float]):
+        """Reject inconsistent sampling arguments (ValueError)"""
+        if every_n_frames is not None and every_n_seconds is not None:
+            raise ValueError("Pass either every_n_frames or every_n_seconds, not both")
+        if every_n_seconds is not None and every_n_seconds <= 0:
+            raise ValueError(f"every_n_seconds must be > 0, got {every_n_seconds}")
+        if start_seconds is not None and start_seconds < 0:
+            raise ValueError(f"start_seconds must be >= 0, got {start_seconds}")
+        if end_seconds is not None and end_seconds <= (start_seconds or 0):
+            raise ValueError(f"end_seconds must be after start_seconds, got {start_seconds}-{end_seconds}")
+    
+    def _resolve_sampling(self, video_path: str, every_n_frames: Optional[int], every_n_seconds: Optional[float],
+                          start_seconds: Optional[float], end_seconds: Optional[float]) -> Tuple[int, int, Optional[int]]:
+        """Turn a time-based interval and window into (every_n_frames, start_frame, end_frame)"""
+        self._validate_sampling(every_n_frames, every_n_seconds, start_seconds, end_seconds)
+        if every_n_frames is None and every_n_seconds is None:
+            every_n_frames = self.every_n_frames
+        if every_n_seconds is None and start_seconds is None and end_seconds is None:
+            return every_n_frames, 0, None
         
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        frames_with_timestamps = []
-        count = 0
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = probe_video(video_path)["fps"]
+        if fps <= 0:
+            raise VideoProcessingError(f"Cannot sample by time, unknown frame rate: {video_path}")
+        if every_n_seconds is not None:
+            every_n_frames = max(1, round(every_n_seconds * fps))
+        start_frame = round(start_seconds * fps) if start_seconds is not None else 0
+        end_frame = math.ceil(end_seconds * fps) if end_seconds is not None else None
+        return every_n_frames, start_frame, end_frame
+    
+    async def extract_features(self, video_path: str,
+                               extractors: Optional[List[FrameFeatureExtractor]] = None,
+                               every_n_frames: Optional[int] = None) -> Dict[str, Any]:
+        """Run several per-frame feature extractors over a single decode of the video
+        
+        Every sampled frame is handed to each extractor in turn, so adding a
+        feature costs its own compute but never another decode. Returns one
+        entry per extractor ``name`` (default: OCR frames, thumbnail, motion
+        energy, cut count and brightness) plus ``frame_count`` and ``duration``.
+        """
+        start_time = time.time()
+        self.log_info(f"[INFO] Starting feature extraction from: {video_path}")
+        
+        if extractors is None:
+            extractors = default_feature_extractors()
+        names = [extractor.name for extractor in extractors]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Feature extractor names must be unique, got {names}")
+        reserved = [name for name in names if name in RESERVED_FEATURE_NAMES]
+        if reserved:
+            raise ValueError(f"Feature extractor names {reserved} are reserved: {list(RESERVED_FEATURE_NAMES)}")
+        if every_n_frames is None:
+            every_n_frames = self.every_n_frames
         
         try:
-            while cap.isOpened():
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                if count % every_n_frames == 0:
-                    timestamp = count / fps if fps > 0 else 0
-                    frames_with_timestamps.append((frame, timestamp))
-                    
-                    # Log progress every 100 frames
-                    if len(frames_with_timestamps) % 100 == 0:
-                        progress = (count / total_frames) * 100 if total_frames > 0 else 0
-                        self.log_info(f"[REPORT] Timestamped extraction progress: {progress:.1f}% ({len(frames_with_timestamps)} frames)")
-                
-                count += 1
-                
-                # Yield control periodically
-                if count % 1000 == 0:
-                    time.sleep(0.001)
+            loop = asyncio.get_running_loop()
+            features = await loop.run_in_executor(
+                None,
+                self._extract_features_sync,
+                video_path,
+                extractors,
+                every_n_frames
+            )
             
-            return frames_with_timestamps
+            duration = time.time() - start_time
+            self.log_info(f"[OK] Feature extraction completed: {len(extractors)} features from "
+                          f"{features['frame_count']} frames in {duration:.2f}s")
+            return features
             
+        except Exception as e:
+            duration = time.time() - start_time
+            self.log_error(f"[ERROR] Feature extraction failed after {duration:.2f}s: {e}", exc_info=True)
+            raise VideoProcessingError(f"Feature extraction failed: {e}")
+    
+    def _extract_features_sync(self, video_path: str, extractors: List[FrameFeatureExtractor],
+                               every_n_frames: int) -> Dict[str, Any]:
+        """Single decode pass feeding every extractor (runs in thread pool)"""
+        info = probe_video(video_path)
+        for extractor in extractors:
+            extractor.reset(info)
+        
+        # Extractors copy what they keep, so two recycled buffers are enough
+        pool = FrameBufferPool(capacity=2)
+        frame_count = 0
+        for index, timestamp, frame in self._iter_video(video_path, every_n_frames, pool):
+            for extractor in extractors:
+                extractor.update(frame, index, timestamp)
+            pool.release(frame)
+            frame_count += 1
+        
+        features = {extractor.name: extractor.result() for extractor in extractors}
+        features["frame_count"] = frame_count
+        features["duration"] = info["duration"]
+        return features
+    
+    async def stream_frames(self, video_path: str, every_n_frames: Optional[int] = None,
+                            max_buffered_frames: Optional[int] = None) -> AsyncIterator[Tuple]:
+        """Stream (frame, timestamp) tuples as they are decoded, with bounded memory.
+        
+        Decoding runs in a worker thread that blocks once ``max_buffered_frames``
+        frames are waiting, so consumers can start processing the first frame
+        while the rest of the video is still being decoded. Frames live in a
+        recycled buffer pool: each one is only valid until the next is requested,
+        so consumers that keep frames must copy them.
+        """
+        if every_n_frames is None:
+            every_n_frames = self.every_n_frames
+        if max_buffered_frames is None:
+            max_buffered_frames = self.max_buffered_frames
+        
+        self.log_info(f"[INFO] Starting streamed frame extraction from: {video_path}")
+        start_time = time.time()
+        
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max_buffered_frames)
+        stop_event = threading.Event()
+        # One buffer per queue slot, plus the frame held by the consumer and the one being decoded
+        pool = FrameBufferPool(capacity=max_buffered_frames + 2)
+        producer = loop.run_in_executor(
+            None,
+            self._produce_frames,
+            video_path,
+            every_n_frames,
+            queue,
+            loop,
+            stop_event,
+            pool
+        )
+        
+        streamed = 0
+        try:
+            while True:
+                item = await queue.get()
+                if item is _END_OF_STREAM:
+                    break
+                if isinstance(item, Exception):
+                    self.log_error(f"[ERROR] Streamed extraction failed after {streamed} frames: {item}")
+                    raise VideoProcessingError(f"Frame streaming failed: {item}")
+                streamed += 1
+                yield item
+                pool.release(item[0])
         finally:
-            cap.release()
+            stop_event.set()
+            await producer
+        
+        duration = time.time() - start_time
+        self.log_info(f"[OK] Streamed extraction completed: {streamed} frames in {duration:.2f}s")
+        stats = pool.get_stats()
+        self.log_debug(f"Frame pool: {stats['allocations']} buffers, {stats['allocated_bytes']} bytes allocated, {stats['reuses']} reuses")
+    
+    def _produce_frames(self, video_path: str, every_n_frames: int, queue: asyncio.Queue,
+                        loop: asyncio.AbstractEventLoop, stop_event: threading.Event,
+                        pool: FrameBufferPool):
+        """Decode sampled frames into the consumer queue (runs in thread pool)"""
+        frames = self._iter_video(video_path, every_n_frames, pool)
+        try:
+            for _, timestamp, frame in frames:
+                if not self._put_threadsafe(queue, (frame, timestamp), loop, stop_event):
+                    return
+            self._put_threadsafe(queue, _END_OF_STREAM, loop, stop_event)
+        except Exception as e:
+            self._put_threadsafe(queue, e, loop, stop_event)
+        finally:
+            frames.close()
+    
+    @staticmethod
+    def _put_threadsafe(queue: asyncio.Queue, item: Any, loop: asyncio.AbstractEventLoop,
+                        stop_event: threading.Event) -> bool:
+        """Block until the queue accepts the item; give up if the consumer went away"""
+        future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+        while True:
+            try:
+                future.result(timeout=0.1)
+                return True
+            except concurrent.futures.TimeoutError:
+                if stop_event.is_set():
+                    future.cancel()
+                    return False
     
     @async_retry(max_retries=3)
     async def get_video_info(self, video_path: str) -> dict:
@@ -202,43 +635,49 @@ class ScraperAgent(LoggerMixin):
             raise VideoProcessingError(f"Failed to get video info: {e}")
     
     def _get_video_info_sync(self, video_path: str) -> dict:
-        """Synchronous video info extraction (runs in thread pool)"""
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            raise VideoProcessingError(f"Cannot open video file: {video_path}")
-        
-        try:
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            duration = frame_count / fps if fps > 0 else 0
-            
-            return {
-                "fps": fps,
-                "frame_count": frame_count,
-                "width": width,
-                "height": height,
-                "duration": duration
-            }
-            
-        finally:
-            cap.release()
+        """Synchronous video info extraction (runs in thread pool, served from the probe cache)"""
+        info = probe_video(video_path)
+        return {
+            "fps": info["fps"],
+            "frame_count": info["frame_count"],
+            "width": info["width"],
+            "height": info["height"],
+            "duration": info["duration"],
+            "codec": info["codec"]
+        }
     
-    async def batch_extract_frames(self, video_paths: List[str], every_n_frames: Optional[int] = None) -> dict:
-        """Extract frames from multiple videos concurrently"""
+    async def batch_extract_frames(self, video_paths: List[str], every_n_frames: Optional[int] = None,
+                                   executor: Optional[str] = None) -> dict:
+        """Extract frames from multiple videos concurrently
+        
+        At most ``max_concurrent_videos`` videos are decoded at once. With the
+        "process" executor each video is decoded in its own worker process and
+        frames come back as read-only memory-mapped arrays instead of pickles.
+        """
         start_time = time.time()
-        self.log_info(f"[INFO] Starting batch extraction for {len(video_paths)} videos")
+        executor = executor or self.batch_executor
+        if every_n_frames is None:
+            every_n_frames = self.every_n_frames
+        self.log_info(f"[INFO] Starting batch extraction for {len(video_paths)} videos "
+                      f"({executor} executor, max {self.max_concurrent_videos} concurrent)")
         
         try:
-            # Create tasks for concurrent execution
-            tasks = [
-                self.extract_frames(video_path, every_n_frames) 
-                for video_path in video_paths
-            ]
-            
-            # Execute all tasks concurrently
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+            if executor == "process":
+                results = await self._batch_extract_in_processes(video_paths, every_n_frames)
+            elif executor == "thread":
+                semaphore = asyncio.Semaphore(self.max_concurrent_videos)
+                
+                async def extract_limited(video_path: str) -> List:
+                    async with semaphore:
+                        return await self.extract_frames(video_path, every_n_frames)
+                
+                # Execute all tasks concurrently, bounded by the semaphore
+                results = await asyncio.gather(
+                    *(extract_limited(video_path) for video_path in video_paths),
+                    return_exceptions=True
+                )
+            else:
+                raise ValueError(f"Invalid batch executor: {executor}. Valid executors: {list(BATCH_EXECUTORS)}")
             
             # Process results
             successful_results = {}
@@ -267,3 +706,150 @@ class ScraperAgent(LoggerMixin):
             duration = end_time - start_time
             self.log_error(f"[ERROR] Batch extraction failed after {duration:.2f}s: {e}", exc_info=True)
             raise VideoProcessingError(f"Batch extraction failed: {e}")
+    
+    async def _batch_extract_in_processes(self, video_paths: List[str], every_n_frames: int) -> List:
+        """Decode videos in the agent's process pool, one decoder per worker, results via mapped files"""
+        loop = asyncio.get_running_loop()
+        pool, output_dir = self._get_process_pool()
+        batch = uuid.uuid4().hex
+        self._active_batches.add(batch)
+        
+        futures = [
+            loop.run_in_executor(
+                pool,
+                _extract_frames_to_file,
+                video_path,
+                every_n_frames,
+                os.path.join(output_dir, f"{batch}_{index}.frames")
+            )
+            for index, video_path in enumerate(video_paths)
+        ]
+        try:
+            outputs = await asyncio.gather(*futures, return_exceptions=True)
+            # Map finished outputs before anything can retire the pool and its directory
+            results = []
+            for output in outputs:
+                try:
+                    results.append(output if isinstance(output, Exception) else self._map_frames_file(*output))
+                except (OSError, ValueError) as e:
+                    results.append(VideoProcessingError(f"Cannot map frames of {output[0]}: {e}"))
+            if any(isinstance(output, concurrent.futures.process.BrokenProcessPool) for output in outputs):
+                # A worker died: the pool accepts no more work, the next batch starts a fresh one.
+                # Mapped frames stay readable once their files are unlinked (POSIX).
+                self.log_warning("Batch worker process terminated abruptly, restarting the process pool")
+                await loop.run_in_executor(None, self.close)
+            return results
+        finally:
+            self._active_batches.discard(batch)
+            # Mapped frames stay readable after unlink on POSIX; files still mapped elsewhere
+            # (Windows) fail to delete and are retried after the next batch or on close()
+            self._remove_frame_files(output_dir, self._active_batches)
+    
+    def _get_process_pool(self) -> Tuple[concurrent.futures.ProcessPoolExecutor, str]:
+        """Worker processes and output directory shared by every process batch of this agent"""
+        with self._process_lock:
+            if self._process_pool is None:
+                self._process_pool = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.max_concurrent_videos,
+                    initializer=_init_frame_worker,
+                    initargs=(self._worker_settings(),)
+                )
+                self._frames_dir = tempfile.mkdtemp(prefix="tokintel_frames_")
+                # Also runs at interpreter exit if close() is never called
+                self._finalizer = weakref.finalize(self, _shutdown_process_pool,
+                                                   self._process_pool, self._frames_dir)
+            return self._process_pool, self._frames_dir
+    
+    @staticmethod
+    def _remove_frame_files(output_dir: str, active_batches: Set[str]):
+        """Delete worker output files, except those of running batches and those still locked by a mapping"""
+        try:
+            names = os.listdir(output_dir)
+        except OSError:
+            # Already removed by close()
+            return
+        for name in names:
+            if name.split("_", 1)[0] in active_batches:
+                continue
+            try:
+                os.remove(os.path.join(output_dir, name))
+            except OSError:
+                continue
+    
+    def close(self):
+        """Stop the batch worker processes and remove their output directory"""
+        with self._process_lock:
+            if self._process_pool is None:
+                return
+            self._finalizer.detach()
+            pool, output_dir = self._process_pool, self._frames_dir
+            self._process_pool, self._frames_dir = None, None
+        # Collect dropped frame views first so their mappings are closed before removal
+        gc.collect()
+        _shutdown_process_pool(pool, output_dir)
+    
+    def _worker_settings(self) -> Dict[str, Any]:
+        """Constructor arguments that reproduce this agent's sampling in a worker process"""
+        return {
+            "every_n_frames": self.every_n_frames,
+            "sampling_mode": self.sampling_mode,
+            "target_size": self.target_size,
+            "color_mode": self.color_mode,
+            "scene_threshold": self.scene_threshold,
+            "max_scene_gap": self.max_scene_gap,
+            "decoder_backend": self.decoder_backend,
+            "frame_cache_dir": self.frame_cache_dir,
+            "frame_cache_max_bytes": self.frame_cache_max_bytes
+        }
+    
+    def _sampling_params(self, every_n_frames: int) -> Dict[str, Any]:
+        """Settings that determine which frames are sampled and how they look (frame cache key)"""
+        return {
+            "every_n_frames": every_n_frames,
+            "sampling_mode": self.sampling_mode,
+            "target_size": self.target_size,
+            "color_mode": self.color_mode,
+            "scene_threshold": self.scene_threshold,
+            "max_scene_gap": self.max_scene_gap,
+            "decoder_backend": self.decoder_backend
+        }
+    
+    @staticmethod
+    def _map_frames_file(path: str, count: int, shape: Optional[Tuple[int, ...]], dtype: Optional[str]) -> List:
+        """Map a raw frames file written by a worker as a list of read-only frame views"""
+        if count == 0:
+            return []
+        frames = np.memmap(path, dtype=np.dtype(dtype), mode="r", shape=(count,) + tuple(shape))
+        return list(frames)
+
+def _shutdown_process_pool(pool: concurrent.futures.ProcessPoolExecutor, output_dir: str):
+    """Stop batch workers and delete their output directory (best effort for still-mapped files)"""
+    pool.shutdown(wait=True, cancel_futures=True)
+    shutil.rmtree(output_dir, ignore_errors=True)
+
+# Per-process agent used by batch workers, created once by the pool initializer
+_worker_agent: Optional[ScraperAgent] = None
+
+def _init_frame_worker(settings: Dict[str, Any]):
+    """Process pool initializer: build the worker agent with single-threaded decoding"""
+    global _worker_agent
+    # The pool already runs one process per core; keep each decoder on a single thread
+    os.environ.setdefault("OPENCV_FFMPEG_CAPTURE_OPTIONS", "threads;1")
+    cv2.setNumThreads(1)
+    _worker_agent = ScraperAgent(**settings)
+    _worker_agent.ffmpeg_reader.threads = 1
+
+def _extract_frames_to_file(video_path: str, every_n_frames: int,
+                            output_path: str) -> Tuple[str, int, Optional[Tuple[int, ...]], Optional[str]]:
+    """Decode sampled frames straight into a raw file (runs in a worker process)"""
+    pool = FrameBufferPool(capacity=1)
+    shape, dtype, count = None, None, 0
+    with open(output_path, "wb") as output:
+        for _, _, frame in _worker_agent._iter_video(video_path, every_n_frames, pool):
+            if shape is None:
+                shape, dtype = frame.shape, frame.dtype.str
+            np.ascontiguousarray(frame).tofile(output)
+            pool.release(frame)
+            count += 1
+    
+    return output_path, count, shape, dtype
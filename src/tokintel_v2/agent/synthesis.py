@@ -11,16 +11,24 @@ import json
 from core.logger import LoggerMixin
 from core.exceptions import LLMError
 from llm.prompts import PromptManager
+from llm.cache import LLMResponseCache, cache_key
+from llm.handler import is_local_backend
 
 class SynthesisAgent(LoggerMixin):
     """Agent responsible for generating summaries using LLM"""
     
-    def __init__(self, model: str = "gpt-4", endpoint: Optional[str] = None, api_key: Optional[str] = None):
-        """Initialize synthesis agent"""
+    # Generation parameters of every summary call (also part of the cache key)
+    temperature = 0.7
+    max_tokens = 500
+    
+    def __init__(self, model: str = "gpt-4", endpoint: Optional[str] = None, api_key: Optional[str] = None,
+                 cache: Optional[LLMResponseCache] = None):
+        """Initialize synthesis agent; summaries are reused from ``cache`` when given"""
         super().__init__()
         self.model = model
         self.endpoint = endpoint
         self.api_key = api_key
+        self.cache = cache
         self.prompt_manager = PromptManager()
         self.log_info("SynthesisAgent initialized with prompt manager")
     
@@ -39,8 +47,16 @@ class SynthesisAgent(LoggerMixin):
             endpoint = model_config.get("endpoint", self.endpoint)
             api_key = model_config.get("api_key", self.api_key)
             
-            # Generate summary
-            if endpoint and "localhost" in endpoint:
+            # Same model and prompt as an earlier video: reuse the summary
+            key = cache_key(model, prompt, self.temperature, self.max_tokens) if self.cache is not None else None
+            if key is not None:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    self.log_info("Summary served from LLM cache")
+                    return cached
+            
+            # Generate summary (same backend choice as LLMHandler, so streaming and blocking agree)
+            if is_local_backend(model, endpoint):
                 summary = self._call_local_llm(prompt, endpoint, model)
             else:
                 summary = self._call_openai_llm(prompt, model, api_key)
@@ -49,6 +65,9 @@ class SynthesisAgent(LoggerMixin):
                 self.log_warning("Empty summary generated")
                 return "Nessuna sintesi generata"
             
+            if key is not None:
+                self.cache.put(key, summary)
+            
             processing_time = time.time() - start_time
             self.log_info(f"Summary generated: {len(summary)} characters in {processing_time:.2f}s")
             return summary
@@ -73,8 +92,8 @@ class SynthesisAgent(LoggerMixin):
             response = client.chat.completions.create(
                 model=model,
                 messages=[{"role": "user", "content": prompt}],
-                temperature=0.7,
-                max_tokens=500
+                temperature=self.temperature,
+                max_tokens=self.max_tokens
             )
             
             summary = response.choices[0].message.content.strip()
@@ -100,8 +119,8 @@ class SynthesisAgent(LoggerMixin):
                 json={
                     "model": model,
                     "messages": [{"role": "user", "content": prompt}],
-                    "temperature": 0.7,
-                    "max_tokens": 500
+                    "temperature": self.temperature,
+                    "max_tokens": self.max_tokens
                 },
                 timeout=30
             )
@@ -137,7 +156,7 @@ class SynthesisAgent(LoggerMixin):
             endpoint = model_config.get("endpoint", self.endpoint)
             
             # Generate analysis
-            if endpoint and "localhost" in endpoint:
+            if is_local_backend(model, endpoint):
                 analysis = self._call_local_llm(prompt, endpoint, model)
             else:
                 analysis = self._call_openai_llm(prompt, model)
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+TokIntel v2 - Text Region Detector
+Finds caption-like text bands so OCR only sees small crops instead of whole frames
+
+The legacy tree keeps its own copy in agent/text_regions.py: both trees are
+run with their own root on sys.path and both name their package ``agent``,
+so neither can import the other. Keep the two detectors in sync.
+"""
+
+from typing import Dict, List, Any, Optional, Tuple
+import cv2
+import numpy as np
+
+Box = Tuple[int, int, int, int]
+
+class TextRegionDetector:
+    """Morphological text detector working on a downscaled gray copy of the frame.
+
+    A morphological gradient highlights sharp glyph edges, Otsu thresholding
+    and a horizontal close join the letters of a line into one blob, and the
+    resulting boxes are merged per line and filtered by fill, size and aspect.
+    """
+
+    def __init__(self, work_width: int = 540, min_area_ratio: float = 0.0005, min_aspect: float = 1.5,
+                 min_fill: float = 0.2, padding: int = 6, max_height_ratio: float = 0.2):
+        """Initialize detector; ``padding`` is added around each box in full-resolution pixels"""
+        self.work_width = work_width
+        self.min_area_ratio = min_area_ratio
+        self.min_aspect = min_aspect
+        self.min_fill = min_fill
+        self.padding = padding
+        self.max_height_ratio = max_height_ratio
+        self._gradient_kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+        self._line_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (9, 1))
+
+    def detect(self, gray: np.ndarray) -> List[Box]:
+        """(x, y, w, h) boxes in frame coordinates, top to bottom"""
+        height, width = gray.shape[:2]
+        scale = min(1.0, self.work_width / width)
+        small = gray if scale == 1.0 else cv2.resize(gray, (round(width * scale), round(height * scale)),
+                                                     interpolation=cv2.INTER_AREA)
+
+        gradient = cv2.morphologyEx(small, cv2.MORPH_GRADIENT, self._gradient_kernel)
+        _, binary = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+        connected = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, self._line_kernel)
+        contours, _ = cv2.findContours(connected, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        boxes = []
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            # Text lines fill much of their box with edges, object outlines do not
+            if h >= 4 and cv2.countNonZero(binary[y:y + h, x:x + w]) >= self.min_fill * w * h:
+                boxes.append((x, y, w, h))
+
+        min_area = self.min_area_ratio * small.shape[0] * small.shape[1]
+        regions = []
+        for x, y, w, h in self.merge_lines(boxes):
+            # Size and shape are judged on whole lines, not single glyphs
+            if w * h < min_area or w < self.min_aspect * h:
+                continue
+            # A caption line is never a fifth of the frame tall: such blocks are noise or texture
+            if h > self.max_height_ratio * small.shape[0]:
+                continue
+            x0 = max(0, int(x / scale) - self.padding)
+            y0 = max(0, int(y / scale) - self.padding)
+            x1 = min(width, int((x + w) / scale) + self.padding)
+            y1 = min(height, int((y + h) / scale) + self.padding)
+            regions.append((x0, y0, x1 - x0, y1 - y0))
+        return regions
+
+    @staticmethod
+    def merge_lines(boxes: List[Box]) -> List[Box]:
+        """Merge vertically overlapping, horizontally close boxes until nothing changes"""
+        merged = sorted(boxes, key=lambda box: (box[1], box[0]))
+        changed = True
+        while changed:
+            changed = False
+            result: List[Box] = []
+            for x, y, w, h in merged:
+                for i, (mx, my, mw, mh) in enumerate(result):
+                    overlap = min(y + h, my + mh) - max(y, my)
+                    gap = max(x, mx) - min(x + w, mx + mw)
+                    if overlap > 0.5 * min(h, mh) and gap < 1.5 * max(h, mh):
+                        nx, ny = min(x, mx), min(y, my)
+                        result[i] = (nx, ny, max(x + w, mx + mw) - nx, max(y + h, my + mh) - ny)
+                        changed = True
+                        break
+                else:
+                    result.append((x, y, w, h))
+            merged = result
+        return sorted(merged, key=lambda box: (box[1], box[0]))
+
+    def crop(self, gray: np.ndarray) -> List[np.ndarray]:
+        """Crops of the detected regions; empty when the frame has no text candidates"""
+        return [gray[y:y + h, x:x + w] for x, y, w, h in self.detect(gray)]
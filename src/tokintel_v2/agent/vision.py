@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+TokIntel v2 - Vision Agent
+Extracts on-screen text from sampled frames with OCR, off the event loop
+"""
+
+from typing import Dict, List, Any, Optional, Tuple, AsyncIterator
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import os
+import threading
+import time
+import cv2
+import numpy as np
+from core.logger import LoggerMixin
+from core.exceptions import VideoProcessingError
+from agent.text_regions import TextRegionDetector
+from agent.ocr_cache import OCRCache, region_hash
+from llm.rate_limit import SharedSemaphore
+
+# Try to import pytesseract for OCR support
+try:
+    import pytesseract
+    TESSERACT_AVAILABLE = True
+except ImportError:
+    TESSERACT_AVAILABLE = False
+    pytesseract = None
+
+# OCR strategies:
+#   regions  - detect text bands with OpenCV, OCR each crop at full resolution
+#   multires - OCR a downscaled frame, re-OCR at full resolution only lines read with low confidence
+OCR_STRATEGIES = ("regions", "multires")
+
+# Process-wide OCR executor; its size is the global OCR concurrency budget shared by every pipeline
+_ocr_executor: Optional[ThreadPoolExecutor] = None
+_ocr_executor_workers = 0
+_ocr_executor_lock = threading.Lock()
+
+def get_ocr_executor(max_workers: Optional[int] = None) -> ThreadPoolExecutor:
+    """Return the shared OCR executor, creating it on first use (default: one worker per CPU core)
+
+    The first caller fixes the global budget; later ``max_workers`` values are ignored.
+    """
+    global _ocr_executor, _ocr_executor_workers
+    with _ocr_executor_lock:
+        if _ocr_executor is None:
+            # Each tesseract call gets one core; parallelism comes from the executor
+            os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+            _ocr_executor_workers = max_workers or os.cpu_count() or 1
+            _ocr_executor = ThreadPoolExecutor(
+                max_workers=_ocr_executor_workers,
+                thread_name_prefix="tokintel-ocr"
+            )
+        return _ocr_executor
+
+def get_ocr_budget() -> int:
+    """Global OCR concurrency budget (workers of the shared executor), 0 before it is created"""
+    with _ocr_executor_lock:
+        return _ocr_executor_workers
+
+class VisionAgent(LoggerMixin):
+    """Agent responsible for OCR on sampled video frames"""
+
+    def __init__(self, lang: str = "eng", max_concurrent_ocr: int = 2,
+                 global_max_concurrent_ocr: Optional[int] = None, detect_regions: bool = True,
+                 ocr_cache: Optional[OCRCache] = None, ocr_strategy: str = "regions",
+                 lowres_scale: float = 0.5, min_confidence: float = 70.0):
+        """Initialize vision agent
+
+        ``max_concurrent_ocr`` bounds the OCR calls in flight for this agent
+        (i.e. per pipeline, across all videos it is analysing), while
+        ``global_max_concurrent_ocr`` sizes the executor shared by every agent
+        in the process. Frame decoding is paused while the budget is used up.
+        With ``detect_regions`` only text-like crops are OCRed; an ``ocr_cache``
+        then serves regions seen before (in any video) without tesseract.
+        ``ocr_strategy="multires"`` reads the frame at ``lowres_scale`` first and
+        re-OCRs at full resolution only lines below ``min_confidence`` (0-100).
+        """
+        super().__init__()
+        if max_concurrent_ocr < 1:
+            raise ValueError(f"max_concurrent_ocr must be >= 1, got {max_concurrent_ocr}")
+        if ocr_strategy not in OCR_STRATEGIES:
+            raise ValueError(f"Invalid OCR strategy: {ocr_strategy}. Valid strategies: {list(OCR_STRATEGIES)}")
+        if not 0 < lowres_scale <= 1:
+            raise ValueError(f"lowres_scale must be in (0, 1], got {lowres_scale}")
+        self.lang = lang
+        self.max_concurrent_ocr = max_concurrent_ocr
+        self.detector = TextRegionDetector() if detect_regions else None
+        self.ocr_cache = ocr_cache
+        self.ocr_strategy = ocr_strategy
+        self.lowres_scale = lowres_scale
+        self.min_confidence = min_confidence
+        self._stats_lock = threading.Lock()
+        self._stats = {"frames": 0, "lowres_lines": 0, "fullres_lines": 0}
+        self.executor = get_ocr_executor(global_max_concurrent_ocr)
+        # Not bound to an event loop: the agent can serve successive asyncio.run() calls
+        self._semaphore = SharedSemaphore(max_concurrent_ocr)
+        if not TESSERACT_AVAILABLE:
+            self.log_warning("pytesseract not installed, OCR disabled. Install with: pip install pytesseract")
+        self.log_info(f"VisionAgent initialized (OCR concurrency: {max_concurrent_ocr} per agent, "
+                      f"{get_ocr_budget()} global)")
+
+    def is_available(self) -> bool:
+        """Check that the OCR engine can be used"""
+        return TESSERACT_AVAILABLE
+
+    @staticmethod
+    def to_gray(frame: np.ndarray) -> np.ndarray:
+        """Gray copy of a BGR or gray frame, safe to keep after the frame buffer is recycled"""
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else np.array(frame, copy=True)
+
+    def ocr_frame(self, gray: np.ndarray) -> str:
+        """Run OCR on one gray frame (blocking, runs on the OCR executor)"""
+        self._count("frames")
+        if self.ocr_strategy == "multires":
+            return self.ocr_multires(gray)
+        crops = self.detector.crop(gray) if self.detector is not None else [gray]
+        texts = [self.ocr_region(crop) for crop in crops]
+        return "\n".join(text for text in texts if text)
+
+    def ocr_multires(self, gray: np.ndarray) -> str:
+        """Read the downscaled frame, then re-OCR low-confidence lines from the full-resolution frame"""
+        small = gray
+        if self.lowres_scale < 1:
+            small = cv2.resize(gray, None, fx=self.lowres_scale, fy=self.lowres_scale, interpolation=cv2.INTER_AREA)
+        try:
+            data = pytesseract.image_to_data(small, lang=self.lang, output_type=pytesseract.Output.DICT)
+        except Exception as e:
+            raise VideoProcessingError(f"OCR failed: {e}")
+
+        # Group recognized words by text line, in reading order
+        lines: Dict[Tuple[int, int, int], List[int]] = {}
+        for i, word in enumerate(data["text"]):
+            if word.strip() and float(data["conf"][i]) >= 0:
+                lines.setdefault((data["block_num"][i], data["par_num"][i], data["line_num"][i]), []).append(i)
+
+        texts = []
+        for words in lines.values():
+            confidence = sum(float(data["conf"][i]) for i in words) / len(words)
+            if confidence >= self.min_confidence:
+                self._count("lowres_lines")
+                texts.append(" ".join(data["text"][i].strip() for i in words))
+                continue
+            # Low confidence: crop the line (with a margin) from the full-resolution frame
+            self._count("fullres_lines")
+            left = min(data["left"][i] for i in words)
+            top = min(data["top"][i] for i in words)
+            right = max(data["left"][i] + data["width"][i] for i in words)
+            bottom = max(data["top"][i] + data["height"][i] for i in words)
+            margin = (bottom - top) // 2 + 2
+            x0 = max(0, int((left - margin) / self.lowres_scale))
+            y0 = max(0, int((top - margin) / self.lowres_scale))
+            x1 = min(gray.shape[1], int((right + margin) / self.lowres_scale))
+            y1 = min(gray.shape[0], int((bottom + margin) / self.lowres_scale))
+            text = self.ocr_region(gray[y0:y1, x0:x1])
+            if text:
+                texts.append(text)
+        return "\n".join(texts)
+
+    def _count(self, name: str):
+        """Increment an OCR counter (called from executor threads)"""
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get OCR statistics; ``fullres_lines`` counts multires re-OCRs"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        if self.ocr_cache is not None:
+            stats["cache"] = self.ocr_cache.get_stats()
+        return stats
+
+    def ocr_region(self, crop: np.ndarray) -> str:
+        """OCR one crop, going through the cross-video cache when configured"""
+        key = None
+        if self.ocr_cache is not None:
+            key = region_hash(crop)
+            cached = self.ocr_cache.get(key, self.lang)
+            if cached is not None:
+                return cached
+
+        try:
+            text = pytesseract.image_to_string(crop, lang=self.lang).strip()
+        except Exception as e:
+            raise VideoProcessingError(f"OCR failed: {e}")
+
+        if key is not None:
+            self.ocr_cache.put(key, self.lang, text)
+        return text
+
+    async def extract_text(self, frames: AsyncIterator[Tuple]) -> Tuple[str, int]:
+        """OCR streamed (frame, timestamp) tuples, returning (text, frame_count)
+
+        Frames are submitted to the OCR executor as they arrive, so OCR of
+        early frames overlaps decoding of later ones. Texts are joined in frame
+        order, dropping consecutive repeats of captions that stay on screen.
+        """
+        start_time = time.time()
+        loop = asyncio.get_running_loop()
+        tasks: List[asyncio.Future] = []
+        frame_count = 0
+
+        try:
+            async for frame, timestamp in frames:
+                frame_count += 1
+                if not TESSERACT_AVAILABLE:
+                    continue
+                gray = self.to_gray(frame)
+                # Backpressure: wait for a free slot before taking (and decoding) more frames
+                await self._semaphore.acquire()
+                task = loop.run_in_executor(self.executor, self.ocr_frame, gray)
+                task.add_done_callback(lambda _: self._semaphore.release())
+                tasks.append(task)
+
+            texts = await asyncio.gather(*tasks)
+        finally:
+            # On failure, let in-flight OCR finish so the budget is returned
+            pending = [task for task in tasks if not task.done()]
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        lines = []
+        for text in texts:
+            if text and (not lines or lines[-1] != text):
+                lines.append(text)
+
+        duration = time.time() - start_time
+        self.log_debug(f"OCR completed on {len(tasks)}/{frame_count} frames in {duration:.2f}s")
+        return "\n".join(lines), frame_count
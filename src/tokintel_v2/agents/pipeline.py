@@ -4,15 +4,19 @@ TokIntel v2 - Video Analysis Pipeline
 Orchestrates all analysis agents for video processing
 """
 
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple, AsyncIterator, Callable
 import logging
 logger = logging.getLogger(__name__)
 import asyncio
 
 from core.logger import setup_logger
-from core.exceptions import PipelineError
+from core.exceptions import PipelineError, VideoProcessingError
 from agent.scraper import ScraperAgent
+from agent.vision import VisionAgent
+from agent.ocr_cache import OCRCache
 from agent.synthesis import SynthesisAgent
+from llm.cache import get_llm_cache
+from llm.handler import LLMHandler
 from agent.devika_team import DevikaAgentTeam
 
 logger = setup_logger(__name__)
@@ -25,25 +29,57 @@ class VideoAnalysisPipeline:
         self.config = config
         self.logger = logger
         
-        # Initialize agents
-        self.scraper = ScraperAgent()
-        self.synthesis = SynthesisAgent()
+        # Initialize agents; with a scene threshold frames are sampled on a finer stride
+        # and only kept when they differ from the last kept one
+        scene_threshold = config.get("scene_threshold")
+        self.scraper = ScraperAgent(
+            every_n_frames=config.get("scene_candidate_interval", 5) if scene_threshold is not None else 30,
+            scene_threshold=scene_threshold,
+            max_scene_gap=config.get("scene_max_gap"),
+            frame_cache_dir=config.get("frame_cache_dir"),
+            frame_cache_max_bytes=config.get("frame_cache_max_mb", 2048) * 1024 * 1024
+        )
+        ocr_cache = None
+        if config.get("ocr_cache_path"):
+            ocr_cache = OCRCache(config["ocr_cache_path"], config.get("ocr_cache_max_entries", 50000))
+        self.vision = VisionAgent(
+            max_concurrent_ocr=config.get("ocr_concurrency", 2),
+            global_max_concurrent_ocr=config.get("ocr_global_concurrency"),
+            ocr_cache=ocr_cache,
+            ocr_strategy=config.get("ocr_strategy", "regions")
+        )
+        llm_config = config.get("llm_config") or {}
+        llm_cache = None
+        if llm_config.get("cache_path"):
+            llm_cache = get_llm_cache(
+                llm_config["cache_path"],
+                llm_config.get("cache_ttl", 7 * 24 * 3600),
+                llm_config.get("cache_memory_entries", 1024)
+            )
+        self.synthesis = SynthesisAgent(cache=llm_cache)
+        # Async handler used when the summary is streamed to the UI
+        self.llm = LLMHandler(dict(llm_config), cache=llm_cache)
         self.devika_team = DevikaAgentTeam(config)
         
         self.logger.info("Video analysis pipeline initialized")
     
-    async def analyze(self, video_path: str) -> Dict[str, Any]:
-        """Analyze a video file through the complete pipeline"""
+    async def analyze(self, video_path: str,
+                      on_summary_delta: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """Analyze a video file through the complete pipeline
+        
+        With ``on_summary_delta`` the summary is streamed and the callback
+        receives the partial summary text after every generated chunk.
+        """
         try:
             self.logger.info(f"Starting analysis pipeline for: {video_path}")
             
-            # Step 1: Extract frames
+            # Step 1: Extract frames (streamed, decoded lazily while OCR consumes them)
             self.logger.debug("Step 1: Extracting frames")
-            frames = await self._extract_frames(video_path)
+            frames = self._extract_frames(video_path)
             
             # Step 2: Extract text from frames (OCR)
             self.logger.debug("Step 2: Extracting text from frames")
-            ocr_text = await self._extract_text(frames)
+            ocr_text, frame_count = await self._extract_text(frames)
             
             # Step 3: Transcribe audio
             self.logger.debug("Step 3: Transcribing audio")
@@ -51,7 +87,7 @@ class VideoAnalysisPipeline:
             
             # Step 4: Generate summary
             self.logger.debug("Step 4: Generating summary")
-            summary = await self._generate_summary(transcript, ocr_text)
+            summary = await self._generate_summary(transcript, ocr_text, on_summary_delta)
             
             # Step 5: Evaluate and score
             self.logger.debug("Step 5: Evaluating and scoring")
@@ -72,7 +108,7 @@ class VideoAnalysisPipeline:
                 "score": score,
                 "transcript": transcript,
                 "ocr_text": ocr_text,
-                "frame_count": len(frames) if frames else 0,
+                "frame_count": frame_count,
                 "devika_analysis": devika_analysis
             }
             
@@ -83,31 +119,28 @@ class VideoAnalysisPipeline:
             self.logger.error(f"Pipeline analysis failed for {video_path}: {e}")
             raise PipelineError(f"Analysis failed: {e}")
     
-    async def _extract_frames(self, video_path: str) -> List:
-        """Extract frames from video"""
-        try:
-            # Run in thread pool to avoid blocking
-            loop = asyncio.get_running_loop()
-            frames = await loop.run_in_executor(
-                None, self.scraper.extract_frames, video_path
-            )
-            self.logger.debug(f"Extracted {len(frames)} frames")
-            return frames
-        except Exception as e:
-            self.logger.error(f"Frame extraction failed: {e}")
-            raise PipelineError(f"Frame extraction failed: {e}")
+    def _extract_frames(self, video_path: str) -> AsyncIterator[Tuple]:
+        """Stream (frame, timestamp) tuples from video with bounded buffering"""
+        return self.scraper.stream_frames(
+            video_path,
+            max_buffered_frames=self.config.get("frame_buffer_size", self.scraper.max_buffered_frames)
+        )
     
-    async def _extract_text(self, frames: List) -> str:
-        """Extract text from frames using OCR"""
+    async def _extract_text(self, frames: AsyncIterator[Tuple]) -> Tuple[str, int]:
+        """Extract text from streamed frames using OCR, returning (text, frame_count)"""
         try:
-            if not frames:
+            # OCR runs on the shared OCR executor, within this pipeline's concurrency budget
+            ocr_text, frame_count = await self.vision.extract_text(frames)
+            
+            if not frame_count:
                 self.logger.warning("No frames to extract text from")
-                return ""
+                return "", 0
             
-            # Placeholder for OCR functionality
-            # TODO: Implement OCR text extraction
-            self.logger.debug("OCR text extraction not implemented yet")
-            return ""
+            self.logger.debug(f"Extracted {len(ocr_text)} characters of OCR text from {frame_count} frames")
+            return ocr_text, frame_count
+        except VideoProcessingError as e:
+            self.logger.error(f"Frame extraction failed: {e}")
+            raise PipelineError(f"Frame extraction failed: {e}")
         except Exception as e:
             self.logger.error(f"OCR text extraction failed: {e}")
             raise PipelineError(f"OCR text extraction failed: {e}")
@@ -123,9 +156,13 @@ class VideoAnalysisPipeline:
             self.logger.error(f"Audio transcription failed: {e}")
             raise PipelineError(f"Audio transcription failed: {e}")
     
-    async def _generate_summary(self, transcript: str, ocr_text: str) -> str:
-        """Generate summary from transcript and OCR text"""
+    async def _generate_summary(self, transcript: str, ocr_text: str,
+                                on_delta: Optional[Callable[[str], None]] = None) -> str:
+        """Generate summary from transcript and OCR text, streaming partial text to ``on_delta`` if given"""
         try:
+            if on_delta is not None:
+                return await self._stream_summary(transcript, ocr_text, on_delta)
+            
             # Run in thread pool to avoid blocking
             loop = asyncio.get_running_loop()
             summary = await loop.run_in_executor(
@@ -137,6 +174,22 @@ class VideoAnalysisPipeline:
             self.logger.error(f"Summary generation failed: {e}")
             raise PipelineError(f"Summary generation failed: {e}")
     
+    async def _stream_summary(self, transcript: str, ocr_text: str, on_delta: Callable[[str], None]) -> str:
+        """Stream the summary through the LLM handler with the synthesis agent's prompt and parameters"""
+        prompt = self.synthesis.prompt_manager.get_prompt("summary", transcript=transcript, ocr_text=ocr_text)
+        model = (self.config.get("llm_config") or {}).get("model", self.synthesis.model)
+        
+        summary = ""
+        async for delta in self.llm.stream_llm(
+            prompt, model, temperature=self.synthesis.temperature, max_tokens=self.synthesis.max_tokens
+        ):
+            summary += delta
+            on_delta(summary)
+        
+        summary = summary.strip()
+        self.logger.debug(f"Streamed summary: {len(summary)} characters")
+        return summary or "Nessuna sintesi generata"
+    
     async def _evaluate_content(self, summary: str, transcript: str, ocr_text: str) -> Dict[str, Any]:
         """Evaluate and score the content"""
         try:
@@ -197,6 +250,10 @@ class VideoAnalysisPipeline:
             # Don't raise here as export failure shouldn't fail the entire pipeline
             self.logger.warning("Continuing without export")
     
+    async def aclose(self):
+        """Close the LLM handler's pooled HTTP clients; call it before the event loop ends"""
+        await self.llm.aclose()
+    
     def get_pipeline_status(self) -> Dict[str, Any]:
         """Get current pipeline status"""
         return {
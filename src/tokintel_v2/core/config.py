@@ -23,6 +23,16 @@ class LLMConfig(BaseModel):
     max_retries: int = Field(default=3, ge=0, le=10, description="Maximum retry attempts")
     temperature: float = Field(default=0.7, ge=0.0, le=2.0, description="Model temperature")
     max_tokens: int = Field(default=500, ge=1, le=4000, description="Maximum tokens per response")
+    max_connections: int = Field(default=20, ge=1, le=1000, description="HTTP connections per LLM backend")
+    max_keepalive_connections: int = Field(default=10, ge=0, le=1000, description="Idle keep-alive connections kept per LLM backend")
+    keepalive_expiry: float = Field(default=30.0, ge=0.0, description="Seconds an idle connection is kept open")
+    http2: bool = Field(default=False, description="Use HTTP/2 for LLM calls (requires the h2 package)")
+    max_concurrent_requests: int = Field(default=4, ge=1, le=256, description="LLM calls in flight per backend")
+    requests_per_minute: Optional[int] = Field(default=None, ge=1, description="Request rate limit per backend (unlimited if unset)")
+    tokens_per_minute: Optional[int] = Field(default=None, ge=1, description="Estimated token rate limit per backend (unlimited if unset)")
+    cache_path: Optional[str] = Field(default="cache/llm_cache.db", description="SQLite LLM response cache (disabled if unset)")
+    cache_ttl: int = Field(default=604800, ge=1, description="Seconds a cached LLM response stays valid")
+    cache_memory_entries: int = Field(default=1024, ge=0, description="LLM responses kept in the in-memory LRU tier")
 
 class WeightsConfig(BaseModel):
     """Analysis weights configuration"""
@@ -58,6 +68,16 @@ class TokIntelConfig(BaseModel):
     # Processing settings
     frame_extraction_interval: int = Field(default=30, ge=1, le=300)
     max_video_duration: int = Field(default=300, ge=1, le=3600)  # 5 minutes default
+    frame_cache_dir: Optional[str] = Field(default=None, description="Directory for cached sampled frames (disabled if unset)")
+    frame_cache_max_mb: int = Field(default=2048, ge=1, description="Frame cache size cap in MB")
+    scene_threshold: Optional[float] = Field(default=None, ge=0.0, description="Scene change threshold for adaptive frame selection (disabled if unset)")
+    scene_candidate_interval: int = Field(default=5, ge=1, le=300, description="Frames between scene change candidates")
+    scene_max_gap: Optional[int] = Field(default=None, ge=1, description="Keep a frame at least every this many frames in adaptive mode")
+    ocr_concurrency: int = Field(default=2, ge=1, le=64, description="OCR calls in flight per pipeline")
+    ocr_global_concurrency: Optional[int] = Field(default=None, ge=1, le=256, description="OCR threads shared by all pipelines (default: CPU cores)")
+    ocr_cache_path: Optional[str] = Field(default="cache/ocr_cache.db", description="SQLite OCR cache shared across videos (disabled if unset)")
+    ocr_cache_max_entries: int = Field(default=50000, ge=1, description="OCR cache size cap in cached regions")
+    ocr_strategy: str = Field(default="regions", description="OCR strategy: regions or multires")
     
     # Logging settings
     log_level: str = Field(default="INFO", description="Logging level")
@@ -83,6 +103,14 @@ class TokIntelConfig(BaseModel):
             raise ValueError(f"Invalid language: {v}. Valid languages: {valid_languages}")
         return v
     
+    @validator('ocr_strategy')
+    def validate_ocr_strategy(cls, v):
+        """Validate OCR strategy"""
+        valid_strategies = ['regions', 'multires']
+        if v not in valid_strategies:
+            raise ValueError(f"Invalid OCR strategy: {v}. Valid strategies: {valid_strategies}")
+        return v
+    
     @validator('log_level')
     def validate_log_level(cls, v):
         """Validate log level"""
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+TokIntel v2 - Video Probe Cache
+Probes each video once and shares the result across validation, info and extraction
+"""
+
+from typing import Dict, List, Any, Optional, Tuple, Callable
+from collections import OrderedDict
+from pathlib import Path
+import threading
+import cv2
+from .exceptions import VideoProcessingError
+
+class ProbeCache:
+    """LRU cache of probe results keyed on (path, size, mtime).
+
+    A modified or replaced file gets a new key, so stale entries are never
+    served; they simply age out of the LRU. ``namespace`` separates probes
+    from different tools (e.g. OpenCV and ffprobe) for the same file.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        """Initialize empty cache"""
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(video_path: str, namespace: str = "opencv") -> Tuple:
+        """Cache key for the file as it is on disk right now"""
+        path = Path(video_path)
+        try:
+            stat = path.stat()
+        except OSError as e:
+            raise VideoProcessingError(f"Cannot stat video file {video_path}: {e}")
+        return (namespace, str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+
+    def get_or_probe(self, video_path: str, probe: Callable[[str], Dict[str, Any]],
+                     namespace: str = "opencv") -> Dict[str, Any]:
+        """Return the cached probe for ``video_path``, running ``probe`` on a miss"""
+        key = self.make_key(video_path, namespace)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(self._entries[key])
+            self.misses += 1
+
+        info = probe(video_path)
+        with self._lock:
+            self._entries[key] = dict(info)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return dict(info)
+
+    def clear(self):
+        """Drop all cached probes"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+# Process-wide cache shared by every stage of an analysis
+probe_cache = ProbeCache()
+
+def _probe_with_opencv(video_path: str) -> Dict[str, Any]:
+    """Open the video once and read all properties the pipeline needs"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise VideoProcessingError(f"Cannot open video file: {video_path}")
+
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+        codec = "".join(chr((fourcc >> (8 * i)) & 0xFF) for i in range(4)).strip("\x00 ")
+        return {
+            "fps": fps,
+            "frame_count": frame_count,
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            "duration": frame_count / fps if fps > 0 else 0,
+            "codec": codec,
+            # grab() only demuxes/decodes; no colour conversion is needed to know a frame exists
+            "has_frames": bool(cap.grab())
+        }
+    finally:
+        cap.release()
+
+def probe_video(video_path: str) -> Dict[str, Any]:
+    """Get fps, frame count, dimensions, duration, codec and readability of a video (cached)"""
+    return probe_cache.get_or_probe(video_path, _probe_with_opencv)
@@ -0,0 +1,150 @@
+"""
+LLM Response Cache Module
+Two-tier cache of LLM completions: in-memory LRU in front of a SQLite store with TTL
+"""
+
+from typing import Dict, Any, Optional
+from collections import OrderedDict
+from pathlib import Path
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+
+def cache_key(model: str, prompt: str, temperature: float, max_tokens: int) -> str:
+    """Cache key of a completion request: (model, prompt hash, temperature, max_tokens)"""
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    return hashlib.sha256(
+        json.dumps([model, prompt_hash, float(temperature), int(max_tokens)]).encode("utf-8")
+    ).hexdigest()
+
+
+class LLMResponseCache:
+    """Completion cache with an in-memory LRU tier and a persistent SQLite tier.
+
+    Entries expire ``ttl_seconds`` after they were stored, in both tiers.
+    Memory hits skip SQLite entirely; SQLite hits are promoted to memory.
+    Thread-safe: the synthesis agent calls it from executor threads.
+    """
+
+    def __init__(self, db_path: str = "cache/llm_cache.db", ttl_seconds: float = 7 * 24 * 3600,
+                 max_memory_entries: int = 1024):
+        """Open (or create) the cache database"""
+        if ttl_seconds <= 0:
+            raise ValueError(f"ttl_seconds must be > 0, got {ttl_seconds}")
+        if max_memory_entries < 0:
+            raise ValueError(f"max_memory_entries must be >= 0, got {max_memory_entries}")
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_entries = max_memory_entries
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            response TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )''')
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_expires_at ON llm_cache (expires_at)")
+        self._conn.commit()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, response: str, expires_at: float):
+        """Insert into the memory tier, evicting the least recently used entries"""
+        if not self.max_memory_entries:
+            return
+        self._memory[key] = (response, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached response for a key, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return entry[0]
+                del self._memory[key]
+
+            row = self._conn.execute(
+                "SELECT response, expires_at FROM llm_cache WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._remember(key, row[0], row[1])
+            self.disk_hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str):
+        """Store a response in both tiers and drop expired rows"""
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        with self._lock:
+            self._remember(key, response, expires_at)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response, expires_at) VALUES (?, ?, ?)",
+                (key, response, expires_at)
+            )
+            self._conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+            self._conn.commit()
+
+    def clear(self):
+        """Delete every cached response"""
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+            self.memory_hits = 0
+            self.disk_hits = 0
+            self.misses = 0
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            entries = self._conn.execute(
+                "SELECT COUNT(*) FROM llm_cache WHERE expires_at > ?", (time.time(),)
+            ).fetchone()[0]
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "entries": entries,
+                "memory_entries": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "hits": self.memory_hits + self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+            }
+
+
+# Caches shared per database file, so the handler and the agents see the same memory tier
+_caches: Dict[str, LLMResponseCache] = {}
+_caches_lock = threading.Lock()
+
+def get_llm_cache(db_path: str = "cache/llm_cache.db", ttl_seconds: float = 7 * 24 * 3600,
+                  max_memory_entries: int = 1024) -> LLMResponseCache:
+    """Return the process-wide cache for ``db_path``, opening it on first use
+
+    The first caller fixes the TTL and memory size of a given file.
+    """
+    path = str(Path(db_path).resolve())
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = _caches[path] = LLMResponseCache(db_path, ttl_seconds, max_memory_entries)
+        return cache
@@ -3,15 +3,18 @@ LLM Handler Module
 Centralized LLM call management with retries, timeouts, and model switching
 """
 
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple, Union, AsyncIterator
 import logging
 logger = logging.getLogger(__name__)
 import asyncio
 import time
 import json
-import requests
+from functools import wraps
+import httpx
 from core.logger import setup_logger
 from core.exceptions import LLMError
+from llm.rate_limit import BackendLimiter, estimate_tokens, get_backend_limiter
+from llm.cache import LLMResponseCache, cache_key, get_llm_cache
 
 # Try to import OpenAI for async support
 try:
@@ -21,8 +24,23 @@ except ImportError:
     OPENAI_AVAILABLE = False
     AsyncOpenAI = None
 
+# HTTP/2 needs the optional h2 package (pip install httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
 logger = setup_logger(__name__)
 
+# Model names that always mean a local server
+LOCAL_MODEL_INDICATORS = ("localhost", "127.0.0.1", "local", "ollama", "lmstudio")
+
+def is_local_backend(model: str, endpoint: Optional[str]) -> bool:
+    """Routing rule shared by every LLM caller: a configured endpoint or a local model name means
+    the local (OpenAI-compatible) server, anything else goes to OpenAI"""
+    return bool(endpoint) or any(indicator in model.lower() for indicator in LOCAL_MODEL_INDICATORS)
+
 def async_retry(max_retries: int = 3, base_delay: float = 1.0, max_delay: float = 60.0):
     """Decorator for async retry logic with exponential backoff"""
     def decorator(func):
@@ -50,8 +68,12 @@ def async_retry(max_retries: int = 3, base_delay: float = 1.0, max_delay: float
 class LLMHandler:
     """Centralized LLM call handler with retry logic and timeout management"""
     
-    def __init__(self, config: Dict[str, Any]):
-        """Initialize LLM handler with configuration"""
+    def __init__(self, config: Dict[str, Any], cache: Optional[LLMResponseCache] = None):
+        """Initialize LLM handler with configuration
+        
+        Responses are cached in ``cache``, or in the shared cache at
+        ``config["cache_path"]`` when set; otherwise caching is off.
+        """
         self.config = config
         self.model = config.get("model", "gpt-4")
         self.endpoint = config.get("endpoint", None)
@@ -60,11 +82,188 @@ class LLMHandler:
         self.max_retries = config.get("max_retries", 3)
         self.temperature = config.get("temperature", 0.7)
         self.max_tokens = config.get("max_tokens", 500)
+        self.max_connections = config.get("max_connections", 20)
+        self.max_keepalive_connections = config.get("max_keepalive_connections", 10)
+        self.keepalive_expiry = config.get("keepalive_expiry", 30.0)
+        self.http2 = config.get("http2", False)
+        self.max_concurrent_requests = config.get("max_concurrent_requests", 4)
+        self.requests_per_minute = config.get("requests_per_minute", None)
+        self.tokens_per_minute = config.get("tokens_per_minute", None)
+        if self.http2 and not HTTP2_AVAILABLE:
+            logger.warning("h2 not installed, falling back to HTTP/1.1. Install with: pip install httpx[http2]")
+            self.http2 = False
+        
+        # Long-lived pooled clients, one per backend, bound to the event loop that created them.
+        # Keep-alive connections are only reused within that loop: a call from another loop
+        # (e.g. a second asyncio.run) starts new clients, see _bind_loop
+        self._http_clients: Dict[str, httpx.AsyncClient] = {}
+        # Clients of a previous, still open loop, closed by aclose()
+        self._stale_clients: List[httpx.AsyncClient] = []
+        self._openai_client = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        # Concurrency and rate limits per backend, shared with every handler using the same server
+        self._limiters: Dict[str, BackendLimiter] = {}
+        # Upstream calls in flight by cache key, joined by identical concurrent requests
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._waiters: Dict[str, int] = {}
+        self.coalesced_calls = 0
+        
+        self.cache = cache
+        if self.cache is None and config.get("cache_path"):
+            self.cache = get_llm_cache(
+                config["cache_path"],
+                config.get("cache_ttl", 7 * 24 * 3600),
+                config.get("cache_memory_entries", 1024)
+            )
+        
+        # Streaming metrics: time to first token and generation rate, summed over streams
+        self._stream_stats = {"streams": 0, "timed_streams": 0, "ttft_total": 0.0, "tokens": 0,
+                              "generation_time": 0.0, "last_ttft": None, "last_tokens_per_second": None}
         
         logger.info(f"LLM Handler initialized with model: {self.model}")
     
-    @async_retry(max_retries=3)
+    def _bind_loop(self):
+        """Drop clients and in-flight requests of another event loop (e.g. of a previous asyncio.run)"""
+        loop = asyncio.get_running_loop()
+        if self._client_loop is not loop:
+            if self._http_clients:
+                logger.debug("Event loop changed, recreating LLM HTTP clients")
+                self._retire_clients(self._client_loop, list(self._http_clients.values()))
+            self._http_clients = {}
+            self._openai_client = None
+            self._inflight = {}
+            self._waiters = {}
+            self._client_loop = loop
+    
+    def _retire_clients(self, old_loop: asyncio.AbstractEventLoop, clients: List[httpx.AsyncClient]):
+        """Close clients of a previous event loop on that loop, where it still allows it"""
+        if old_loop.is_running():
+            # Handler shared with a loop running in another thread
+            for client in clients:
+                asyncio.run_coroutine_threadsafe(client.aclose(), old_loop)
+        elif not old_loop.is_closed():
+            self._stale_clients.extend(clients)
+        else:
+            # Their sockets belong to a closed loop and can no longer be shut down cleanly
+            logger.warning(f"Dropping {len(clients)} LLM HTTP client(s) of a closed event loop without closing "
+                           f"them; call aclose() (or use 'async with LLMHandler(...)') before the loop ends")
+    
+    def _get_limiter(self, backend: str) -> BackendLimiter:
+        """Get the concurrency/rate limiter of a backend, shared process-wide per endpoint"""
+        limiter = self._limiters.get(backend)
+        if limiter is None:
+            limiter = get_backend_limiter(
+                backend, self.endpoint if backend == "local" else None,
+                self.max_concurrent_requests, self.requests_per_minute, self.tokens_per_minute
+            )
+            self._limiters[backend] = limiter
+        return limiter
+    
+    def _get_http_client(self, backend: str) -> httpx.AsyncClient:
+        """Get the keep-alive HTTP client of a backend ("local" or "openai"), creating it on first use"""
+        self._bind_loop()
+        client = self._http_clients.get(backend)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                http2=self.http2,
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=self.keepalive_expiry
+                )
+            )
+            self._http_clients[backend] = client
+            if backend == "openai":
+                self._openai_client = None
+        return client
+    
+    def _get_openai_client(self):
+        """Get the AsyncOpenAI client, sharing the pooled "openai" HTTP client"""
+        http_client = self._get_http_client("openai")
+        if self._openai_client is None:
+            self._openai_client = AsyncOpenAI(api_key=self.api_key, http_client=http_client)
+        return self._openai_client
+    
+    async def aclose(self):
+        """Close the pooled HTTP clients, including those left over from a previous event loop"""
+        clients = list(self._http_clients.values())
+        stale, self._stale_clients = self._stale_clients, []
+        self._http_clients = {}
+        self._openai_client = None
+        for client in clients:
+            await client.aclose()
+        for client in stale:
+            try:
+                await client.aclose()
+            except RuntimeError as e:
+                # Their loop was closed in the meantime
+                logger.debug(f"Could not close LLM HTTP client of a previous event loop: {e}")
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        await self.aclose()
+    
     async def call_llm(self, prompt: str, model: Optional[str] = None, **kwargs) -> str:
+        """Make LLM call, answered from the response cache when the same request was seen before
+        
+        Concurrent identical requests (same cache key) share one upstream
+        call; every caller gets its result or its exception. The shared call
+        is cancelled once every caller waiting for it has been cancelled.
+        """
+        target_model = model or self.model
+        key = cache_key(
+            target_model, prompt,
+            kwargs.get("temperature", self.temperature),
+            kwargs.get("max_tokens", self.max_tokens)
+        )
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                logger.debug(f"LLM cache hit for model: {target_model}")
+                return cached
+        
+        self._bind_loop()
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._call_and_cache(key, prompt, target_model, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._request_done(key, done))
+        else:
+            self.coalesced_calls += 1
+            logger.debug(f"Joining identical in-flight LLM request for model: {target_model}")
+        
+        # Shielded: a cancelled caller does not cancel the call the other waiters depend on...
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+                # ...but once nobody is waiting, the call is abandoned (e.g. a batch stopped early)
+                if not task.done():
+                    task.cancel()
+    
+    async def _call_and_cache(self, key: str, prompt: str, model: str, **kwargs) -> str:
+        """Upstream call shared by coalesced requests; stores the result in the cache"""
+        result = await self._call_llm_with_retry(prompt, model, **kwargs)
+        if self.cache is not None and result.strip():
+            self.cache.put(key, result)
+        return result
+    
+    def _request_done(self, key: str, task: asyncio.Future):
+        """Forget a finished in-flight request"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved even if every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+    
+    @async_retry(max_retries=3)
+    async def _call_llm_with_retry(self, prompt: str, model: Optional[str] = None, **kwargs) -> str:
         """Make LLM call with automatic model selection and retry logic"""
         start_time = time.time()
         
@@ -75,10 +274,15 @@ class LLMHandler:
             logger.debug(f"Making LLM call with model: {target_model}")
             
             # Determine if local or remote
-            if self._is_local_model(target_model):
-                result = await self._call_local_llm(prompt, target_model, **kwargs)
-            else:
-                result = await self._call_openai_llm(prompt, target_model, **kwargs)
+            backend = "local" if self._is_local_model(target_model) else "openai"
+            tokens = estimate_tokens(prompt, kwargs.get("max_tokens", self.max_tokens))
+            
+            # Wait for a free slot and for the backend's request/token budget
+            async with self._get_limiter(backend).slot(tokens):
+                if backend == "local":
+                    result = await self._call_local_llm(prompt, target_model, **kwargs)
+                else:
+                    result = await self._call_openai_llm(prompt, target_model, **kwargs)
             
             processing_time = time.time() - start_time
             logger.debug(f"LLM call completed in {processing_time:.2f}s")
@@ -92,8 +296,7 @@ class LLMHandler:
     
     def _is_local_model(self, model: str) -> bool:
         """Check if model should be called locally"""
-        local_indicators = ["localhost", "127.0.0.1", "local", "ollama", "lmstudio"]
-        return any(indicator in model.lower() for indicator in local_indicators) or self.endpoint
+        return is_local_backend(model, self.endpoint)
     
     async def _call_openai_llm(self, prompt: str, model: str, **kwargs) -> str:
         """Call OpenAI API asynchronously"""
@@ -103,7 +306,7 @@ class LLMHandler:
             
             logger.debug(f"Calling OpenAI API with model: {model}")
             
-            client = AsyncOpenAI(api_key=self.api_key)
+            client = self._get_openai_client()
             
             response = await client.chat.completions.create(
                 model=model,
@@ -125,7 +328,7 @@ class LLMHandler:
             raise LLMError(f"OpenAI API call failed: {e}")
     
     async def _call_local_llm(self, prompt: str, model: str, **kwargs) -> str:
-        """Call local LLM asynchronously"""
+        """Call local LLM (OpenAI-compatible server, e.g. LM Studio) over the pooled async client"""
         try:
             endpoint = kwargs.get("endpoint", self.endpoint)
             if not endpoint:
@@ -133,28 +336,8 @@ class LLMHandler:
             
             logger.debug(f"Calling local LLM at: {endpoint}")
             
-            # Run in thread pool to avoid blocking
-            loop = asyncio.get_running_loop()
-            result = await loop.run_in_executor(
-                None,
-                self._call_local_llm_sync,
-                prompt,
-                endpoint,
-                model,
-                kwargs
-            )
-            
-            logger.debug("Local LLM call successful")
-            return result
-            
-        except Exception as e:
-            logger.error(f"Local LLM call failed: {e}")
-            raise LLMError(f"Local LLM call failed: {e}")
-    
-    def _call_local_llm_sync(self, prompt: str, endpoint: str, model: str, kwargs: Dict[str, Any]) -> str:
-        """Synchronous local LLM call (runs in thread pool)"""
-        try:
-            response = requests.post(
+            client = self._get_http_client("local")
+            response = await client.post(
                 endpoint,
                 json={
                     "model": model,
@@ -171,41 +354,184 @@ class LLMHandler:
             data = response.json()
             result = data["choices"][0]["message"]["content"].strip()
             
+            logger.debug("Local LLM call successful")
             return result
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
+            logger.error(f"Local LLM request failed: {e}")
             raise LLMError(f"Local LLM request failed: {e}")
         except Exception as e:
+            logger.error(f"Local LLM call failed: {e}")
             raise LLMError(f"Local LLM call failed: {e}")
     
+    async def stream_llm(self, prompt: str, model: Optional[str] = None, **kwargs) -> AsyncIterator[str]:
+        """Yield completion text deltas as the backend generates them
+        
+        Records time-to-first-token and tokens/sec (one streamed chunk is
+        counted as one token). A cached response is yielded in one piece.
+        Streams are not retried, since part of the output may already be shown.
+        """
+        target_model = model or self.model
+        key = None
+        if self.cache is not None:
+            key = cache_key(
+                target_model, prompt,
+                kwargs.get("temperature", self.temperature),
+                kwargs.get("max_tokens", self.max_tokens)
+            )
+            cached = self.cache.get(key)
+            if cached is not None:
+                logger.debug(f"LLM cache hit for model: {target_model}")
+                yield cached
+                return
+        
+        backend = "local" if self._is_local_model(target_model) else "openai"
+        tokens = estimate_tokens(prompt, kwargs.get("max_tokens", self.max_tokens))
+        parts: List[str] = []
+        first_token: Optional[float] = None
+        
+        try:
+            async with self._get_limiter(backend).slot(tokens):
+                start_time = time.monotonic()
+                if backend == "local":
+                    deltas = self._stream_local_llm(prompt, target_model, **kwargs)
+                else:
+                    deltas = self._stream_openai_llm(prompt, target_model, **kwargs)
+                async for delta in deltas:
+                    if first_token is None:
+                        first_token = time.monotonic() - start_time
+                    parts.append(delta)
+                    yield delta
+                total_time = time.monotonic() - start_time
+        except LLMError:
+            raise
+        except Exception as e:
+            logger.error(f"LLM stream failed: {e}")
+            raise LLMError(f"LLM stream failed: {e}")
+        
+        self._record_stream(first_token, len(parts), total_time)
+        text = "".join(parts).strip()
+        # An empty completion is a backend hiccup, not an answer worth replaying
+        if key is not None and text:
+            self.cache.put(key, text)
+    
+    def _record_stream(self, first_token: Optional[float], tokens: int, total_time: float):
+        """Update streaming metrics after a completed stream"""
+        stats = self._stream_stats
+        stats["streams"] += 1
+        stats["tokens"] += tokens
+        if first_token is None:
+            return
+        generation_time = total_time - first_token
+        stats["timed_streams"] += 1
+        stats["ttft_total"] += first_token
+        stats["generation_time"] += generation_time
+        stats["last_ttft"] = first_token
+        stats["last_tokens_per_second"] = tokens / generation_time if generation_time > 0 else None
+        logger.debug(f"LLM stream: first token after {first_token:.2f}s, {tokens} tokens in {total_time:.2f}s")
+    
+    async def _stream_openai_llm(self, prompt: str, model: str, **kwargs) -> AsyncIterator[str]:
+        """Stream an OpenAI chat completion"""
+        if not OPENAI_AVAILABLE:
+            raise LLMError("OpenAI library not installed. Install with: pip install openai")
+        
+        client = self._get_openai_client()
+        try:
+            stream = await client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=kwargs.get("temperature", self.temperature),
+                max_tokens=kwargs.get("max_tokens", self.max_tokens),
+                timeout=kwargs.get("timeout", self.timeout),
+                stream=True
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            logger.error(f"OpenAI API stream failed: {e}")
+            raise LLMError(f"OpenAI API stream failed: {e}")
+    
+    async def _stream_local_llm(self, prompt: str, model: str, **kwargs) -> AsyncIterator[str]:
+        """Stream a chat completion from an OpenAI-compatible local server (server-sent events)"""
+        endpoint = kwargs.get("endpoint", self.endpoint)
+        if not endpoint:
+            raise LLMError("No local endpoint configured")
+        
+        client = self._get_http_client("local")
+        try:
+            async with client.stream(
+                "POST",
+                endpoint,
+                json={
+                    "model": model,
+                    "messages": [{"role": "user", "content": prompt}],
+                    "temperature": kwargs.get("temperature", self.temperature),
+                    "max_tokens": kwargs.get("max_tokens", self.max_tokens),
+                    "stream": True
+                },
+                timeout=kwargs.get("timeout", self.timeout)
+            ) as response:
+                if response.status_code != 200:
+                    body = (await response.aread()).decode(errors="replace")
+                    raise LLMError(f"Local LLM API error: {response.status_code} - {body}")
+                
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    choices = json.loads(data).get("choices") or []
+                    delta = choices[0].get("delta", {}).get("content") if choices else None
+                    if delta:
+                        yield delta
+        except LLMError:
+            raise
+        except (httpx.HTTPError, json.JSONDecodeError) as e:
+            logger.error(f"Local LLM stream failed: {e}")
+            raise LLMError(f"Local LLM stream failed: {e}")
+    
+    async def batch_call_llm_iter(self, prompts: list, model: Optional[str] = None,
+                                  **kwargs) -> AsyncIterator[Tuple[int, Union[str, Exception]]]:
+        """Yield (prompt index, result or exception) as calls complete
+        
+        Every prompt is queued at once, but calls only go out as fast as the
+        backend's concurrency limit and request/token buckets allow.
+        """
+        async def run(index: int, prompt: str) -> Tuple[int, Union[str, Exception]]:
+            try:
+                return index, await self.call_llm(prompt, model, **kwargs)
+            except Exception as e:
+                return index, e
+        
+        tasks = [asyncio.create_task(run(i, prompt)) for i, prompt in enumerate(prompts)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Consumer stopped early: do not leave queued calls running
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+    
     async def batch_call_llm(self, prompts: list, model: Optional[str] = None, **kwargs) -> list:
-        """Make multiple LLM calls concurrently"""
+        """Make multiple LLM calls concurrently, within the backend limits; results keep prompt order"""
         logger.info(f"Making batch LLM calls for {len(prompts)} prompts")
         start_time = time.time()
         
         try:
-            # Create tasks for concurrent execution
-            tasks = [
-                self.call_llm(prompt, model, **kwargs) 
-                for prompt in prompts
-            ]
-            
-            # Execute all tasks concurrently
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+            results: List[Union[str, Exception]] = [None] * len(prompts)
+            failed = 0
             
-            # Process results
-            successful_results = []
-            failed_results = []
-            
-            for i, result in enumerate(results):
+            async for index, result in self.batch_call_llm_iter(prompts, model, **kwargs):
+                results[index] = result
                 if isinstance(result, Exception):
-                    failed_results.append((i, str(result)))
-                    logger.error(f"Prompt {i} failed: {result}")
-                else:
-                    successful_results.append(result)
+                    failed += 1
+                    logger.error(f"Prompt {index} failed: {result}")
             
             processing_time = time.time() - start_time
-            logger.info(f"Batch LLM calls completed in {processing_time:.2f}s: {len(successful_results)} successful, {len(failed_results)} failed")
+            logger.info(f"Batch LLM calls completed in {processing_time:.2f}s: {len(prompts) - failed} successful, {failed} failed")
             
             return results
             
@@ -223,8 +549,10 @@ class LLMHandler:
             self.model = updates["model"]
         if "endpoint" in updates:
             self.endpoint = updates["endpoint"]
+            self._limiters = {}
         if "api_key" in updates:
             self.api_key = updates["api_key"]
+            self._openai_client = None
         if "timeout" in updates:
             self.timeout = updates["timeout"]
         if "max_retries" in updates:
@@ -233,6 +561,10 @@ class LLMHandler:
             self.temperature = updates["temperature"]
         if "max_tokens" in updates:
             self.max_tokens = updates["max_tokens"]
+        for key in ("max_concurrent_requests", "requests_per_minute", "tokens_per_minute"):
+            if key in updates:
+                setattr(self, key, updates[key])
+                self._limiters = {}
         
         logger.info("LLM Handler configuration updated")
     
@@ -244,7 +576,28 @@ class LLMHandler:
             "timeout": self.timeout,
             "max_retries": self.max_retries,
             "temperature": self.temperature,
-            "max_tokens": self.max_tokens
+            "max_tokens": self.max_tokens,
+            "http2": self.http2,
+            "max_connections": self.max_connections,
+            "max_keepalive_connections": self.max_keepalive_connections,
+            "http_clients": sorted(self._http_clients),
+            "limits": {backend: limiter.get_stats() for backend, limiter in self._limiters.items()},
+            "cache": self.cache.get_stats() if self.cache is not None else None,
+            "in_flight_requests": len(self._inflight),
+            "coalesced_calls": self.coalesced_calls,
+            "streaming": self.get_stream_stats()
+        }
+    
+    def get_stream_stats(self) -> Dict[str, Any]:
+        """Get streaming metrics (averages over streams that produced output)"""
+        stats = self._stream_stats
+        timed = stats["generation_time"]
+        return {
+            "streams": stats["streams"],
+            "avg_ttft": stats["ttft_total"] / stats["timed_streams"] if stats["timed_streams"] else None,
+            "last_ttft": stats["last_ttft"],
+            "tokens_per_second": stats["tokens"] / timed if timed > 0 else None,
+            "last_tokens_per_second": stats["last_tokens_per_second"]
         }
 
 class LLMFactory:
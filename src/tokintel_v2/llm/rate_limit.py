@@ -0,0 +1,185 @@
+"""
+LLM Rate Limiting Module
+Per-backend concurrency limit plus requests-per-minute and tokens-per-minute buckets
+"""
+
+from typing import Dict, Any, Optional, Tuple, Deque
+from collections import deque
+from contextlib import asynccontextmanager
+import asyncio
+import threading
+import time
+
+
+def estimate_tokens(prompt: str, max_tokens: int) -> int:
+    """Rough token cost of a call: ~4 characters per prompt token plus the completion budget"""
+    return len(prompt) // 4 + 1 + max_tokens
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at ``per_minute`` tokens per minute.
+
+    The bucket holds at most one minute's worth of tokens, so an idle
+    backend can absorb a burst but the sustained rate never exceeds the
+    limit. Callers reserve tokens up front (the balance may go negative)
+    and sleep off the debt, so waiters are served in arrival order and the
+    bucket can be shared by handlers running on different event loops.
+    """
+
+    def __init__(self, per_minute: float):
+        """Initialize a full bucket"""
+        if per_minute <= 0:
+            raise ValueError(f"per_minute must be > 0, got {per_minute}")
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1) -> float:
+        """Take ``amount`` tokens, sleeping until they are available; returns the time waited"""
+        # A single call larger than the bucket would never fit: let it through on a full bucket
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            self.tokens -= amount
+            delay = max(0.0, -self.tokens / self.rate)
+        if delay:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                # The call will not be made: give the reservation back
+                with self._lock:
+                    self.tokens += amount
+                raise
+        return delay
+
+
+class SharedSemaphore:
+    """Counting semaphore usable from several event loops (and threads) at once.
+
+    ``asyncio.Semaphore`` binds to the loop that first waits on it; this one
+    hands a released slot to the oldest waiter on whatever loop it runs.
+    """
+
+    def __init__(self, value: int):
+        """Initialize with ``value`` free slots"""
+        self._value = value
+        self._lock = threading.Lock()
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+
+    async def acquire(self):
+        """Wait for a free slot"""
+        with self._lock:
+            if self._value > 0 and not self._waiters:
+                self._value -= 1
+                return
+            loop = asyncio.get_running_loop()
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            # The slot was already handed over: pass it on
+            self.release()
+            raise
+
+    def release(self):
+        """Free a slot, waking the oldest waiter if any"""
+        with self._lock:
+            while self._waiters:
+                loop, future = self._waiters.popleft()
+                if not loop.is_closed():
+                    loop.call_soon_threadsafe(_grant, future)
+                    return
+            self._value += 1
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+
+def _grant(future: asyncio.Future):
+    """Wake a semaphore waiter on its own loop (unless it was cancelled meanwhile)"""
+    if not future.done():
+        future.set_result(None)
+
+
+class BackendLimiter:
+    """Concurrency and rate limits of one LLM backend, safe to share across handlers and event loops"""
+
+    def __init__(self, max_concurrent: int = 4, requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None):
+        """Initialize limiter; ``None`` rates are unlimited"""
+        if max_concurrent < 1:
+            raise ValueError(f"max_concurrent must be >= 1, got {max_concurrent}")
+        self.max_concurrent = max_concurrent
+        self._semaphore = SharedSemaphore(max_concurrent)
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.in_flight = 0
+        self.calls = 0
+        self.wait_time = 0.0
+        self._stats_lock = threading.Lock()
+
+    @asynccontextmanager
+    async def slot(self, tokens: int = 0):
+        """Hold a concurrency slot and pay one request and ``tokens`` tokens for the call"""
+        start = time.monotonic()
+        async with self._semaphore:
+            # Buckets are charged once a slot is held, i.e. right before the request goes out
+            if self.requests is not None:
+                await self.requests.acquire(1)
+            if self.tokens is not None and tokens:
+                await self.tokens.acquire(tokens)
+            with self._stats_lock:
+                self.wait_time += time.monotonic() - start
+                self.in_flight += 1
+                self.calls += 1
+            try:
+                yield
+            finally:
+                with self._stats_lock:
+                    self.in_flight -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get limiter statistics"""
+        return {
+            "max_concurrent": self.max_concurrent,
+            "requests_per_minute": self.requests.capacity if self.requests else None,
+            "tokens_per_minute": self.tokens.capacity if self.tokens else None,
+            "in_flight": self.in_flight,
+            "calls": self.calls,
+            "wait_time": round(self.wait_time, 3)
+        }
+
+
+# Limiters shared per backend and endpoint, so every handler talking to the same server
+# (pipeline, chat, ...) draws from one budget
+_limiters: Dict[Tuple[Any, ...], BackendLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_backend_limiter(backend: str, endpoint: Optional[str] = None, max_concurrent: int = 4,
+                        requests_per_minute: Optional[float] = None,
+                        tokens_per_minute: Optional[float] = None) -> BackendLimiter:
+    """Return the process-wide limiter of ``backend`` at ``endpoint``, creating it on first use
+
+    Handlers configured with different limits for the same server get separate limiters.
+    """
+    key = (backend, endpoint or None, max_concurrent, requests_per_minute, tokens_per_minute)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = BackendLimiter(max_concurrent, requests_per_minute, tokens_per_minute)
+        return limiter
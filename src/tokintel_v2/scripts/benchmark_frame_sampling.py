@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+[INFO] Frame Sampling Benchmark - TokIntel v2
+Compares ScraperAgent sampling modes (grab / seek) and the ffmpeg pipe backend against the full-decode path,
+and frame memory of full-resolution BGR lists against pooled downscaled gray frames
+"""
+
+import sys
+import time
+import argparse
+import logging
+import tempfile
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Any, Tuple
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agent.scraper import ScraperAgent, SAMPLING_MODES
+from agent.frame_pool import FrameBufferPool
+from agent.ffmpeg_decoder import FFmpegFrameReader
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def create_synthetic_video(path: Path, width: int = 1080, height: int = 1920,
+                           fps: float = 30.0, seconds: int = 10) -> Path:
+    """Write a synthetic portrait clip with moving content for repeatable runs"""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"Cannot create synthetic video: {path}")
+
+    try:
+        for index in range(int(fps * seconds)):
+            frame = np.full((height, width, 3), index % 255, dtype=np.uint8)
+            cv2.putText(frame, f"frame {index}", (50, height // 2), cv2.FONT_HERSHEY_SIMPLEX,
+                        3, (255, 255, 255), 5)
+            writer.write(frame)
+    finally:
+        writer.release()
+    return path
+
+def benchmark(video_path: str, every_n_frames: int, repeats: int) -> List[Dict[str, Any]]:
+    """Run each sampling mode (plus the ffmpeg backend, if installed) and return best-of-N timings"""
+    results = []
+    variants = [(mode, {"sampling_mode": mode}) for mode in SAMPLING_MODES]
+    if FFmpegFrameReader().is_available():
+        variants.append(("ffmpeg", {"decoder_backend": "ffmpeg"}))
+    for mode, options in variants:
+        agent = ScraperAgent(every_n_frames=every_n_frames, **options)
+        agent.logger.setLevel(logging.WARNING)
+
+        timings = []
+        frame_count = 0
+        for _ in range(repeats):
+            start = time.perf_counter()
+            frames = agent._extract_frames_sync(video_path, every_n_frames)
+            timings.append(time.perf_counter() - start)
+            frame_count = len(frames)
+
+        results.append({"mode": mode, "frames": frame_count, "seconds": min(timings)})
+
+    baseline = next(r["seconds"] for r in results if r["mode"] == "decode")
+    for result in results:
+        result["speedup"] = baseline / result["seconds"] if result["seconds"] > 0 else 0.0
+    return results
+
+def measure_allocations(video_path: str, every_n_frames: int, target_size: Tuple[int, int],
+                        color_mode: str) -> List[Dict[str, Any]]:
+    """Frame bytes allocated and peak traced memory per video, before and after pooling"""
+    results = []
+
+    agent = ScraperAgent(every_n_frames=every_n_frames)
+    agent.logger.setLevel(logging.WARNING)
+    tracemalloc.start()
+    frames = agent._extract_frames_sync(video_path, every_n_frames)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results.append({
+        "config": "bgr full-res list",
+        "frames": len(frames),
+        "allocated_bytes": sum(frame.nbytes for frame in frames),
+        "peak_bytes": peak
+    })
+    del frames
+
+    agent = ScraperAgent(every_n_frames=every_n_frames, target_size=target_size, color_mode=color_mode)
+    agent.logger.setLevel(logging.WARNING)
+    cap = cv2.VideoCapture(video_path)
+    tracemalloc.start()
+    try:
+        pool = FrameBufferPool(agent._output_shape(cap), capacity=2)
+        count = 0
+        for _, frame in agent._iter_sampled_frames(cap, every_n_frames, pool):
+            count += 1
+            pool.release(frame)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        cap.release()
+    results.append({
+        "config": f"{color_mode} {target_size[0]}x{target_size[1]} pooled",
+        "frames": count,
+        "allocated_bytes": pool.get_stats()["allocated_bytes"],
+        "peak_bytes": peak
+    })
+    return results
+
+def benchmark_batch(video_path: str, every_n_frames: int, copies: int) -> List[Dict[str, Any]]:
+    """Time batch_extract_frames on ``copies`` copies of the video with each executor"""
+    import asyncio
+
+    results = []
+    video_paths = [video_path] * copies
+    for executor in ("thread", "process"):
+        agent = ScraperAgent(every_n_frames=every_n_frames, batch_executor=executor)
+        agent.logger.setLevel(logging.WARNING)
+        start = time.perf_counter()
+        outcome = asyncio.run(agent.batch_extract_frames(video_paths, every_n_frames))
+        results.append({
+            "executor": executor,
+            "videos": len(video_paths) - len(outcome["failed"]),
+            "seconds": time.perf_counter() - start
+        })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ScraperAgent frame sampling modes")
+    parser.add_argument("video", nargs="?", help="Video to benchmark (default: synthetic 1080x1920 clip)")
+    parser.add_argument("--every-n-frames", type=int, default=30)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seconds", type=int, default=10, help="Length of the synthetic clip")
+    parser.add_argument("--memory", action="store_true", help="Also report frame bytes allocated per video")
+    parser.add_argument("--target-size", type=int, nargs=2, default=(540, 960), metavar=("WIDTH", "HEIGHT"))
+    parser.add_argument("--color-mode", default="gray")
+    parser.add_argument("--batch", type=int, default=0, metavar="COPIES",
+                        help="Also time batch extraction of COPIES videos per executor")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        video_path = args.video
+        if not video_path:
+            video_path = str(create_synthetic_video(Path(tmp_dir) / "synthetic.mp4", seconds=args.seconds))
+            logger.info(f"[INFO] Using synthetic video: {video_path}")
+
+        results = benchmark(video_path, args.every_n_frames, args.repeats)
+        memory = None
+        if args.memory:
+            memory = measure_allocations(video_path, args.every_n_frames, tuple(args.target_size), args.color_mode)
+        batch = benchmark_batch(video_path, args.every_n_frames, args.batch) if args.batch else None
+
+    print(f"{'mode':<8} {'frames':>7} {'seconds':>9} {'speedup':>8}")
+    for result in results:
+        print(f"{result['mode']:<8} {result['frames']:>7} {result['seconds']:>9.3f} {result['speedup']:>7.2f}x")
+
+    if memory:
+        print()
+        print(f"{'config':<24} {'frames':>7} {'allocated MB':>13} {'peak MB':>9}")
+        for result in memory:
+            print(f"{result['config']:<24} {result['frames']:>7} "
+                  f"{result['allocated_bytes'] / 1e6:>13.1f} {result['peak_bytes'] / 1e6:>9.1f}")
+
+    if batch:
+        print()
+        print(f"{'executor':<9} {'videos':>7} {'seconds':>9}")
+        for result in batch:
+            print(f"{result['executor']:<9} {result['videos']:>7} {result['seconds']:>9.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Test per FFmpegFrameReader - backend di decodifica via pipe ffmpeg
+"""
+
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+# Aggiungi il path del progetto
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import agent.ffmpeg_decoder as ffmpeg_decoder
+from agent.ffmpeg_decoder import FFmpegFrameReader
+from agent.scraper import ScraperAgent
+from core.exceptions import VideoProcessingError
+
+requires_ffmpeg = pytest.mark.skipif(
+    shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None,
+    reason="ffmpeg/ffprobe non installati"
+)
+
+
+FAKE_FFMPEG = """#!{python}
+import sys
+# Finto ffmpeg: {frames} frame gray 4x2, {stderr} byte su stderr, poi esce con {code}
+sys.stderr.write("x" * {stderr})
+sys.stderr.flush()
+for index in range({frames}):
+    sys.stdout.buffer.write(bytes([index]) * 8)
+sys.stdout.flush()
+sys.exit({code})
+"""
+
+
+def fake_reader(tmp_path, monkeypatch, frames=3, stderr=0, code=0):
+    """FFmpegFrameReader che esegue uno script al posto di ffmpeg (niente ffprobe: probe finto)"""
+    script = tmp_path / "ffmpeg"
+    script.write_text(FAKE_FFMPEG.format(python=sys.executable, frames=frames, stderr=stderr, code=code))
+    script.chmod(0o755)
+    reader = FFmpegFrameReader(ffmpeg_path=str(script))
+    monkeypatch.setattr(reader, "probe", lambda path: {"fps": 30.0, "width": 4, "height": 2})
+    return reader
+
+
+@pytest.fixture
+def sample_video(tmp_path):
+    """Video sintetico di 90 frame (MJPG)"""
+    path = tmp_path / "sample.avi"
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 30.0, (64, 48))
+    for index in range(90):
+        writer.write(np.full((48, 64, 3), (index * 2) % 255, dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+
+class TestFFmpegCommand:
+    """Test della costruzione della riga di comando"""
+
+    def test_select_scale_and_gray(self):
+        """Selezione, ridimensionamento e formato gray devono finire nei filtri ffmpeg"""
+        cmd = FFmpegFrameReader().build_command("video.mp4", 30, (540, 960), gray=True)
+
+        assert cmd[cmd.index("-vf") + 1] == "select=not(mod(n\\,30)),scale=540:960:flags=area"
+        assert cmd[cmd.index("-pix_fmt") + 1] == "gray"
+        assert cmd[-1] == "-"
+
+    def test_window_seeks_before_input(self):
+        """L'inizio della finestra diventa un seek sull'input, la fine un limite di frame"""
+        cmd = FFmpegFrameReader().build_command("video.mp4", 15, None, gray=False, start_time=1.0, max_frames=2)
+
+        assert cmd.index("-ss") < cmd.index("-i")
+        assert cmd[cmd.index("-ss") + 1] == "1.000000"
+        assert cmd[cmd.index("-frames:v") + 1] == "2"
+
+    def test_passthrough_fps_mode(self):
+        """I frame selezionati passano senza duplicazioni con -fps_mode (non con il deprecato -vsync)"""
+        cmd = FFmpegFrameReader().build_command("video.mp4", 30, None, gray=False)
+
+        assert cmd[cmd.index("-fps_mode") + 1] == "passthrough"
+        assert "-vsync" not in cmd
+
+    @pytest.mark.parametrize("banner, expected", [
+        ("ffmpeg version 7.0.2-static https://johnvansickle.com/ffmpeg/", "-fps_mode"),
+        ("ffmpeg version n5.1.2 Copyright (c) 2000-2022", "-fps_mode"),
+        ("ffmpeg version N-112233-gabcdef Copyright", "-fps_mode"),
+        ("ffmpeg version 4.4.2-0ubuntu0.22.04.1 Copyright", "-vsync")
+    ])
+    def test_passthrough_on_old_ffmpeg(self, banner, expected, monkeypatch):
+        """Le versioni precedenti alla 5.1 conoscono solo -vsync"""
+        monkeypatch.setattr(ffmpeg_decoder.subprocess, "run",
+                            lambda *args, **kwargs: subprocess.CompletedProcess(args, 0, stdout=banner))
+
+        assert ffmpeg_decoder._passthrough_args.__wrapped__("ffmpeg") == (expected, "passthrough")
+
+    def test_no_filters_for_every_frame(self):
+        """Con every_n_frames=1 e nessun resize non servono filtri"""
+        cmd = FFmpegFrameReader().build_command("video.mp4", 1, None, gray=False)
+
+        assert "-vf" not in cmd
+        assert cmd[cmd.index("-pix_fmt") + 1] == "bgr24"
+
+
+class TestFFmpegProcess:
+    """Test della gestione del processo ffmpeg"""
+
+    def test_frames_and_verbose_stderr(self, tmp_path, monkeypatch):
+        """Uno stderr più grande del buffer della pipe non blocca ffmpeg"""
+        reader = fake_reader(tmp_path, monkeypatch, frames=3, stderr=1024 * 1024)
+
+        frames = list(reader.iter_frames("video.mp4", 10, gray=True))
+
+        assert [(index, frame[0, 0]) for index, _, frame in frames] == [(0, 0), (10, 1), (20, 2)]
+
+    def test_failure_after_frames_raises(self, tmp_path, monkeypatch):
+        """Un'uscita con errore dopo alcuni frame non passa per un video più corto"""
+        reader = fake_reader(tmp_path, monkeypatch, frames=2, stderr=200 * 1024, code=1)
+        frames = reader.iter_frames("video.mp4", 10, gray=True)
+
+        assert next(frames)[0] == 0
+        assert next(frames)[0] == 10
+        with pytest.raises(VideoProcessingError, match="after 2 frames"):
+            next(frames)
+
+    def test_consumer_stopping_early_is_not_an_error(self, tmp_path, monkeypatch):
+        """Se il consumatore si ferma ffmpeg viene terminato senza errori"""
+        reader = fake_reader(tmp_path, monkeypatch, frames=3)
+        frames = reader.iter_frames("video.mp4", 10, gray=True)
+
+        next(frames)
+        frames.close()
+
+
+class TestFFmpegBackend:
+    """Test della selezione del backend e del fallback su OpenCV"""
+
+    def test_missing_binary_falls_back_to_opencv(self, monkeypatch):
+        """Senza ffmpeg l'agente deve usare OpenCV"""
+        monkeypatch.setattr(FFmpegFrameReader, "is_available", lambda self: False)
+
+        assert ScraperAgent(decoder_backend="ffmpeg").decoder_backend == "opencv"
+
+    def test_ffmpeg_failure_falls_back_to_opencv(self, sample_video, monkeypatch):
+        """Se ffmpeg non legge il file si ripiega su OpenCV"""
+        monkeypatch.setattr(FFmpegFrameReader, "is_available", lambda self: True)
+
+        def failing_iter_frames(*args, **kwargs):
+            raise VideoProcessingError("ffmpeg failed")
+            yield
+
+        agent = ScraperAgent(decoder_backend="ffmpeg")
+        monkeypatch.setattr(agent.ffmpeg_reader, "iter_frames", failing_iter_frames)
+
+        assert len(agent._extract_frames_sync(sample_video, 30)) == 3
+
+    def test_invalid_backend(self):
+        """Un backend sconosciuto deve essere rifiutato"""
+        with pytest.raises(ValueError):
+            ScraperAgent(decoder_backend="gstreamer")
+
+    @requires_ffmpeg
+    def test_ffmpeg_matches_opencv(self, sample_video):
+        """Il backend ffmpeg deve campionare gli stessi frame di OpenCV"""
+        expected = ScraperAgent()._extract_frames_with_timestamps_sync(sample_video, 30)
+        result = ScraperAgent(decoder_backend="ffmpeg")._extract_frames_with_timestamps_sync(sample_video, 30)
+
+        assert [ts for _, ts in result] == pytest.approx([ts for _, ts in expected])
+        for (frame, _), (reference, _) in zip(result, expected):
+            assert frame.shape == reference.shape
+            assert np.abs(frame.astype(int) - reference.astype(int)).mean() < 4
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Test per FrameCache - cache su disco dei frame campionati
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+# Aggiungi il path del progetto
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agent.frame_cache import FrameCache
+from agent.scraper import ScraperAgent
+
+
+@pytest.fixture
+def sample_video(tmp_path):
+    """Video sintetico di 90 frame (MJPG)"""
+    path = tmp_path / "sample.avi"
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 30.0, (64, 48))
+    for index in range(90):
+        writer.write(np.full((48, 64, 3), (index * 2) % 255, dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+
+def fill_entry(cache, key, count=3, shape=(48, 64, 3)):
+    """Scrive una voce di cache con frame costanti"""
+    writer = cache.open_writer(key)
+    for index in range(count):
+        writer.append(index * 30, float(index), np.full(shape, index, dtype=np.uint8))
+    return writer.commit()
+
+
+class TestFrameCache:
+    """Test della cache dei frame"""
+
+    def test_roundtrip_is_memory_mapped(self, tmp_path):
+        """I frame salvati vengono riletti come viste memmap in sola lettura"""
+        cache = FrameCache(str(tmp_path / "frames"))
+        assert fill_entry(cache, "entry")
+
+        entries = list(cache.load("entry"))
+        assert [(index, timestamp) for index, timestamp, _ in entries] == [(0, 0.0), (30, 1.0), (60, 2.0)]
+        frame = entries[2][2]
+        assert isinstance(frame.base, np.memmap) or isinstance(frame, np.memmap)
+        assert not frame.flags.writeable
+        assert (frame == 2).all()
+
+    def test_missing_entry(self, tmp_path):
+        """Una chiave assente e' un miss"""
+        cache = FrameCache(str(tmp_path / "frames"))
+
+        assert cache.load("missing") is None
+        assert cache.get_stats()["misses"] == 1
+
+    def test_aborted_entry_is_not_visible(self, tmp_path):
+        """Una scrittura interrotta non lascia voci parziali"""
+        cache = FrameCache(str(tmp_path / "frames"))
+        writer = cache.open_writer("partial")
+        writer.append(0, 0.0, np.zeros((4, 4), dtype=np.uint8))
+        writer.abort()
+
+        assert cache.load("partial") is None
+        assert list((tmp_path / "frames").iterdir()) == []
+
+    def test_lru_eviction(self, tmp_path):
+        """Oltre il limite di dimensione viene scartata la voce usata meno di recente"""
+        entry_bytes = 3 * 48 * 64 * 3
+        cache = FrameCache(str(tmp_path / "frames"), max_bytes=int(entry_bytes * 2.5))
+        fill_entry(cache, "a")
+        fill_entry(cache, "b")
+        # "b" diventa la voce meno recente, "a" viene toccata da un hit
+        os.utime(cache.meta_path("b"), ns=(0, 1))
+        assert cache.load("a") is not None
+        fill_entry(cache, "c")
+
+        assert cache.load("b") is None
+        assert cache.load("a") is not None
+        assert cache.load("c") is not None
+        assert cache.get_stats()["evictions"] == 1
+
+    def test_entry_larger_than_cache_is_skipped(self, tmp_path):
+        """Una voce piu' grande dell'intera cache non viene salvata"""
+        cache = FrameCache(str(tmp_path / "frames"), max_bytes=100)
+
+        assert fill_entry(cache, "big") is False
+        assert cache.load("big") is None
+
+    def test_locked_entry_is_retried_later(self, tmp_path, monkeypatch):
+        """Un file bloccato (PermissionError su Windows) viene saltato dall'evict e riprovato dopo"""
+        entry_bytes = 3 * 48 * 64 * 3
+        cache = FrameCache(str(tmp_path / "frames"), max_bytes=int(entry_bytes * 2.5))
+        fill_entry(cache, "a")
+        fill_entry(cache, "b")
+        os.utime(cache.meta_path("a"), ns=(0, 1))
+        os.utime(cache.meta_path("b"), ns=(0, 2))
+        locked = cache.frames_path("a")
+        original_unlink = Path.unlink
+
+        def unlink(path, *args, **kwargs):
+            if path == locked:
+                raise PermissionError("file in uso")
+            return original_unlink(path, *args, **kwargs)
+
+        monkeypatch.setattr(Path, "unlink", unlink)
+        # "a" e' la meno recente ma bloccata: si scarta la successiva
+        assert fill_entry(cache, "c")
+        assert cache.load("a") is not None
+        assert cache.load("b") is None
+        os.utime(cache.meta_path("a"), ns=(0, 1))
+
+        monkeypatch.setattr(Path, "unlink", original_unlink)
+        assert fill_entry(cache, "d")
+        assert cache.load("a") is None
+        assert cache.load("c") is not None
+        assert cache.load("d") is not None
+        assert cache.get_stats()["evictions"] == 2
+
+    def test_failed_publish_is_skipped(self, tmp_path, monkeypatch):
+        """Se la voce non si puo' pubblicare commit restituisce False e non lascia file temporanei"""
+        cache = FrameCache(str(tmp_path / "frames"))
+
+        def replace(src, dst):
+            raise PermissionError("file in uso")
+
+        monkeypatch.setattr(os, "replace", replace)
+        assert fill_entry(cache, "entry") is False
+        assert list((tmp_path / "frames").iterdir()) == []
+
+    def test_key_depends_on_content_and_params(self, tmp_path, sample_video):
+        """La chiave cambia con i parametri ma non con il percorso del file"""
+        cache = FrameCache(str(tmp_path / "frames"))
+        copy = tmp_path / "copy.avi"
+        copy.write_bytes(Path(sample_video).read_bytes())
+
+        key = cache.make_key(sample_video, {"every_n_frames": 30})
+        assert cache.make_key(str(copy), {"every_n_frames": 30}) == key
+        assert cache.make_key(sample_video, {"every_n_frames": 15}) != key
+
+
+class TestScraperFrameCache:
+    """Test dell'integrazione della cache nello ScraperAgent"""
+
+    def test_second_run_maps_cached_frames(self, sample_video, tmp_path, monkeypatch):
+        """La seconda estrazione non decodifica il video"""
+        agent = ScraperAgent(frame_cache_dir=str(tmp_path / "frames"))
+        first = agent._extract_frames_with_timestamps_sync(sample_video, 30)
+
+        def fail(*args, **kwargs):
+            raise AssertionError("video decoded again")
+        monkeypatch.setattr(agent, "_iter_decoded", fail)
+        second = agent._extract_frames_with_timestamps_sync(sample_video, 30)
+
+        assert [timestamp for _, timestamp in second] == [timestamp for _, timestamp in first]
+        for (frame, _), (expected, _) in zip(second, first):
+            assert np.array_equal(frame, expected)
+        assert agent.frame_cache.get_stats()["hits"] == 1
+
+    def test_different_settings_miss(self, sample_video, tmp_path):
+        """Impostazioni di campionamento diverse non riusano la voce"""
+        cache_dir = str(tmp_path / "frames")
+        ScraperAgent(frame_cache_dir=cache_dir)._extract_frames_sync(sample_video, 30)
+        agent = ScraperAgent(frame_cache_dir=cache_dir, color_mode="gray")
+        frames = agent._extract_frames_sync(sample_video, 30)
+
+        assert frames[0].ndim == 2
+        assert agent.frame_cache.get_stats()["entries"] == 2
+
+    @pytest.mark.asyncio
+    async def test_stream_populates_cache(self, sample_video, tmp_path):
+        """Lo streaming completo popola la cache, quello interrotto no"""
+        agent = ScraperAgent(frame_cache_dir=str(tmp_path / "frames"))
+        async for _ in agent.stream_frames(sample_video, 30):
+            break
+        assert agent.frame_cache.get_stats()["entries"] == 0
+
+        streamed = [frame.copy() async for frame, _ in agent.stream_frames(sample_video, 30)]
+        cached = [frame async for frame, _ in agent.stream_frames(sample_video, 30)]
+
+        assert agent.frame_cache.get_stats()["hits"] == 1
+        assert len(cached) == len(streamed) == 3
+        for frame, expected in zip(cached, streamed):
+            assert np.array_equal(frame, expected)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Test per gli estrattori di feature per frame e il passaggio di decodifica unico
+"""
+
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+# Aggiungi il path del progetto
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agent.frame_features import (
+    FrameFeatureExtractor, OCRFramesExtractor, ThumbnailExtractor, MotionEnergyExtractor,
+    CutCountExtractor, BrightnessExtractor
+)
+from agent.scraper import ScraperAgent
+from core.exceptions import VideoProcessingError
+
+
+@pytest.fixture
+def cut_video(tmp_path):
+    """Video di 90 frame: 45 frame scuri e statici, poi un taglio su 45 frame chiari"""
+    path = tmp_path / "cut.avi"
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 30.0, (64, 48))
+    for index in range(90):
+        value = 30 if index < 45 else 220
+        writer.write(np.full((48, 64, 3), value, dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+
+def run(extractor, frames):
+    """Esegue un estrattore su una lista di frame a 30 fps"""
+    extractor.reset({"duration": len(frames) / 30.0})
+    for index, frame in enumerate(frames):
+        extractor.update(frame, index, index / 30.0)
+    return extractor.result()
+
+
+class TestFeatureExtractors:
+    """Test dei singoli estrattori"""
+
+    def test_brightness(self):
+        """La luminosita' media segue il livello di grigio"""
+        frames = [np.full((10, 10), value, dtype=np.uint8) for value in (0, 100, 200)]
+
+        assert run(BrightnessExtractor(), frames) == {"mean": 100.0, "min": 0.0, "max": 200.0}
+
+    def test_motion_energy(self):
+        """Frame identici hanno energia di movimento nulla"""
+        static = run(MotionEnergyExtractor(), [np.zeros((48, 64, 3), dtype=np.uint8)] * 3)
+        moving = run(MotionEnergyExtractor(), [np.full((48, 64, 3), v, dtype=np.uint8) for v in (0, 50, 0)])
+
+        assert static["mean"] == 0.0
+        assert moving["mean"] == pytest.approx(50.0)
+        assert len(moving["series"]) == 2
+
+    def test_cut_count(self):
+        """Un cambio netto di istogramma conta come taglio"""
+        frames = [np.full((48, 64), v, dtype=np.uint8) for v in (20, 20, 230, 230)]
+
+        assert run(CutCountExtractor(), frames) == {"count": 1, "timestamps": [pytest.approx(2 / 30.0)]}
+
+    def test_thumbnail_is_resized_copy(self):
+        """La miniatura e' una copia ridimensionata del frame piu' vicino al tempo richiesto"""
+        frames = [np.full((200, 400, 3), index, dtype=np.uint8) for index in range(60)]
+        thumbnail = run(ThumbnailExtractor(at_seconds=1.0, max_width=100), frames)
+        frames[30][:] = 255
+
+        assert thumbnail.shape == (50, 100, 3)
+        assert (thumbnail == 30).all()
+
+    def test_ocr_frames_are_copies(self):
+        """I frame per l'OCR sopravvivono al riuso dei buffer"""
+        buffer = np.zeros((4, 4), dtype=np.uint8)
+        extractor = OCRFramesExtractor(every_n_samples=2)
+        extractor.reset({})
+        for index in range(4):
+            buffer[:] = index
+            extractor.update(buffer, index, float(index))
+
+        assert [(int(frame[0, 0]), timestamp) for frame, timestamp in extractor.result()] == [(0, 0.0), (2, 2.0)]
+
+
+class TestSinglePassExtraction:
+    """Test del passaggio di decodifica unico nello ScraperAgent"""
+
+    @pytest.mark.asyncio
+    async def test_all_features_from_one_decode(self, cut_video, monkeypatch):
+        """Tutte le feature predefinite escono da un'unica decodifica"""
+        agent = ScraperAgent()
+        decodes = []
+        original = agent._iter_video
+
+        def counting_iter(*args, **kwargs):
+            decodes.append(args)
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(agent, "_iter_video", counting_iter)
+        features = await agent.extract_features(cut_video, every_n_frames=15)
+
+        assert len(decodes) == 1
+        assert features["frame_count"] == 6
+        assert len(features["ocr_frames"]) == 6
+        assert features["thumbnail"] is not None
+        assert features["cut_count"]["count"] == 1
+        assert features["brightness"]["min"] < 50 < features["brightness"]["max"]
+        assert features["motion_energy"]["max"] > 100
+
+    @pytest.mark.asyncio
+    async def test_custom_extractor(self, cut_video):
+        """Estrattori personalizzati si aggiungono senza altre decodifiche"""
+        class FrameCounter(FrameFeatureExtractor):
+            name = "indices"
+
+            def reset(self, video_info):
+                self.indices = []
+
+            def update(self, frame, index, timestamp):
+                self.indices.append(index)
+
+            def result(self):
+                return self.indices
+
+        features = await ScraperAgent().extract_features(cut_video, [FrameCounter()], every_n_frames=30)
+
+        assert features["indices"] == [0, 30, 60]
+
+    @pytest.mark.asyncio
+    async def test_duplicate_names_rejected(self, cut_video):
+        """Due estrattori con lo stesso nome vengono rifiutati"""
+        with pytest.raises(ValueError):
+            await ScraperAgent().extract_features(cut_video, [BrightnessExtractor(), BrightnessExtractor()])
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("name", ["frame_count", "duration"])
+    async def test_reserved_names_rejected(self, cut_video, name):
+        """I nomi usati dallo scraper non possono essere sovrascritti da un estrattore"""
+        extractor = BrightnessExtractor()
+        extractor.name = name
+        with pytest.raises(ValueError):
+            await ScraperAgent().extract_features(cut_video, [extractor])
+
+    def test_incomplete_extractor_rejected(self):
+        """Un estrattore senza update o result non si puo' istanziare"""
+        class NoResult(FrameFeatureExtractor):
+            def update(self, frame, index, timestamp):
+                pass
+
+        with pytest.raises(TypeError):
+            NoResult()
+
+    @pytest.mark.asyncio
+    async def test_missing_file(self, tmp_path):
+        """Un file inesistente solleva VideoProcessingError"""
+        with pytest.raises(VideoProcessingError):
+            await ScraperAgent().extract_features(str(tmp_path / "missing.avi"))
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test per LLMResponseCache - cache delle risposte LLM su due livelli
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Aggiungi il path del progetto
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agent.synthesis import SynthesisAgent
+from llm.cache import LLMResponseCache, cache_key
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Cache su un database temporaneo"""
+    cache = LLMResponseCache(str(tmp_path / "llm_cache.db"), ttl_seconds=60, max_memory_entries=2)
+    yield cache
+    cache.close()
+
+
+class TestCacheKey:
+    """Test della chiave di cache"""
+
+    def test_key_depends_on_every_parameter(self):
+        """Modello, prompt, temperatura e max_tokens cambiano la chiave"""
+        base = cache_key("gpt-4", "ciao", 0.7, 500)
+        assert base == cache_key("gpt-4", "ciao", 0.7, 500)
+        assert base != cache_key("gpt-3.5-turbo", "ciao", 0.7, 500)
+        assert base != cache_key("gpt-4", "ciao!", 0.7, 500)
+        assert base != cache_key("gpt-4", "ciao", 0.2, 500)
+        assert base != cache_key("gpt-4", "ciao", 0.7, 1000)
+
+
+class TestLLMResponseCache:
+    """Test dei livelli memoria e SQLite"""
+
+    def test_miss_then_memory_hit(self, cache):
+        """Dopo put la risposta arriva dal livello in memoria"""
+        assert cache.get("k") is None
+        cache.put("k", "risposta")
+        assert cache.get("k") == "risposta"
+
+        stats = cache.get_stats()
+        assert (stats["misses"], stats["memory_hits"], stats["disk_hits"]) == (1, 1, 0)
+
+    def test_lru_eviction_falls_back_to_disk(self, cache):
+        """Le voci uscite dall'LRU in memoria restano su SQLite e vengono ripromosse"""
+        for key in ("a", "b", "c"):
+            cache.put(key, key.upper())
+        assert cache.get_stats()["memory_entries"] == 2
+
+        assert cache.get("a") == "A"
+        assert cache.get_stats()["disk_hits"] == 1
+        assert cache.get("a") == "A"
+        assert cache.get_stats()["memory_hits"] == 1
+
+    def test_persistence_across_instances(self, tmp_path):
+        """Le risposte sopravvivono alla riapertura del database"""
+        path = str(tmp_path / "llm_cache.db")
+        first = LLMResponseCache(path)
+        first.put("k", "persistente")
+        first.close()
+
+        second = LLMResponseCache(path)
+        assert second.get("k") == "persistente"
+        second.close()
+
+    def test_ttl_expiry(self, tmp_path):
+        """Le voci scadute non vengono restituite da nessuno dei due livelli"""
+        cache = LLMResponseCache(str(tmp_path / "llm_cache.db"), ttl_seconds=0.05)
+        cache.put("k", "breve")
+        time.sleep(0.1)
+
+        assert cache.get("k") is None
+        assert cache.get_stats()["entries"] == 0
+        cache.close()
+
+    def test_invalid_ttl(self, tmp_path):
+        """Un TTL non positivo non è valido"""
+        with pytest.raises(ValueError):
+            LLMResponseCache(str(tmp_path / "llm_cache.db"), ttl_seconds=0)
+
+
+class TestSynthesisCache:
+    """Test della cache nel SynthesisAgent"""
+
+    def test_summary_reused(self, cache, monkeypatch):
+        """Lo stesso contenuto non viene sintetizzato due volte"""
+        agent = SynthesisAgent(model="gpt-4", api_key="test", cache=cache)
+        calls = []
+
+        def fake_openai(prompt, model, api_key=None):
+            calls.append(prompt)
+            return "sintesi"
+
+        monkeypatch.setattr(agent, "_call_openai_llm", fake_openai)
+        config = {"llm_config": {}}
+
+        assert agent.summarize("trascrizione", "ocr", config) == "sintesi"
+        assert agent.summarize("trascrizione", "ocr", config) == "sintesi"
+        assert agent.summarize("altra trascrizione", "ocr", config) == "sintesi"
+        assert len(calls) == 2
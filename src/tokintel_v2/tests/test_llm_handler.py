@@ -0,0 +1,563 @@
+#!/usr/bin/env python3
+"""
+Test per LLMHandler - client HTTP persistenti verso il backend locale
+"""
+
+import asyncio
+import contextlib
+import json
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+
+# Aggiungi il path del progetto
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.exceptions import LLMError
+from llm.handler import LLMHandler, is_local_backend
+from llm.rate_limit import SharedSemaphore, TokenBucket, get_backend_limiter
+
+
+class FakeLocalServer:
+    """Server HTTP/1.1 minimale compatibile OpenAI: risponde con il prompt e conta le connessioni"""
+
+    def __init__(self, status=200, delay=0.0):
+        self.status = status
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.connections = 0
+        self.requests = []
+        self.server = None
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}/v1/chat/completions"
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                headers = dict(
+                    line.split(": ", 1) for line in head.decode().split("\r\n")[1:] if ": " in line
+                )
+                length = int(headers.get("content-length", headers.get("Content-Length", 0)))
+                payload = json.loads(await reader.readexactly(length))
+                self.requests.append(payload)
+                self.active += 1
+                self.max_active = max(self.max_active, self.active)
+                await asyncio.sleep(self.delay)
+                self.active -= 1
+                prompt = payload["messages"][0]["content"]
+                if payload.get("stream"):
+                    await self.stream_response(writer, prompt)
+                    return
+                body = json.dumps({"choices": [{"message": {"content": f" eco: {prompt} "}}]}).encode()
+                writer.write(
+                    f"HTTP/1.1 {self.status} OK\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def stream_response(self, writer, prompt):
+        """Risposta server-sent events parola per parola, poi chiude la connessione"""
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nConnection: close\r\n\r\n")
+        writer.write(b": keep-alive\n\n")
+        for word in ["eco:", *prompt.split()]:
+            chunk = {"choices": [{"delta": {"content": f" {word}"}}]}
+            writer.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            await writer.drain()
+            await asyncio.sleep(0.01)
+        writer.write(b"data: [DONE]\n\n")
+        await writer.drain()
+
+
+@pytest_asyncio.fixture
+async def local_server():
+    """Avvia il finto LM Studio e restituisce (server, endpoint)"""
+    server = FakeLocalServer()
+    endpoint = await server.start()
+    yield server, endpoint
+    await server.stop()
+
+
+class TestLLMHandlerHTTPClients:
+    """Test dei client HTTP in pool"""
+
+    @pytest.mark.asyncio
+    async def test_local_calls_reuse_one_connection(self, local_server):
+        """Chiamate successive al backend locale riusano la stessa connessione keep-alive"""
+        server, endpoint = local_server
+        async with LLMHandler({"model": "local", "endpoint": endpoint}) as handler:
+            results = [await handler.call_llm(f"prompt {i}") for i in range(5)]
+
+        assert results == [f"eco: prompt {i}" for i in range(5)]
+        assert server.connections == 1
+        assert server.requests[0]["max_tokens"] == 500
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_bounded_by_pool(self, local_server):
+        """Le connessioni aperte non superano max_connections"""
+        server, endpoint = local_server
+        async with LLMHandler({"model": "local", "endpoint": endpoint, "max_connections": 2}) as handler:
+            results = await asyncio.gather(*(handler.call_llm(f"p{i}") for i in range(8)))
+
+        assert len(results) == 8
+        assert server.connections <= 2
+
+    @pytest.mark.asyncio
+    async def test_aclose_releases_clients(self, local_server):
+        """aclose chiude i client; una nuova chiamata ne crea uno nuovo"""
+        server, endpoint = local_server
+        handler = LLMHandler({"model": "local", "endpoint": endpoint})
+        await handler.call_llm("uno")
+        assert handler.get_stats()["http_clients"] == ["local"]
+
+        await handler.aclose()
+        assert handler.get_stats()["http_clients"] == []
+        assert await handler.call_llm("due") == "eco: due"
+        await handler.aclose()
+
+    def test_clients_recreated_for_new_event_loop(self):
+        """Un nuovo event loop (es. asyncio.run successivo) non riusa connessioni del loop chiuso"""
+
+        async def run_once(handler):
+            server = FakeLocalServer()
+            handler.endpoint = await server.start()
+            try:
+                return await handler.call_llm("ciao")
+            finally:
+                await server.stop()
+
+        handler = LLMHandler({"model": "local", "endpoint": None})
+        assert asyncio.run(run_once(handler)) == "eco: ciao"
+        assert asyncio.run(run_once(handler)) == "eco: ciao"
+
+    def test_clients_of_previous_open_loop_closed_by_aclose(self):
+        """I client di un loop precedente ancora aperto vengono chiusi da aclose"""
+        handler = LLMHandler({"model": "local", "endpoint": None})
+        first_loop = asyncio.new_event_loop()
+
+        async def call(server):
+            handler.endpoint = await server.start()
+            try:
+                return await handler.call_llm("ciao")
+            finally:
+                await server.stop()
+
+        async def call_and_close():
+            try:
+                return await call(FakeLocalServer())
+            finally:
+                await handler.aclose()
+
+        try:
+            assert first_loop.run_until_complete(call(FakeLocalServer())) == "eco: ciao"
+            old_client = handler._http_clients["local"]
+            assert asyncio.run(call_and_close()) == "eco: ciao"
+            assert old_client.is_closed
+            assert handler._stale_clients == []
+        finally:
+            # Lascia completare la chiusura dei socket del primo loop
+            first_loop.run_until_complete(asyncio.sleep(0.05))
+            first_loop.close()
+
+    def test_clients_of_running_loop_closed_on_that_loop(self):
+        """Se il loop precedente gira in un altro thread i suoi client vengono chiusi li'"""
+        handler = LLMHandler({"model": "local", "endpoint": None})
+        other_loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=other_loop.run_forever, daemon=True)
+        thread.start()
+
+        async def call():
+            server = FakeLocalServer()
+            handler.endpoint = await server.start()
+            try:
+                return await handler.call_llm("ciao")
+            finally:
+                await server.stop()
+
+        async def call_here():
+            result = await call()
+            await asyncio.sleep(0.1)
+            await handler.aclose()
+            return result
+
+        try:
+            assert asyncio.run_coroutine_threadsafe(call(), other_loop).result(5) == "eco: ciao"
+            old_client = handler._http_clients["local"]
+            assert asyncio.run(call_here()) == "eco: ciao"
+            assert old_client.is_closed
+        finally:
+            asyncio.run_coroutine_threadsafe(asyncio.sleep(0.05), other_loop).result(5)
+            other_loop.call_soon_threadsafe(other_loop.stop)
+            thread.join()
+            other_loop.close()
+
+    @pytest.mark.asyncio
+    async def test_http_error_raises_llm_error(self):
+        """Un server irraggiungibile produce LLMError"""
+        handler = LLMHandler({"model": "local", "endpoint": "http://127.0.0.1:9/v1", "timeout": 2})
+        with pytest.raises(LLMError):
+            await handler._call_local_llm("ciao", "local")
+        await handler.aclose()
+
+
+class TestLLMHandlerLimits:
+    """Test dei limiti di concorrenza e di frequenza per backend"""
+
+    @pytest.mark.asyncio
+    async def test_batch_respects_concurrency_limit(self):
+        """Il batch non supera max_concurrent_requests chiamate in volo e mantiene l'ordine"""
+        server = FakeLocalServer(delay=0.02)
+        endpoint = await server.start()
+        try:
+            config = {"model": "local", "endpoint": endpoint, "max_concurrent_requests": 3}
+            async with LLMHandler(config) as handler:
+                results = await handler.batch_call_llm([f"p{i}" for i in range(12)])
+                stats = handler.get_stats()["limits"]["local"]
+        finally:
+            await server.stop()
+
+        assert results == [f"eco: p{i}" for i in range(12)]
+        assert server.max_active == 3
+        assert stats["calls"] == 12 and stats["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_batch_iter_streams_results(self, local_server):
+        """batch_call_llm_iter restituisce ogni risultato con l'indice del prompt"""
+        server, endpoint = local_server
+        async with LLMHandler({"model": "local", "endpoint": endpoint}) as handler:
+            received = [item async for item in handler.batch_call_llm_iter(["a", "b", "c"])]
+
+        assert sorted(received) == [(0, "eco: a"), (1, "eco: b"), (2, "eco: c")]
+
+    @pytest.mark.asyncio
+    async def test_requests_per_minute_bucket(self, local_server):
+        """Oltre la capacità del bucket le chiamate attendono il rifornimento"""
+        server, endpoint = local_server
+        config = {"model": "local", "endpoint": endpoint, "requests_per_minute": 1200}
+        async with LLMHandler(config) as handler:
+            # Bucket vuotato a mano: 1200 rpm = 20 richieste al secondo
+            limiter = handler._get_limiter("local")
+            limiter.requests.tokens = 0
+            start = asyncio.get_running_loop().time()
+            await handler.batch_call_llm(["a", "b", "c", "d"])
+            elapsed = asyncio.get_running_loop().time() - start
+
+        assert elapsed >= 0.15
+        assert handler.get_stats()["limits"]["local"]["wait_time"] > 0
+
+    @pytest.mark.asyncio
+    async def test_token_bucket_caps_oversized_request(self):
+        """Una richiesta più grande del bucket passa a bucket pieno invece di bloccarsi"""
+        bucket = TokenBucket(per_minute=600)
+        assert await bucket.acquire(10000) == 0.0
+        assert bucket.tokens == 0
+
+    def test_invalid_bucket_rate(self):
+        """Una frequenza non positiva non è valida"""
+        with pytest.raises(ValueError):
+            TokenBucket(per_minute=0)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_bucket_wait_refunds_tokens(self):
+        """Una chiamata annullata mentre attende il bucket restituisce i token prenotati"""
+        bucket = TokenBucket(per_minute=60)
+        bucket.tokens = 0
+        waiter = asyncio.ensure_future(bucket.acquire(1))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        assert 0 <= bucket.tokens < 0.1
+
+    @pytest.mark.asyncio
+    async def test_handlers_share_limiter_per_endpoint(self):
+        """Handler diversi verso lo stesso server condividono il limite di concorrenza"""
+        server = FakeLocalServer(delay=0.02)
+        endpoint = await server.start()
+        try:
+            config = {"model": "local", "endpoint": endpoint, "max_concurrent_requests": 2}
+            async with LLMHandler(dict(config)) as pipeline, LLMHandler(dict(config)) as chat:
+                assert pipeline._get_limiter("local") is chat._get_limiter("local")
+                await asyncio.gather(
+                    pipeline.batch_call_llm([f"a{i}" for i in range(6)]),
+                    chat.batch_call_llm([f"b{i}" for i in range(6)])
+                )
+        finally:
+            await server.stop()
+
+        assert server.max_active == 2
+        assert get_backend_limiter("local", endpoint, 2) is pipeline._get_limiter("local")
+        assert get_backend_limiter("local", endpoint + "/other", 2) is not pipeline._get_limiter("local")
+
+    def test_shared_semaphore_across_event_loops(self):
+        """Lo stesso semaforo limita coroutine di loop diversi in thread diversi"""
+        semaphore = SharedSemaphore(1)
+        lock = threading.Lock()
+        active = [0, 0]
+
+        async def hold():
+            async with semaphore:
+                with lock:
+                    active[0] += 1
+                    active[1] = max(active[1], active[0])
+                await asyncio.sleep(0.01)
+                with lock:
+                    active[0] -= 1
+
+        async def run_many():
+            await asyncio.gather(*(hold() for _ in range(5)))
+
+        threads = [threading.Thread(target=asyncio.run, args=(run_many(),)) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+
+        assert active == [0, 1]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("release_first", [False, True])
+    async def test_shared_semaphore_cancelled_waiter(self, release_first):
+        """Un'attesa annullata non consuma il posto, anche se il posto le era già stato passato"""
+        semaphore = SharedSemaphore(1)
+        await semaphore.acquire()
+        waiter = asyncio.ensure_future(semaphore.acquire())
+        await asyncio.sleep(0)
+        if release_first:
+            semaphore.release()
+            waiter.cancel()
+        else:
+            waiter.cancel()
+            semaphore.release()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        await asyncio.wait_for(semaphore.acquire(), 1)
+
+
+class TestLLMHandlerCache:
+    """Test della cache delle risposte nel LLMHandler"""
+
+    @pytest.mark.asyncio
+    async def test_identical_requests_served_from_cache(self, local_server, tmp_path):
+        """Una richiesta identica non raggiunge il backend; cambiare max_tokens sì"""
+        server, endpoint = local_server
+        config = {"model": "local", "endpoint": endpoint, "cache_path": str(tmp_path / "llm_cache.db")}
+        async with LLMHandler(config) as handler:
+            assert await handler.call_llm("ciao") == "eco: ciao"
+            assert await handler.call_llm("ciao") == "eco: ciao"
+            assert await handler.call_llm("ciao", max_tokens=50) == "eco: ciao"
+            stats = handler.get_stats()["cache"]
+
+        assert len(server.requests) == 2
+        assert stats["hits"] == 1 and stats["misses"] == 2
+
+    @pytest.mark.asyncio
+    async def test_cache_disabled_by_default(self, local_server):
+        """Senza cache_path ogni chiamata va al backend"""
+        server, endpoint = local_server
+        async with LLMHandler({"model": "local", "endpoint": endpoint}) as handler:
+            await handler.call_llm("ciao")
+            await handler.call_llm("ciao")
+
+        assert len(server.requests) == 2
+        assert handler.get_stats()["cache"] is None
+
+
+class TestLLMHandlerStreaming:
+    """Test dello streaming dei token"""
+
+    @pytest.mark.asyncio
+    async def test_local_stream_yields_deltas(self, local_server):
+        """Lo stream restituisce i delta in ordine e registra TTFT e token/s"""
+        server, endpoint = local_server
+        async with LLMHandler({"model": "local", "endpoint": endpoint}) as handler:
+            deltas = [delta async for delta in handler.stream_llm("uno due tre")]
+            stats = handler.get_stream_stats()
+
+        assert deltas == [" eco:", " uno", " due", " tre"]
+        assert server.requests[0]["stream"] is True
+        assert stats["streams"] == 1
+        assert stats["last_ttft"] is not None and stats["last_ttft"] >= 0
+        assert stats["last_tokens_per_second"] > 0
+
+    @pytest.mark.asyncio
+    async def test_stream_fills_cache(self, local_server, tmp_path):
+        """Il testo completo di uno stream viene salvato in cache per le chiamate successive"""
+        server, endpoint = local_server
+        config = {"model": "local", "endpoint": endpoint, "cache_path": str(tmp_path / "llm_cache.db")}
+        async with LLMHandler(config) as handler:
+            streamed = "".join([delta async for delta in handler.stream_llm("uno due")])
+            cached = await handler.call_llm("uno due")
+            replayed = [delta async for delta in handler.stream_llm("uno due")]
+
+        assert streamed.strip() == cached == "eco: uno due"
+        assert replayed == ["eco: uno due"]
+        assert len(server.requests) == 1
+
+    @pytest.mark.asyncio
+    async def test_empty_stream_not_cached(self, tmp_path, monkeypatch):
+        """Uno stream senza testo non finisce in cache: la chiamata successiva riprova il backend"""
+        config = {"model": "local", "endpoint": "http://127.0.0.1:9/v1", "cache_path": str(tmp_path / "llm_cache.db")}
+        streams = []
+
+        async def empty_stream(prompt, model, **kwargs):
+            streams.append(prompt)
+            yield "  "
+
+        async with LLMHandler(config) as handler:
+            monkeypatch.setattr(handler, "_stream_local_llm", empty_stream)
+            first = [delta async for delta in handler.stream_llm("ciao")]
+            second = [delta async for delta in handler.stream_llm("ciao")]
+
+            assert first == second == ["  "]
+            assert len(streams) == 2
+            assert handler.get_stats()["cache"]["entries"] == 0
+
+    @pytest.mark.asyncio
+    async def test_stream_error_raises_llm_error(self):
+        """Un backend irraggiungibile durante lo stream produce LLMError"""
+        handler = LLMHandler({"model": "local", "endpoint": "http://127.0.0.1:9/v1", "timeout": 2})
+        with pytest.raises(LLMError):
+            async for _ in handler.stream_llm("ciao"):
+                pass
+        await handler.aclose()
+
+
+class TestBackendRouting:
+    """Test della regola unica che sceglie tra backend locale e OpenAI"""
+
+    @pytest.mark.parametrize("model, endpoint, local", [
+        ("gpt-4", None, False),
+        ("gpt-4", "", False),
+        ("gpt-4", "http://127.0.0.1:1234/v1/chat/completions", True),
+        ("gpt-4", "http://192.168.1.10:1234/v1/chat/completions", True),
+        ("ollama/llama3", None, True),
+        ("lmstudio-community/mistral", None, True)
+    ])
+    def test_is_local_backend(self, model, endpoint, local):
+        """Un endpoint configurato o un modello locale indicano il backend locale"""
+        assert is_local_backend(model, endpoint) is local
+        assert bool(LLMHandler({"model": model, "endpoint": endpoint})._is_local_model(model)) is local
+
+    @pytest.mark.parametrize("endpoint", ["http://127.0.0.1:1234/v1/chat/completions", "http://lmstudio:1234/v1"])
+    def test_synthesis_agent_follows_handler_routing(self, endpoint, monkeypatch):
+        """SynthesisAgent sceglie lo stesso backend dello stream del pipeline"""
+        from agent.synthesis import SynthesisAgent
+
+        calls = []
+        agent = SynthesisAgent(model="gpt-4", endpoint=endpoint)
+        monkeypatch.setattr(agent, "_call_local_llm", lambda prompt, url, model: calls.append(("local", url)) or "ok")
+        monkeypatch.setattr(agent, "_call_openai_llm", lambda prompt, model, key=None: calls.append(("openai", None)) or "ok")
+
+        agent.summarize("trascrizione", "testo", {})
+
+        assert calls == [("local", endpoint)]
+
+
+class TestLLMHandlerSingleFlight:
+    """Test della fusione di richieste identiche in volo"""
+
+    @pytest.mark.asyncio
+    async def test_identical_concurrent_requests_share_one_call(self):
+        """Richieste identiche concorrenti producono una sola chiamata al backend"""
+        server = FakeLocalServer(delay=0.05)
+        endpoint = await server.start()
+        try:
+            async with LLMHandler({"model": "local", "endpoint": endpoint}) as handler:
+                results = await asyncio.gather(
+                    *(handler.call_llm("stesso prompt") for _ in range(5)),
+                    handler.call_llm("stesso prompt", max_tokens=50)
+                )
+                stats = handler.get_stats()
+        finally:
+            await server.stop()
+
+        assert results == ["eco: stesso prompt"] * 6
+        assert len(server.requests) == 2
+        assert stats["coalesced_calls"] == 4
+        assert stats["in_flight_requests"] == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_cancel_others(self):
+        """Cancellare il primo chiamante non interrompe la chiamata condivisa"""
+        server = FakeLocalServer(delay=0.05)
+        endpoint = await server.start()
+        try:
+            async with LLMHandler({"model": "local", "endpoint": endpoint}) as handler:
+                first = asyncio.ensure_future(handler.call_llm("ciao"))
+                await asyncio.sleep(0)
+                second = asyncio.ensure_future(handler.call_llm("ciao"))
+                await asyncio.sleep(0.01)
+                first.cancel()
+
+                assert await second == "eco: ciao"
+                assert first.cancelled()
+        finally:
+            await server.stop()
+
+        assert len(server.requests) == 1
+
+    @pytest.mark.asyncio
+    async def test_all_waiters_cancelled_cancels_upstream_call(self):
+        """Se tutti i chiamanti vengono cancellati, la chiamata condivisa viene annullata"""
+        server = FakeLocalServer(delay=0.2)
+        endpoint = await server.start()
+        try:
+            async with LLMHandler({"model": "local", "endpoint": endpoint}) as handler:
+                waiters = [asyncio.ensure_future(handler.call_llm("ciao")) for _ in range(3)]
+                await asyncio.sleep(0.05)
+                for waiter in waiters:
+                    waiter.cancel()
+                await asyncio.gather(*waiters, return_exceptions=True)
+                await asyncio.sleep(0.05)
+
+                assert handler.get_stats()["in_flight_requests"] == 0
+        finally:
+            await server.stop()
+
+    @pytest.mark.asyncio
+    async def test_batch_stopped_early_sends_no_more_calls(self):
+        """Interrompere batch_call_llm_iter dopo il primo risultato non lascia chiamate in coda"""
+        server = FakeLocalServer(delay=0.05)
+        endpoint = await server.start()
+        try:
+            config = {"model": "local", "endpoint": endpoint, "max_concurrent_requests": 1}
+            async with LLMHandler(config) as handler:
+                async with contextlib.aclosing(handler.batch_call_llm_iter([f"p{i}" for i in range(6)])) as results:
+                    async for index, result in results:
+                        break
+                await asyncio.sleep(0.3)
+        finally:
+            await server.stop()
+
+        assert result == f"eco: p{index}"
+        assert len(server.requests) <= 2
+
+    @pytest.mark.asyncio
+    async def test_sequential_requests_not_coalesced(self, local_server):
+        """Senza cache, richieste identiche non concorrenti vanno entrambe al backend"""
+        server, endpoint = local_server
+        async with LLMHandler({"model": "local", "endpoint": endpoint}) as handler:
+            await handler.call_llm("ciao")
+            await handler.call_llm("ciao")
+
+        assert len(server.requests) == 2
+        assert handler.get_stats()["coalesced_calls"] == 0
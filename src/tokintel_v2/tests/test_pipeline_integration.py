@@ -84,6 +84,29 @@ class TestPipelineIntegration:
         assert hasattr(pipeline.devika_team, 'agents')
         assert len(pipeline.devika_team.agents) == 3
     
+    def test_scene_threshold_from_config(self, config):
+        """scene_threshold attiva la selezione adattiva dello scraper con il passo dei candidati"""
+        assert VideoAnalysisPipeline(config).scraper.scene_threshold is None
+        assert VideoAnalysisPipeline(config).scraper.every_n_frames == 30
+
+        config.update(scene_threshold=12.0, scene_candidate_interval=3, scene_max_gap=90)
+        scraper = VideoAnalysisPipeline(config).scraper
+
+        assert scraper.scene_threshold == 12.0
+        assert scraper.every_n_frames == 3
+        assert scraper.max_scene_gap == 90
+    
+    @pytest.mark.asyncio
+    async def test_aclose_closes_llm_clients(self, pipeline):
+        """aclose chiude i client HTTP dell'handler LLM prima della fine del loop"""
+        client = pipeline.llm._get_http_client("local")
+        assert pipeline.llm.get_stats()["http_clients"] == ["local"]
+
+        await pipeline.aclose()
+
+        assert client.is_closed
+        assert pipeline.llm.get_stats()["http_clients"] == []
+    
     @pytest.mark.asyncio
     async def test_devika_analysis_method(self, pipeline):
         """Test del metodo _run_devika_analysis"""
@@ -12,7 +12,7 @@ from unittest.mock import Mock, patch
 
 # Import delle funzionalità da testare
 try:
-    from ui.chat_agents import AgentChat
+    from ui.chat_agents import AgentChat, load_llm_handler
     from utils.pdf_exporter import PDFExporter, export_analysis_to_pdf, create_sample_report
     from db.database import DatabaseManager, init_database, save_analysis_result, get_analysis_history
     PRO_FEATURES_AVAILABLE = True
@@ -68,6 +68,16 @@ class TestChatAgents:
         """Test agente non valido"""
         response = self.chat.get_agent_response("invalid_agent", "test")
         assert "non ho capito" in response.lower()
+    
+    def test_chat_handler_without_cache(self):
+        """Le risposte della chat non vengono servite dalla cache LLM del pipeline"""
+        llm_config = {"model": "local", "endpoint": "http://127.0.0.1:1234/v1", "cache_path": "cache/llm_cache.db"}
+        with patch("ui.chat_agents.ConfigManager") as manager:
+            manager.return_value.get_config.return_value = {"llm_config": llm_config}
+            handler = load_llm_handler()
+        
+        assert handler is not None
+        assert handler.cache is None
 
 @pytest.mark.skipif(not PRO_FEATURES_AVAILABLE, reason="Funzionalità Pro non disponibili")
 class TestPDFExporter:
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test per SceneChangeDetector - selezione adattiva dei frame
+"""
+
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+# Aggiungi il path del progetto
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agent.scene_detector import SceneChangeDetector
+from agent.scraper import ScraperAgent
+
+
+def make_frame(value=100, caption=None):
+    """Frame verticale uniforme con didascalia opzionale"""
+    frame = np.full((320, 180, 3), value, dtype=np.uint8)
+    if caption:
+        cv2.putText(frame, caption, (10, 280), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+    return frame
+
+
+class TestSceneChangeDetector:
+    """Test del rilevatore di cambi scena"""
+
+    def test_static_frames_are_dropped(self):
+        """Frame identici devono essere scartati dopo il primo"""
+        detector = SceneChangeDetector()
+        kept = [detector.should_keep(make_frame(), index) for index in range(10)]
+
+        assert kept == [True] + [False] * 9
+        assert detector.get_stats() == {"checked": 10, "kept": 1, "skipped": 9}
+
+    def test_cut_is_kept(self):
+        """Un taglio netto deve essere mantenuto"""
+        detector = SceneChangeDetector()
+        detector.should_keep(make_frame(40), 0)
+
+        assert detector.should_keep(make_frame(200), 1)
+
+    def test_caption_change_is_kept(self):
+        """Una nuova didascalia su sfondo fisso deve essere mantenuta"""
+        detector = SceneChangeDetector()
+        detector.should_keep(make_frame(caption="primo"), 0)
+
+        assert not detector.should_keep(make_frame(caption="primo"), 1)
+        assert detector.should_keep(make_frame(caption="SECONDO"), 2)
+
+    def test_max_gap_forces_frame(self):
+        """Dopo max_gap_frames un frame va tenuto anche se invariato"""
+        detector = SceneChangeDetector(max_gap_frames=5)
+        kept = [index for index in range(0, 12) if detector.should_keep(make_frame(), index)]
+
+        assert kept == [0, 5, 10]
+
+    def test_invalid_grid(self):
+        """La firma deve essere divisibile per la griglia"""
+        with pytest.raises(ValueError):
+            SceneChangeDetector(signature_size=(60, 112), grid=(7, 8))
+
+
+def test_scraper_adaptive_selection(tmp_path):
+    """Lo ScraperAgent deve tenere solo i frame dove la scena cambia"""
+    path = tmp_path / "scenes.avi"
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 30.0, (180, 320))
+    for index in range(60):
+        writer.write(make_frame(60 if index < 37 else 190))
+    writer.release()
+
+    agent = ScraperAgent(scene_threshold=12.0)
+    result = agent._extract_frames_with_timestamps_sync(str(path), 5)
+
+    assert [round(ts * 30) for _, ts in result] == [0, 40]
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Test per ScraperAgent - estrazione frame
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+# Aggiungi il path del progetto
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import agent.scraper as scraper
+from agent.scraper import ScraperAgent, SAMPLING_MODES
+from agent.frame_pool import FrameBufferPool
+from core.exceptions import VideoProcessingError
+
+
+@pytest.fixture
+def sample_video(tmp_path):
+    """Video sintetico di 90 frame (MJPG, ogni frame e' un keyframe)"""
+    path = tmp_path / "sample.avi"
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 30.0, (64, 48))
+    for index in range(90):
+        frame = np.full((48, 64, 3), (index * 2) % 255, dtype=np.uint8)
+        writer.write(frame)
+    writer.release()
+    return str(path)
+
+
+_extract_frames_to_file = scraper._extract_frames_to_file
+
+
+def _crashing_extract(video_path, every_n_frames, output_path):
+    """Worker che muore senza risposta su crash.mp4, dopo che gli altri hanno finito"""
+    if os.path.basename(video_path) == "crash.mp4":
+        time.sleep(1.0)
+        os._exit(1)
+    return _extract_frames_to_file(video_path, every_n_frames, output_path)
+
+
+class TestFrameSampling:
+    """Test delle modalita' di campionamento dei frame"""
+
+    @pytest.mark.parametrize("mode", SAMPLING_MODES)
+    def test_sampling_modes_keep_same_frames(self, sample_video, mode):
+        """Ogni modalita' deve restituire gli stessi frame del decode completo"""
+        reference = ScraperAgent(sampling_mode="decode")._extract_frames_sync(sample_video, 30)
+        frames = ScraperAgent(sampling_mode=mode)._extract_frames_sync(sample_video, 30)
+
+        assert len(frames) == len(reference) == 3
+        for frame, expected in zip(frames, reference):
+            assert frame.shape == expected.shape
+            assert np.abs(frame.astype(int) - expected.astype(int)).mean() < 2
+
+    @pytest.mark.parametrize("mode", SAMPLING_MODES)
+    def test_timestamps_follow_frame_index(self, sample_video, mode):
+        """I timestamp devono corrispondere all'indice del frame campionato"""
+        agent = ScraperAgent(sampling_mode=mode)
+        result = agent._extract_frames_with_timestamps_sync(sample_video, 30)
+
+        assert [timestamp for _, timestamp in result] == pytest.approx([0.0, 1.0, 2.0])
+
+    def test_invalid_sampling_mode(self):
+        """Una modalita' sconosciuta deve essere rifiutata"""
+        with pytest.raises(ValueError):
+            ScraperAgent(sampling_mode="keyframes")
+
+    def test_invalid_interval(self, sample_video):
+        """Un intervallo nullo non e' valido"""
+        with pytest.raises(VideoProcessingError):
+            ScraperAgent()._extract_frames_sync(sample_video, 0)
+
+
+class TestFrameOutputFormat:
+    """Test di ridimensionamento, scala di grigi e pool di buffer"""
+
+    @pytest.mark.parametrize("mode", SAMPLING_MODES)
+    def test_target_size_and_gray(self, sample_video, mode):
+        """I frame devono uscire gia' ridotti e in scala di grigi"""
+        agent = ScraperAgent(sampling_mode=mode, target_size=(32, 24), color_mode="gray")
+        frames = agent._extract_frames_sync(sample_video, 30)
+
+        assert len(frames) == 3
+        assert all(frame.shape == (24, 32) for frame in frames)
+
+    def test_invalid_color_mode(self):
+        """Una modalita' colore sconosciuta deve essere rifiutata"""
+        with pytest.raises(ValueError):
+            ScraperAgent(color_mode="rgb")
+
+    def test_pool_recycles_buffers(self):
+        """Il pool deve riutilizzare i buffer rilasciati senza nuove allocazioni"""
+        pool = FrameBufferPool((24, 32), capacity=2)
+        for _ in range(10):
+            buffer = pool.acquire()
+            pool.release(buffer)
+
+        stats = pool.get_stats()
+        assert stats["allocations"] == 2
+        assert stats["allocated_bytes"] == 2 * 24 * 32
+        assert stats["free"] == 2
+
+    def test_pool_ignores_foreign_buffers(self):
+        """Buffer di forma diversa non devono entrare nel pool"""
+        pool = FrameBufferPool((24, 32), capacity=2)
+        pool.acquire()
+        pool.release(np.zeros((10, 10), dtype=np.uint8))
+
+        assert pool.get_stats()["free"] == 1
+
+
+class TestFrameStreaming:
+    """Test dello streaming asincrono dei frame"""
+
+    @pytest.mark.asyncio
+    async def test_stream_matches_list_extraction(self, sample_video):
+        """Lo stream deve produrre gli stessi frame dell'estrazione a lista"""
+        agent = ScraperAgent(max_buffered_frames=1)
+        expected = agent._extract_frames_with_timestamps_sync(sample_video, 30)
+
+        # I frame dello stream vengono riciclati: vanno copiati per conservarli
+        streamed = [(frame.copy(), ts) async for frame, ts in agent.stream_frames(sample_video, 30)]
+
+        assert [ts for _, ts in streamed] == [ts for _, ts in expected]
+        for (frame, _), (reference, _) in zip(streamed, expected):
+            assert np.array_equal(frame, reference)
+
+    @pytest.mark.asyncio
+    async def test_stream_stops_early_without_hanging(self, sample_video):
+        """Interrompere il consumo deve fermare il thread di decodifica"""
+        agent = ScraperAgent(max_buffered_frames=1)
+        stream = agent.stream_frames(sample_video, 1)
+
+        async for _ in stream:
+            break
+        await stream.aclose()
+
+    @pytest.mark.asyncio
+    async def test_stream_missing_file(self, tmp_path):
+        """Un file inesistente deve sollevare VideoProcessingError"""
+        agent = ScraperAgent()
+        with pytest.raises(VideoProcessingError):
+            async for _ in agent.stream_frames(str(tmp_path / "missing.mp4")):
+                pass
+
+    @pytest.mark.asyncio
+    async def test_stream_uses_pooled_gray_frames(self, sample_video):
+        """Lo stream deve restituire frame del pool nel formato richiesto"""
+        agent = ScraperAgent(target_size=(32, 24), color_mode="gray", max_buffered_frames=2)
+
+        shapes = [frame.shape async for frame, _ in agent.stream_frames(sample_video, 10)]
+
+        assert shapes == [(24, 32)] * 9
+
+
+class TestBatchExtraction:
+    """Test dell'estrazione batch con executor a thread e a processi"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("executor", ["thread", "process"])
+    async def test_batch_executors(self, sample_video, tmp_path, executor):
+        """Entrambi gli executor devono restituire gli stessi frame e gli errori per video"""
+        agent = ScraperAgent(max_concurrent_videos=2)
+        missing = str(tmp_path / "missing.mp4")
+        expected = agent._extract_frames_sync(sample_video, 30)
+
+        try:
+            result = await agent.batch_extract_frames([sample_video, missing], 30, executor=executor)
+        finally:
+            agent.close()
+
+        assert list(result["failed"]) == [missing]
+        frames = result["successful"][sample_video]
+        assert len(frames) == len(expected)
+        for frame, reference in zip(frames, expected):
+            assert np.array_equal(frame, reference)
+
+    @pytest.mark.asyncio
+    async def test_process_pool_reused_and_closed(self, sample_video):
+        """Lo stesso pool di processi serve tutti i batch; i file di output vengono rimossi"""
+        agent = ScraperAgent(max_concurrent_videos=2, batch_executor="process")
+        try:
+            first = await agent.batch_extract_frames([sample_video], 30)
+            pool, output_dir = agent._process_pool, agent._frames_dir
+            second = await agent.batch_extract_frames([sample_video, sample_video], 30)
+
+            assert agent._process_pool is pool
+            assert os.listdir(output_dir) == []
+            for frame, reference in zip(first["successful"][sample_video], second["successful"][sample_video]):
+                assert np.array_equal(frame, reference)
+        finally:
+            agent.close()
+
+        assert agent._process_pool is None
+        assert not os.path.exists(output_dir)
+        with pytest.raises(RuntimeError):
+            pool.submit(len, [])
+
+    @pytest.mark.asyncio
+    async def test_crashed_worker_fails_only_its_video(self, sample_video, monkeypatch):
+        """Un worker terminato fa fallire solo il suo video; il batch successivo usa un pool nuovo"""
+        monkeypatch.setattr(scraper, "_extract_frames_to_file", _crashing_extract)
+        agent = ScraperAgent(max_concurrent_videos=2, batch_executor="process")
+        expected = agent._extract_frames_sync(sample_video, 30)
+        try:
+            result = await agent.batch_extract_frames([sample_video, "crash.mp4"], 30)
+
+            assert list(result["failed"]) == ["crash.mp4"]
+            assert agent._process_pool is None
+            for frame, reference in zip(result["successful"][sample_video], expected):
+                assert np.array_equal(frame, reference)
+
+            again = await agent.batch_extract_frames([sample_video], 30)
+            assert list(again["successful"]) == [sample_video]
+        finally:
+            agent.close()
+
+    def test_invalid_batch_executor(self):
+        """Un executor sconosciuto deve essere rifiutato"""
+        with pytest.raises(ValueError):
+            ScraperAgent(batch_executor="gpu")
+
+
+class TestTimeBasedSampling:
+    """Test del campionamento a intervalli di tempo e per finestre"""
+
+    @pytest.mark.parametrize("mode", SAMPLING_MODES)
+    def test_every_n_seconds(self, sample_video, mode):
+        """Un frame ogni 0.5 secondi a 30 fps equivale a un frame ogni 15"""
+        agent = ScraperAgent(sampling_mode=mode)
+        result = agent._extract_frames_with_timestamps_sync(sample_video, None, every_n_seconds=0.5)
+
+        assert [timestamp for _, timestamp in result] == pytest.approx([0.0, 0.5, 1.0, 1.5, 2.0, 2.5])
+
+    @pytest.mark.parametrize("mode", SAMPLING_MODES)
+    def test_window(self, sample_video, mode):
+        """Solo i frame nella finestra [start, end) vengono estratti"""
+        agent = ScraperAgent(sampling_mode=mode)
+        result = agent._extract_frames_with_timestamps_sync(sample_video, None, every_n_seconds=0.5,
+                                                            start_seconds=1.0, end_seconds=2.0)
+        reference = dict((timestamp, frame) for frame, timestamp in
+                         ScraperAgent(sampling_mode="decode")._extract_frames_with_timestamps_sync(sample_video, 1))
+
+        assert [timestamp for _, timestamp in result] == pytest.approx([1.0, 1.5])
+        for frame, timestamp in result:
+            expected = reference[min(reference, key=lambda t: abs(t - timestamp))]
+            assert np.abs(frame.astype(int) - expected.astype(int)).mean() < 2
+
+    def test_hook_window_seeks_instead_of_decoding_all(self, sample_video, monkeypatch):
+        """La finestra iniziale non legge i frame successivi alla sua fine"""
+        reads = []
+        original = ScraperAgent._read_frame
+
+        def counting_read(self, cap, pool, scratch):
+            reads.append(int(cap.get(cv2.CAP_PROP_POS_FRAMES)))
+            return original(self, cap, pool, scratch)
+
+        monkeypatch.setattr(ScraperAgent, "_read_frame", counting_read)
+        agent = ScraperAgent(sampling_mode="seek")
+        result = agent._extract_frames_with_timestamps_sync(sample_video, 15, end_seconds=1.0)
+
+        assert len(result) == 2
+        assert len(reads) == 2
+
+    def test_invalid_window(self, sample_video):
+        """Finestre e intervalli non validi vengono rifiutati"""
+        agent = ScraperAgent()
+        with pytest.raises(ValueError):
+            agent._extract_frames_with_timestamps_sync(sample_video, 30, every_n_seconds=1.0)
+        with pytest.raises(ValueError):
+            agent._extract_frames_with_timestamps_sync(sample_video, None, start_seconds=2.0, end_seconds=1.0)
+        with pytest.raises(ValueError):
+            agent._extract_frames_with_timestamps_sync(sample_video, None, every_n_seconds=0)
+
+    @pytest.mark.asyncio
+    async def test_async_invalid_arguments_not_retried(self, sample_video):
+        """Argomenti non validi sollevano subito ValueError, senza i tentativi con backoff"""
+        agent = ScraperAgent()
+        start = time.monotonic()
+        with pytest.raises(ValueError):
+            await agent.extract_frames_with_timestamps(sample_video, every_n_frames=30, every_n_seconds=1.0)
+        with pytest.raises(ValueError):
+            await agent.extract_frames_with_timestamps(sample_video, start_seconds=2.0, end_seconds=2.0)
+
+        assert time.monotonic() - start < 0.5
+
+    @pytest.mark.asyncio
+    async def test_async_window(self, sample_video):
+        """L'API asincrona accetta intervallo in secondi e finestra"""
+        agent = ScraperAgent()
+        result = await agent.extract_frames_with_timestamps(sample_video, every_n_seconds=1.0, start_seconds=1.0)
+
+        assert [timestamp for _, timestamp in result] == pytest.approx([1.0, 2.0])
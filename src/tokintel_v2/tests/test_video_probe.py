@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Test per la cache del probe video condivisa tra validazione, info ed estrazione
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+# Aggiungi il path del progetto
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.exceptions import VideoProcessingError
+from core.video_probe import ProbeCache, probe_cache, probe_video
+
+
+def write_video(path, frames=10, size=(64, 48)):
+    """Scrive un piccolo video MJPG di test"""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 30.0, size)
+    for index in range(frames):
+        writer.write(np.full((size[1], size[0], 3), index * 10 % 255, dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def clear_probe_cache():
+    """Svuota la cache globale tra un test e l'altro"""
+    probe_cache.clear()
+    yield
+    probe_cache.clear()
+
+
+class TestProbeCache:
+    """Test della cache dei probe"""
+
+    def test_second_probe_is_cached(self, tmp_path):
+        """Il secondo probe dello stesso file non deve riaprire il video"""
+        calls = []
+        cache = ProbeCache()
+        video = write_video(tmp_path / "clip.avi")
+
+        def probe(path):
+            calls.append(path)
+            return {"fps": 30.0}
+
+        assert cache.get_or_probe(video, probe) == {"fps": 30.0}
+        assert cache.get_or_probe(video, probe) == {"fps": 30.0}
+        assert len(calls) == 1
+        assert cache.get_stats()["hits"] == 1
+        assert cache.get_stats()["misses"] == 1
+
+    def test_modified_file_is_probed_again(self, tmp_path):
+        """Un file riscritto (size/mtime diversi) deve generare una nuova chiave"""
+        video = write_video(tmp_path / "clip.avi", frames=10)
+        key = ProbeCache.make_key(video)
+        write_video(tmp_path / "clip.avi", frames=20)
+        stat = os.stat(video)
+        os.utime(video, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        assert ProbeCache.make_key(video) != key
+
+    def test_namespaces_are_separate(self, tmp_path):
+        """Probe di strumenti diversi sullo stesso file non si sovrascrivono"""
+        cache = ProbeCache()
+        video = write_video(tmp_path / "clip.avi")
+
+        assert cache.get_or_probe(video, lambda path: {"tool": "opencv"}) == {"tool": "opencv"}
+        assert cache.get_or_probe(video, lambda path: {"tool": "ffprobe"}, namespace="ffprobe") == {"tool": "ffprobe"}
+
+    def test_lru_eviction(self, tmp_path):
+        """Oltre max_entries le voci meno recenti vengono scartate"""
+        cache = ProbeCache(max_entries=2)
+        videos = [write_video(tmp_path / f"clip{index}.avi") for index in range(3)]
+        for video in videos:
+            cache.get_or_probe(video, lambda path: {"path": path})
+
+        assert cache.get_stats()["entries"] == 2
+
+    def test_cached_result_is_a_copy(self, tmp_path):
+        """Modificare il risultato non deve alterare la cache"""
+        video = write_video(tmp_path / "clip.avi")
+        info = probe_video(video)
+        info["fps"] = 0
+
+        assert probe_video(video)["fps"] == pytest.approx(30.0)
+
+
+class TestProbeVideo:
+    """Test del probe OpenCV"""
+
+    def test_probe_properties(self, tmp_path):
+        """Il probe restituisce tutte le proprietà usate dalla pipeline"""
+        info = probe_video(write_video(tmp_path / "clip.avi", frames=10))
+
+        assert info["fps"] == pytest.approx(30.0)
+        assert info["frame_count"] == 10
+        assert (info["width"], info["height"]) == (64, 48)
+        assert info["duration"] == pytest.approx(10 / 30.0)
+        assert info["codec"] == "MJPG"
+        assert info["has_frames"] is True
+
+    def test_missing_file_raises(self, tmp_path):
+        """Un file inesistente deve sollevare VideoProcessingError"""
+        with pytest.raises(VideoProcessingError):
+            probe_video(str(tmp_path / "missing.avi"))
+
+    def test_unreadable_file_raises(self, tmp_path):
+        """Un file non video deve sollevare VideoProcessingError"""
+        bogus = tmp_path / "bogus.avi"
+        bogus.write_bytes(b"not a video")
+
+        with pytest.raises(VideoProcessingError):
+            probe_video(str(bogus))
+
+    def test_scraper_info_uses_cache(self, tmp_path):
+        """get_video_info dello scraper riusa il probe della validazione"""
+        from agent.scraper import ScraperAgent
+
+        video = write_video(tmp_path / "clip.avi")
+        probe_video(video)
+        info = ScraperAgent()._get_video_info_sync(video)
+
+        assert info["codec"] == "MJPG"
+        assert probe_cache.get_stats()["hits"] == 1
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Test per VisionAgent - OCR asincrono con budget di concorrenza
+"""
+
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+
+# Aggiungi il path del progetto
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import agent.vision as vision
+from agent.ocr_cache import OCRCache, region_hash
+from agent.vision import VisionAgent
+from core.exceptions import VideoProcessingError
+
+
+class FakeTesseract:
+    """Finto pytesseract: restituisce il valore del primo pixel e misura la concorrenza"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def image_to_string(self, gray, lang="eng"):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        value = int(gray[0, 0])
+        return f"testo {value}\n" if value else ""
+
+
+@pytest.fixture
+def fake_tesseract(monkeypatch):
+    """Sostituisce pytesseract con il finto motore"""
+    fake = FakeTesseract(delay=0.02)
+    monkeypatch.setattr(vision, "pytesseract", fake)
+    monkeypatch.setattr(vision, "TESSERACT_AVAILABLE", True)
+    return fake
+
+
+async def stream(values):
+    """Stream di frame BGR con il valore indicato"""
+    for index, value in enumerate(values):
+        yield np.full((8, 8, 3), value, dtype=np.uint8), index / 30.0
+
+
+class TestVisionAgent:
+    """Test dello stadio OCR"""
+
+    @pytest.mark.asyncio
+    async def test_text_in_frame_order_without_repeats(self, fake_tesseract):
+        """I testi seguono l'ordine dei frame e le didascalie ripetute compaiono una volta"""
+        agent = VisionAgent(max_concurrent_ocr=4, detect_regions=False)
+        text, frame_count = await agent.extract_text(stream([1, 1, 1, 0, 2, 2, 3]))
+
+        assert frame_count == 7
+        assert text == "testo 1\ntesto 2\ntesto 3"
+
+    @pytest.mark.asyncio
+    async def test_per_agent_budget(self, fake_tesseract):
+        """Le chiamate OCR in volo non superano il budget dell'agente"""
+        agent = VisionAgent(max_concurrent_ocr=2, detect_regions=False)
+        await agent.extract_text(stream(range(1, 13)))
+
+        assert fake_tesseract.max_active <= 2
+
+    @pytest.mark.asyncio
+    async def test_budget_is_shared_between_videos(self, fake_tesseract):
+        """Piu' video sullo stesso agente condividono il budget"""
+        import asyncio
+
+        agent = VisionAgent(max_concurrent_ocr=3, detect_regions=False)
+        await asyncio.gather(*(agent.extract_text(stream(range(1, 10))) for _ in range(4)))
+
+        assert fake_tesseract.max_active <= 3
+
+    def test_agent_reused_across_event_loops(self, fake_tesseract):
+        """Lo stesso agente funziona in asyncio.run successivi senza legarsi al primo loop"""
+        import asyncio
+
+        agent = VisionAgent(max_concurrent_ocr=2, detect_regions=False)
+        first = asyncio.run(agent.extract_text(stream(range(1, 6))))
+        second = asyncio.run(agent.extract_text(stream(range(1, 6))))
+
+        assert first == second == ("\n".join(f"testo {value}" for value in range(1, 6)), 5)
+        assert fake_tesseract.max_active <= 2
+
+    @pytest.mark.asyncio
+    async def test_frames_are_copied(self, fake_tesseract):
+        """Il frame viene copiato prima dell'OCR, il buffer puo' essere riusato"""
+        buffer = np.zeros((8, 8), dtype=np.uint8)
+
+        async def recycled():
+            for value in (5, 6):
+                buffer[:] = value
+                yield buffer, 0.0
+                buffer[:] = 0
+
+        text, _ = await VisionAgent(detect_regions=False).extract_text(recycled())
+
+        assert text == "testo 5\ntesto 6"
+
+    @pytest.mark.asyncio
+    async def test_without_tesseract(self, monkeypatch):
+        """Senza pytesseract i frame vengono solo contati"""
+        monkeypatch.setattr(vision, "TESSERACT_AVAILABLE", False)
+        text, frame_count = await VisionAgent().extract_text(stream([1, 2]))
+
+        assert (text, frame_count) == ("", 2)
+
+    @pytest.mark.asyncio
+    async def test_ocr_error(self, monkeypatch):
+        """Un errore del motore OCR diventa VideoProcessingError"""
+        def broken(gray, lang="eng"):
+            raise RuntimeError("tesseract non trovato")
+
+        monkeypatch.setattr(vision, "pytesseract", SimpleNamespace(image_to_string=broken))
+        monkeypatch.setattr(vision, "TESSERACT_AVAILABLE", True)
+
+        with pytest.raises(VideoProcessingError):
+            await VisionAgent(detect_regions=False).extract_text(stream([1]))
+
+    def test_global_budget_fixed_by_first_caller(self, monkeypatch):
+        """Il budget globale e' quello con cui e' stato creato l'executor condiviso"""
+        monkeypatch.setattr(vision, "_ocr_executor", None)
+        monkeypatch.setattr(vision, "_ocr_executor_workers", 0)
+        assert vision.get_ocr_budget() == 0
+
+        executor = vision.get_ocr_executor(3)
+        try:
+            assert vision.get_ocr_executor(8) is executor
+            assert vision.get_ocr_budget() == 3
+        finally:
+            executor.shutdown()
+
+    def test_invalid_budget(self):
+        """Un budget non positivo viene rifiutato"""
+        with pytest.raises(ValueError):
+            VisionAgent(max_concurrent_ocr=0)
+
+
+def caption_frame(text, handle="@tokintel"):
+    """Frame verticale con una didascalia e un handle fisso"""
+    frame = np.full((960, 540, 3), 80, dtype=np.uint8)
+    cv2.putText(frame, handle, (30, 100), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255, 255, 255), 3)
+    cv2.putText(frame, text, (30, 750), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255, 255, 255), 3)
+    return frame
+
+
+class RegionTesseract:
+    """Finto pytesseract che conta le chiamate e identifica il ritaglio dalla posizione"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def image_to_string(self, gray, lang="eng"):
+        self.calls += 1
+        return f"regione {gray.shape[1]}x{gray.shape[0]} {int(gray.mean())}"
+
+
+class TestTextRegionsAndCache:
+    """Test del rilevamento regioni e della cache OCR tra video"""
+
+    @pytest.fixture
+    def region_tesseract(self, monkeypatch):
+        fake = RegionTesseract()
+        monkeypatch.setattr(vision, "pytesseract", fake)
+        monkeypatch.setattr(vision, "TESSERACT_AVAILABLE", True)
+        return fake
+
+    def test_only_text_regions_are_ocred(self, region_tesseract):
+        """Ogni riga di testo e' un ritaglio; i frame senza testo non chiamano l'OCR"""
+        agent = VisionAgent()
+        blank = np.full((960, 540), 80, dtype=np.uint8)
+
+        assert agent.ocr_frame(blank) == ""
+        assert region_tesseract.calls == 0
+        assert len(agent.ocr_frame(cv2.cvtColor(caption_frame("Parte 1"), cv2.COLOR_BGR2GRAY)).splitlines()) == 2
+        assert region_tesseract.calls == 2
+
+    def test_noise_frame_is_not_ocred(self, region_tesseract):
+        """Un frame di rumore non diventa una regione grande quanto il frame"""
+        noise = np.random.default_rng(0).integers(0, 256, (720, 1280), dtype=np.uint8)
+
+        assert VisionAgent().ocr_frame(noise) == ""
+        assert region_tesseract.calls == 0
+
+    def test_cache_serves_repeated_regions_across_videos(self, region_tesseract, tmp_path):
+        """L'handle ripetuto in un altro video viene servito dalla cache"""
+        cache = OCRCache(str(tmp_path / "ocr.db"))
+        first = VisionAgent(ocr_cache=cache).ocr_frame(cv2.cvtColor(caption_frame("Parte 1"), cv2.COLOR_BGR2GRAY))
+        second = VisionAgent(ocr_cache=cache).ocr_frame(cv2.cvtColor(caption_frame("Parte 2"), cv2.COLOR_BGR2GRAY))
+
+        assert region_tesseract.calls == 3
+        assert first.splitlines()[0] == second.splitlines()[0]
+        assert cache.get_stats()["hits"] == 1
+
+    def test_cache_is_persistent(self, tmp_path):
+        """I risultati sopravvivono alla riapertura del database"""
+        path = str(tmp_path / "ocr.db")
+        cache = OCRCache(path)
+        key = "0:" + "ab" * 32
+        cache.put(key, "eng", "testo")
+        cache.close()
+
+        assert OCRCache(path).get(key, "eng") == "testo"
+        assert OCRCache(path).get(key, "ita") is None
+
+    def test_cache_lru_eviction(self, tmp_path):
+        """Oltre max_entries viene rimossa la voce usata meno di recente"""
+        cache = OCRCache(str(tmp_path / "ocr.db"), max_entries=2)
+        a, b, c = ("0:" + digit * 64 for digit in "0f5")
+        cache.put(a, "eng", "A")
+        cache.put(b, "eng", "B")
+        assert cache.get(a, "eng") == "A"
+        cache.put(c, "eng", "C")
+
+        assert cache.get(b, "eng") is None
+        assert cache.get(a, "eng") == "A"
+        assert cache.get_stats()["entries"] == 2
+
+    def test_cache_batches_last_used(self, tmp_path):
+        """I refresh di last_used restano in memoria fino al batch, alla chiusura o a un'eviction"""
+        path = str(tmp_path / "ocr.db")
+        cache = OCRCache(path, touch_batch=2)
+        a, b = ("0:" + digit * 64 for digit in "0f")
+        cache.put(a, "eng", "A")
+        cache.put(b, "eng", "B")
+
+        def last_used():
+            with sqlite3.connect(path) as conn:
+                return dict(conn.execute("SELECT text, last_used FROM ocr_cache").fetchall())
+
+        stored = last_used()
+        cache.get(a, "eng")
+        cache.get(a, "eng")
+        assert last_used() == stored
+        cache.get(b, "eng")
+        flushed = last_used()
+        assert flushed["A"] > stored["A"] and flushed["B"] > stored["B"]
+        cache.get(a, "eng")
+        assert last_used() == flushed
+        cache.close()
+        assert last_used()["A"] > flushed["A"]
+
+    def test_cache_entry_count(self, tmp_path):
+        """Il conteggio in memoria ignora le sostituzioni e riparte dal database alla riapertura"""
+        path = str(tmp_path / "ocr.db")
+        cache = OCRCache(path, max_entries=3)
+        keys = ["0:" + digit * 64 for digit in "05af"]
+        cache.put(keys[0], "eng", "A")
+        cache.put(keys[0], "eng", "A2")
+        cache.put(keys[0], "ita", "A")
+        assert cache.get_stats()["entries"] == 2
+        for key in keys[1:]:
+            cache.put(key, "eng", key)
+        assert cache.get_stats()["entries"] == 3
+        cache.close()
+
+        assert OCRCache(path).get_stats()["entries"] == 3
+        cache = OCRCache(path)
+        cache.clear()
+        assert cache.get_stats()["entries"] == 0
+
+    def test_near_duplicate_hash_hits(self, tmp_path):
+        """Lo stesso testo ricompresso trova la voce in cache, un testo diverso no"""
+        def crop(text, quality=None):
+            gray = cv2.cvtColor(caption_frame(text), cv2.COLOR_BGR2GRAY)
+            if quality:
+                gray = cv2.imdecode(cv2.imencode(".jpg", gray, [cv2.IMWRITE_JPEG_QUALITY, quality])[1], 0)
+            return gray[700:780, 20:300]
+
+        cache = OCRCache(str(tmp_path / "ocr.db"))
+        cache.put(region_hash(crop("Parte 1")), "eng", "Parte 1")
+
+        assert cache.get(region_hash(crop("Parte 1", quality=60)), "eng") == "Parte 1"
+        assert cache.get(region_hash(crop("Parte 2")), "eng") is None
+
+
+class MultiResTesseract:
+    """Finto pytesseract: il passaggio a bassa risoluzione restituisce due righe,
+    una sicura e una incerta; l'OCR a piena risoluzione registra il ritaglio"""
+
+    class Output:
+        DICT = "dict"
+
+    def __init__(self):
+        self.data_calls = []
+        self.string_calls = []
+
+    def image_to_data(self, gray, lang="eng", output_type=None):
+        self.data_calls.append(gray.shape)
+        return {
+            "text": ["", "Segui", "ora", "p4rte", "2"],
+            "conf": ["-1", "95", "91", "40", "55"],
+            "block_num": [1, 1, 1, 2, 2],
+            "par_num": [1, 1, 1, 1, 1],
+            "line_num": [1, 1, 1, 1, 1],
+            "left": [0, 10, 60, 20, 80],
+            "top": [0, 10, 10, 200, 200],
+            "width": [0, 40, 30, 50, 10],
+            "height": [0, 20, 20, 20, 20]
+        }
+
+    def image_to_string(self, gray, lang="eng"):
+        self.string_calls.append(gray.shape)
+        return "parte 2\n"
+
+
+class TestMultiResolutionOCR:
+    """Test della strategia OCR multi-risoluzione"""
+
+    @pytest.fixture
+    def multires_tesseract(self, monkeypatch):
+        fake = MultiResTesseract()
+        monkeypatch.setattr(vision, "pytesseract", fake)
+        monkeypatch.setattr(vision, "TESSERACT_AVAILABLE", True)
+        return fake
+
+    def test_only_low_confidence_lines_are_reocred(self, multires_tesseract):
+        """Le righe sicure vengono dal passaggio a bassa risoluzione, le incerte dal ritaglio pieno"""
+        agent = VisionAgent(ocr_strategy="multires", lowres_scale=0.5, min_confidence=70)
+        text = agent.ocr_frame(np.zeros((960, 540), dtype=np.uint8))
+
+        assert text == "Segui ora\nparte 2"
+        assert multires_tesseract.data_calls == [(480, 270)]
+        assert len(multires_tesseract.string_calls) == 1
+        height, width = multires_tesseract.string_calls[0]
+        # Riga a bassa risoluzione 70x20 px con margine, riportata a piena risoluzione
+        assert 40 < height < 120 and 140 < width < 260
+        assert agent.get_stats()["lowres_lines"] == 1
+        assert agent.get_stats()["fullres_lines"] == 1
+
+    def test_invalid_strategy(self):
+        """Strategie e scale non valide vengono rifiutate"""
+        with pytest.raises(ValueError):
+            VisionAgent(ocr_strategy="dnn")
+        with pytest.raises(ValueError):
+            VisionAgent(ocr_strategy="multires", lowres_scale=0)
@@ -5,18 +5,58 @@ Sistema di conversazione con agenti specializzati per analisi TikTok
 
 import streamlit as st
 import json
+import asyncio
 from datetime import datetime
-from typing import Dict, List, Optional
+from pathlib import Path
+from typing import Dict, List, Optional, Iterator, AsyncIterator
 import logging
 
+# Add project root to path
+import sys
+sys.path.append(str(Path(__file__).parent.parent))
+
+from core.config import ConfigManager
+from llm.handler import LLMHandler
+
 # Configurazione logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def iterate_sync(stream: AsyncIterator[str], handler: Optional[LLMHandler] = None) -> Iterator[str]:
+    """Consuma uno stream asincrono da codice Streamlit (sincrono), un delta alla volta"""
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(stream.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(stream.aclose())
+        # I client HTTP appartengono a questo loop: vanno chiusi prima di chiuderlo
+        if handler is not None:
+            loop.run_until_complete(handler.aclose())
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.close()
+
+def load_llm_handler(config_path: str = "config/config.yaml") -> Optional[LLMHandler]:
+    """LLMHandler dalla configurazione, se è configurato un endpoint locale o una API key"""
+    try:
+        llm_config = ConfigManager(config_path).get_config().get("llm_config") or {}
+    except Exception as e:
+        logger.warning(f"Configurazione LLM non disponibile, risposte predefinite: {e}")
+        return None
+    if not llm_config.get("endpoint") and not llm_config.get("api_key"):
+        return None
+    # Niente cache delle risposte: la stessa domanda in chat deve poter avere risposte diverse
+    return LLMHandler({**llm_config, "cache_path": None})
+
 class AgentChat:
     """Sistema di chat con agenti AI specializzati"""
     
-    def __init__(self):
+    def __init__(self, llm_handler: Optional[LLMHandler] = None):
+        """Con un ``llm_handler`` le risposte sono generate dal modello, altrimenti sono predefinite"""
+        self.llm_handler = llm_handler
         self.agents = {
             "strategist": {
                 "name": "[STRATEGIST]",
@@ -53,6 +93,21 @@ class AgentChat:
         
         return "Mi dispiace, non ho capito la richiesta."
     
+    def stream_agent_response(self, agent_id: str, message: str, context: Optional[Dict] = None) -> Iterator[str]:
+        """Risposta dell'agente un pezzo alla volta, man mano che il modello la genera"""
+        if self.llm_handler is None:
+            yield self.get_agent_response(agent_id, message, context)
+            return
+        
+        agent = self.agents[agent_id]
+        prompt = (
+            f"Sei {agent['name']}, {agent['role']}. "
+            f"Competenze: {', '.join(agent['expertise'])}.\n"
+            f"Rispondi in italiano, in modo conciso e pratico.\n\n"
+            f"Domanda: {message}"
+        )
+        yield from iterate_sync(self.llm_handler.stream_llm(prompt), self.llm_handler)
+    
     def _strategist_response(self, message: str, context: Optional[Dict] = None) -> str:
         """Risposta dello Strategist"""
         responses = [
@@ -103,7 +158,9 @@ def render_chat_interface():
     with st.sidebar:
         st.header("🤖 Seleziona Agente")
         
-        agent_chat = AgentChat()
+        if "chat_llm_handler" not in st.session_state:
+            st.session_state.chat_llm_handler = load_llm_handler()
+        agent_chat = AgentChat(st.session_state.chat_llm_handler)
         
         for agent_id, agent_info in agent_chat.agents.items():
             if st.button(f"{agent_info['avatar']} {agent_info['name']}", key=f"agent_{agent_id}"):
@@ -140,24 +197,27 @@ def render_chat_interface():
             with st.chat_message("user", avatar="[USER]"):
                 st.markdown(prompt)
             
-            # Genera risposta agente
-            agent_response = agent_chat.get_agent_response(
-                st.session_state.selected_agent, 
-                prompt
-            )
+            # Genera e mostra la risposta agente mentre viene scritta
+            selected_agent_info = agent_chat.agents[st.session_state.selected_agent]
+            with st.chat_message("assistant", avatar=selected_agent_info["avatar"]):
+                response_box = st.empty()
+                agent_response = ""
+                try:
+                    for delta in agent_chat.stream_agent_response(st.session_state.selected_agent, prompt):
+                        agent_response += delta
+                        response_box.markdown(agent_response + "▌")
+                except Exception as e:
+                    logger.error(f"Risposta agente fallita: {e}")
+                    agent_response = agent_response or f"[ERROR] Risposta non disponibile: {e}"
+                response_box.markdown(agent_response)
             
             # Aggiungi risposta agente
-            selected_agent_info = agent_chat.agents[st.session_state.selected_agent]
             st.session_state.chat_messages.append({
                 "role": "assistant",
                 "content": agent_response,
                 "avatar": selected_agent_info["avatar"],
                 "timestamp": datetime.now()
             })
-            
-            # Mostra risposta agente
-            with st.chat_message("assistant", avatar=selected_agent_info["avatar"]):
-                st.markdown(agent_response)
     
     # Pulsanti azioni
     col1, col2, col3 = st.columns(3)
@@ -177,6 +177,12 @@ class StreamlitInterface:
             
             if "total_processing_time" in st.session_state:
                 st.metric("Tempo totale", f"{st.session_state.total_processing_time:.1f}s")
+            
+            stream_stats = st.session_state.get("llm_stream_stats")
+            if stream_stats and stream_stats["last_ttft"] is not None:
+                st.metric("Primo token LLM", f"{stream_stats['last_ttft']:.2f}s")
+                if stream_stats["last_tokens_per_second"]:
+                    st.metric("Token/s LLM", f"{stream_stats['last_tokens_per_second']:.1f}")
     
     def render_file_upload(self) -> Optional[str]:
         """Render file upload section and return video path if uploaded"""
@@ -232,8 +238,17 @@ class StreamlitInterface:
                 status_text.text("Estrazione frame...")
                 progress_bar.progress(20)
                 
+                # The summary is rendered while the LLM generates it
+                summary_box = st.empty()
+                
+                def show_partial_summary(text: str):
+                    status_text.text("Generazione sintesi...")
+                    summary_box.markdown(text + "▌")
+                
                 # Process video through pipeline
-                results = await self.pipeline.analyze(video_path)
+                results = await self.pipeline.analyze(video_path, on_summary_delta=show_partial_summary)
+                summary_box.empty()
+                st.session_state.llm_stream_stats = self.pipeline.llm.get_stream_stats()
                 
                 progress_bar.progress(100)
                 status_text.text("[OK] Analisi completata!")
@@ -253,6 +268,9 @@ class StreamlitInterface:
             logger.error(f"Error processing video {video_path}: {e}")
             st.error(f"Errore durante l'analisi: {e}")
             raise TokIntelError(f"Processing error: {e}")
+        finally:
+            # Ogni analisi gira in un proprio asyncio.run: i client HTTP vanno chiusi prima della fine del loop
+            await self.pipeline.aclose()
     
     def render_results(self, results: Dict[str, Any]):
         """Render analysis results with improved layout"""
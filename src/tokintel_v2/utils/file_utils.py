@@ -5,8 +5,10 @@ File validation and video file discovery utilities
 """
 
 from typing import Dict, List, Any, Optional
-import cv2
+from pathlib import Path
 import re
+from core.exceptions import FileValidationError, VideoProcessingError
+from core.video_probe import probe_video
 
 # Supported video formats
 SUPPORTED_VIDEO_FORMATS = {'.mp4', '.avi', '.mov', '.mkv', '.wmv', '.flv', '.webm'}
@@ -24,17 +26,16 @@ def validate_video_file(file_path: str) -> bool:
         if file_path.suffix.lower() not in SUPPORTED_VIDEO_FORMATS:
             raise FileValidationError(f"Unsupported video format: {file_path.suffix}")
         
-        # Check if file is readable with OpenCV
-        cap = cv2.VideoCapture(str(file_path))
-        if not cap.isOpened():
-            raise FileValidationError(f"Cannot open video file: {file_path}")
+        # Check if file is readable with OpenCV (probe is cached for later stages)
+        try:
+            info = probe_video(str(file_path))
+        except VideoProcessingError as e:
+            raise FileValidationError(str(e))
         
         # Check if video has frames
-        ret, _ = cap.read()
-        if not ret:
+        if not info["has_frames"]:
             raise FileValidationError(f"Video file has no readable frames: {file_path}")
         
-        cap.release()
         return True
         
     except Exception as e:
@@ -68,28 +69,15 @@ def get_video_files(directory: str) -> List[str]:
 def get_video_info(file_path: str) -> dict:
     """Get basic information about a video file"""
     try:
-        cap = cv2.VideoCapture(file_path)
-        
-        if not cap.isOpened():
-            raise FileValidationError(f"Cannot open video file: {file_path}")
-        
-        # Get video properties
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        
-        # Calculate duration
-        duration = frame_count / fps if fps > 0 else 0
-        
-        cap.release()
+        info = probe_video(file_path)
         
         return {
-            "fps": fps,
-            "frame_count": frame_count,
-            "width": width,
-            "height": height,
-            "duration": duration,
+            "fps": info["fps"],
+            "frame_count": info["frame_count"],
+            "width": info["width"],
+            "height": info["height"],
+            "duration": info["duration"],
+            "codec": info["codec"],
             "file_size": Path(file_path).stat().st_size
         }
         
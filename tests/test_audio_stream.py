@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Test per audio_stream - decodifica PCM s16le da ffmpeg senza file temporanei
+"""
+
+import shutil
+import sys
+import threading
+import wave
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Aggiungi il path del progetto
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agent.audio_stream import SAMPLE_RATE, STDERR_TAIL_BYTES, _to_float, load_audio, stream_audio
+
+requires_ffmpeg = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg non disponibile")
+
+
+@pytest.fixture
+def samples():
+    """Un secondo e un quarto di campioni int16 noti (rampa che copre tutta la scala)"""
+    count = int(1.25 * SAMPLE_RATE)
+    return np.linspace(-32768, 32767, count).astype(np.int16)
+
+
+@pytest.fixture
+def wav_file(tmp_path, samples):
+    """WAV mono a 16 kHz: ffmpeg non deve ricampionare, i campioni tornano identici"""
+    path = tmp_path / "audio.wav"
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(samples.tobytes())
+    return path
+
+
+class TestToFloat:
+    """Test della conversione int16 -> float32"""
+
+    def test_scale(self):
+        """I campioni finiscono in [-1, 1) come float32"""
+        pcm = np.array([-32768, 0, 16384, 32767], dtype=np.int16).tobytes()
+        audio = _to_float(pcm)
+
+        assert audio.dtype == np.float32
+        np.testing.assert_allclose(audio, [-1.0, 0.0, 0.5, 32767 / 32768])
+
+
+@requires_ffmpeg
+class TestDecode:
+    """Test della decodifica con ffmpeg"""
+
+    def test_load_audio(self, wav_file, samples):
+        """load_audio restituisce esattamente i campioni del file"""
+        audio = load_audio(str(wav_file))
+
+        assert audio.dtype == np.float32
+        np.testing.assert_array_equal(audio, samples.astype(np.float32) / 32768.0)
+
+    def test_load_audio_resamples(self, wav_file, samples):
+        """Con un'altra frequenza la durata resta la stessa"""
+        audio = load_audio(str(wav_file), sample_rate=8000)
+        assert abs(len(audio) - len(samples) // 2) <= 16
+
+    def test_stream_audio_chunks(self, wav_file, samples):
+        """stream_audio restituisce blocchi consecutivi con il secondo di inizio, uguali a load_audio"""
+        chunks = list(stream_audio(str(wav_file), chunk_seconds=0.5))
+
+        assert [start for start, _ in chunks] == [0.0, 0.5, 1.0]
+        assert [len(chunk) for _, chunk in chunks] == [8000, 8000, 4000]
+        np.testing.assert_array_equal(np.concatenate([chunk for _, chunk in chunks]), load_audio(str(wav_file)))
+
+    def test_stream_audio_stopped_early(self, wav_file):
+        """Se il consumatore si ferma, ffmpeg viene terminato senza errori"""
+        stream = stream_audio(str(wav_file), chunk_seconds=0.25)
+        start, chunk = next(stream)
+        stream.close()
+
+        assert start == 0.0
+        assert len(chunk) == 4000
+
+    def test_unreadable_file(self, tmp_path):
+        """Un file che non è audio produce un RuntimeError con il messaggio di ffmpeg"""
+        path = tmp_path / "broken.mp4"
+        path.write_bytes(b"not a video")
+
+        with pytest.raises(RuntimeError, match="non riesce a leggere"):
+            load_audio(str(path))
+        with pytest.raises(RuntimeError, match="non riesce a leggere"):
+            list(stream_audio(str(path)))
+
+
+class TestStderr:
+    """Test dello svuotamento di stderr durante lo stream"""
+
+    @pytest.fixture
+    def noisy_ffmpeg(self, tmp_path, monkeypatch):
+        """Finto ffmpeg che scrive molto più di un buffer di pipe su stderr, poi audio, ed esce con errore"""
+        script = tmp_path / "ffmpeg"
+        script.write_text(
+            f"#!{sys.executable}\n"
+            "import sys\n"
+            "for index in range(20000):\n"
+            "    sys.stderr.write(f'errore di decodifica {index}\\n')\n"
+            "sys.stderr.flush()\n"
+            "sys.stdout.buffer.write(bytes(32000))\n"
+            "sys.exit(1)\n"
+        )
+        script.chmod(0o755)
+        monkeypatch.setenv("PATH", str(tmp_path))
+
+    def test_large_stderr_does_not_block(self, noisy_ffmpeg):
+        """Con stderr oltre il buffer della pipe lo stream termina e l'errore riporta la coda di stderr"""
+        outcome = {}
+
+        def consume():
+            try:
+                list(stream_audio("video.mp4", chunk_seconds=1))
+            except RuntimeError as e:
+                outcome["error"] = str(e)
+
+        worker = threading.Thread(target=consume, daemon=True)
+        worker.start()
+        worker.join(timeout=30)
+
+        assert not worker.is_alive()
+        assert outcome["error"].endswith("errore di decodifica 19999")
+        assert "errore di decodifica 0\n" not in outcome["error"]
+        assert len(outcome["error"]) < STDERR_TAIL_BYTES + 200
+
+
+class TestMissingFFmpeg:
+    """Test senza ffmpeg nel PATH"""
+
+    def test_ffmpeg_not_found(self, monkeypatch, wav_file):
+        """Senza ffmpeg entrambe le funzioni sollevano RuntimeError"""
+        monkeypatch.setenv("PATH", "")
+
+        with pytest.raises(RuntimeError, match="ffmpeg non trovato"):
+            load_audio(str(wav_file))
+        with pytest.raises(RuntimeError, match="ffmpeg non trovato"):
+            next(stream_audio(str(wav_file)))
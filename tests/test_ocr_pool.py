@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test per OCRWorkerPool - pool di processi OCR persistente
+"""
+
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+# Aggiungi il path del progetto
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import agent.ocr_pool as ocr_pool
+from agent.ocr_pool import OCRWorkerPool, close_ocr_pool, get_ocr_pool
+
+
+def fake_image_to_string(gray, lang="eng"):
+    """Finto pytesseract: testo con il valore del primo pixel, la lingua e il pid del worker"""
+    return f"{int(gray[0, 0])}:{lang}:{os.getpid()}"
+
+
+@pytest.fixture
+def fake_tesseract(monkeypatch):
+    """Senza tesserocr, con pytesseract finto (ereditato dai worker creati con fork)"""
+    monkeypatch.setattr(ocr_pool, "tesserocr", None)
+    monkeypatch.setattr(ocr_pool, "pytesseract", SimpleNamespace(image_to_string=fake_image_to_string))
+    yield
+    close_ocr_pool()
+
+
+def frames(count):
+    """Frame in scala di grigi con valori 0..count-1"""
+    return [np.full((4, 4), value, dtype=np.uint8) for value in range(count)]
+
+
+class TestOCRWorkerPool:
+    """Test del pool OCR del legacy VisionAgent"""
+
+    def test_default_size_is_cpu_count(self):
+        """Senza workers il pool usa un processo per core"""
+        assert OCRWorkerPool().workers == (os.cpu_count() or 1)
+        assert OCRWorkerPool(workers=3).workers == 3
+
+    def test_invalid_batch_size(self):
+        """batch_size deve essere positivo"""
+        with pytest.raises(ValueError):
+            OCRWorkerPool(batch_size=0)
+
+    def test_pytesseract_fallback_in_order(self, fake_tesseract):
+        """Senza tesserocr i worker usano pytesseract; i testi seguono l'ordine dei frame tra i batch"""
+        with OCRWorkerPool(workers=2, batch_size=3, lang="ita") as pool:
+            texts = pool.map(frames(10))
+
+        assert [text.split(":")[:2] for text in texts] == [[str(i), "ita"] for i in range(10)]
+        assert all(int(text.split(":")[2]) != os.getpid() for text in texts)
+
+    def test_empty_input(self):
+        """Nessun frame, nessun processo avviato"""
+        pool = OCRWorkerPool(workers=1)
+        assert pool.map([]) == []
+        assert pool._executor is None
+
+    def test_workers_persist_and_close(self, fake_tesseract):
+        """I worker restano vivi tra due map e vengono chiusi da close"""
+        pool = OCRWorkerPool(workers=1, batch_size=4)
+        first = pool.map(frames(2))
+        second = pool.map(frames(2))
+        executor = pool._executor
+
+        assert first == second
+        pool.close()
+        assert pool._executor is None
+        with pytest.raises(RuntimeError):
+            executor.submit(len, [])
+
+    def test_shared_pool_recreated_only_on_config_change(self, fake_tesseract):
+        """get_ocr_pool riusa il pool finché workers, batch_size e lingua non cambiano"""
+        pool = get_ocr_pool(2, 8, "eng")
+        assert get_ocr_pool(2, 8, "eng") is pool
+
+        other = get_ocr_pool(2, 4, "eng")
+        assert other is not pool
+        assert pool._executor is None
+
+        close_ocr_pool()
+        assert ocr_pool._shared_pool is None
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test per TextRegionDetector - rilevamento delle regioni di testo prima dell'OCR
+"""
+
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+# Aggiungi il path del progetto
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agent.text_regions import TextRegionDetector
+
+
+def caption_frame(text="Follow for more tips", origin=(200, 600), shape=(720, 1280)):
+    """Frame scuro con una didascalia bianca"""
+    frame = np.full(shape, 40, dtype=np.uint8)
+    cv2.putText(frame, text, origin, cv2.FONT_HERSHEY_SIMPLEX, 2, 255, 4)
+    return frame
+
+
+class TestTextRegionDetector:
+    """Test del rilevatore di regioni di testo"""
+
+    @pytest.fixture
+    def detector(self):
+        return TextRegionDetector()
+
+    def test_caption_detected(self, detector):
+        """Una didascalia diventa un'unica regione che la contiene"""
+        regions = detector.detect(caption_frame())
+
+        assert len(regions) == 1
+        x, y, w, h = regions[0]
+        assert x <= 200 and x + w >= 700
+        assert y <= 560 and y + h >= 600
+        assert h < 120
+
+    def test_regions_top_to_bottom(self, detector):
+        """Più righe tornano ordinate dall'alto verso il basso, in coordinate del frame originale"""
+        frame = caption_frame("small caption here", (100, 1700), (1920, 1080))
+        cv2.putText(frame, "BIG TITLE", (60, 300), cv2.FONT_HERSHEY_SIMPLEX, 5, 255, 12)
+
+        regions = detector.detect(frame)
+
+        assert len(regions) == 2
+        assert regions[0][1] < 300 < regions[1][1]
+        assert regions[1][1] + regions[1][3] >= 1700
+
+    def test_crop(self, detector):
+        """crop restituisce i ritagli delle regioni"""
+        frame = caption_frame()
+        crops = detector.crop(frame)
+
+        assert len(crops) == 1
+        assert crops[0].max() == 255
+
+    def test_blank_frame(self, detector):
+        """Un frame uniforme non ha regioni"""
+        assert detector.detect(np.zeros((720, 1280), dtype=np.uint8)) == []
+
+    @pytest.mark.parametrize("seed", [0, 1, 2])
+    def test_noisy_frame(self, detector, seed):
+        """Il rumore non viene scambiato per testo"""
+        rng = np.random.default_rng(seed)
+        uniform = rng.integers(0, 256, (720, 1280), dtype=np.uint8)
+        gaussian = np.clip(128 + rng.normal(0, 20, (720, 1280)), 0, 255).astype(np.uint8)
+
+        assert detector.detect(uniform) == []
+        assert detector.detect(gaussian) == []
+
+    def test_blob_frame(self, detector):
+        """Forme piene (oggetti, sfondo) non sono righe di testo"""
+        frame = np.full((720, 1280), 40, dtype=np.uint8)
+        cv2.circle(frame, (640, 360), 150, 220, -1)
+        cv2.rectangle(frame, (100, 100), (300, 400), 180, -1)
+
+        assert detector.detect(frame) == []
+
+    def test_merge_lines(self):
+        """Box vicini sulla stessa riga si uniscono, quelli lontani o su altre righe no"""
+        boxes = [(35, 12, 20, 18), (10, 10, 20, 20), (100, 200, 30, 20), (300, 12, 20, 20)]
+
+        merged = TextRegionDetector._merge_lines(boxes)
+
+        assert merged == [(10, 10, 45, 20), (300, 12, 20, 20), (100, 200, 30, 20)]
+
+    def test_merge_lines_chain(self):
+        """Un'unione può renderne possibili altre (lettere aggiunte in ordine sparso)"""
+        boxes = [(0, 0, 10, 10), (40, 0, 10, 10), (20, 0, 10, 10)]
+
+        assert TextRegionDetector._merge_lines(boxes) == [(0, 0, 50, 10)]
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Test per TranscriptCache - trascrizioni riusate per audio quasi identico
+"""
+
+import itertools
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Aggiungi il path del progetto
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import agent.audio as audio_module
+import agent.transcript_cache as transcript_cache
+from agent.audio import AudioAgent
+from agent.transcript_cache import TranscriptCache, _unpack, audio_fingerprint, bit_error_rate
+
+SR = 16000
+
+
+def voice(seed=1, seconds=10):
+    """Voce sintetica: armoniche con pitch variabile modulate a sillabe"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(seconds * SR) / SR
+    f0 = 150 + 30 * np.sin(2 * np.pi * 0.7 * t + rng.uniform(0, 6))
+    phase = 2 * np.pi * np.cumsum(f0) / SR
+    harmonics = sum(np.sin(k * phase) / k for k in range(1, 15))
+    envelope = np.repeat(rng.uniform(0, 1, seconds * 5), SR // 5)
+    return (harmonics * envelope + 0.05 * rng.standard_normal(len(t))).astype(np.float32)
+
+
+def bursts(seed=2, seconds=10):
+    """Audio non correlato: raffiche di rumore"""
+    rng = np.random.default_rng(seed)
+    envelope = np.repeat(rng.uniform(0, 1, seconds * 10), SR // 10)
+    return (rng.standard_normal(seconds * SR) * envelope).astype(np.float32)
+
+
+def with_noise(audio, snr_db=25, seed=0):
+    """Stesso audio con rumore bianco al rapporto segnale/rumore indicato"""
+    rng = np.random.default_rng(seed)
+    noise = rng.standard_normal(len(audio)) * audio.std() * 10 ** (-snr_db / 20)
+    return (audio + noise).astype(np.float32)
+
+
+def ber(a, b):
+    return bit_error_rate(_unpack(audio_fingerprint(a)), _unpack(audio_fingerprint(b)))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = TranscriptCache(str(tmp_path / "transcripts.db"))
+    yield cache
+    cache.close()
+
+
+class TestFingerprint:
+    """Test dell'impronta audio"""
+
+    def test_short_audio(self):
+        """Audio più corto di due frame non ha impronta"""
+        assert audio_fingerprint(np.zeros(2048, dtype=np.float32)) == b""
+
+    def test_size(self):
+        """16 bit (2 byte) per frame, deterministica"""
+        audio = voice()
+        fingerprint = audio_fingerprint(audio)
+
+        assert len(fingerprint) == 2 * ((len(audio) - 2048) // 1024)
+        assert audio_fingerprint(audio) == fingerprint
+
+    def test_same_audio_with_noise(self):
+        """Lo stesso audio con rumore a 25 dB differisce per circa il 6% dei bit"""
+        for seed in range(3):
+            assert 0.0 < ber(voice(), with_noise(voice(), 25, seed)) < 0.1
+
+    def test_shifted_audio(self):
+        """Un taglio di 0.2 s all'inizio viene riallineato"""
+        audio = voice()
+        assert ber(audio, audio[int(0.2 * SR):]) < 0.2
+
+    def test_unrelated_audio(self):
+        """Audio diversi differiscono per circa metà dei bit"""
+        assert ber(voice(), bursts()) > 0.4
+        assert ber(bursts(2), bursts(3)) > 0.4
+
+    def test_insufficient_overlap(self):
+        """Un frammento non combacia con l'audio intero"""
+        audio = voice()
+        assert ber(audio, audio[:len(audio) // 2]) == 1.0
+
+
+class TestTranscriptCache:
+    """Test della cache SQLite delle trascrizioni"""
+
+    segments = [(0.0, 1.5, "ciao a tutti"), (1.5, 3.0, "oggi parliamo di video")]
+
+    def test_hit_on_noisy_copy(self, cache):
+        """Una copia rumorosa dello stesso audio trova la trascrizione"""
+        cache.put(audio_fingerprint(voice()), 10.0, "base", "it", self.segments)
+
+        assert cache.get(audio_fingerprint(with_noise(voice())), 10.0, "base", "it") == self.segments
+        assert cache.get(audio_fingerprint(bursts()), 10.0, "base", "it") is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_duration_tolerance(self, cache):
+        """La durata può differire di max(1 s, 2%)"""
+        fingerprint = audio_fingerprint(voice())
+        cache.put(fingerprint, 10.0, "base", "it", self.segments)
+
+        assert cache.get(fingerprint, 10.9, "base", "it") == self.segments
+        assert cache.get(fingerprint, 9.1, "base", "it") == self.segments
+        assert cache.get(fingerprint, 11.5, "base", "it") is None
+
+        cache.put(fingerprint, 200.0, "base", "it", self.segments)
+        assert cache.get(fingerprint, 203.5, "base", "it") == self.segments
+        assert cache.get(fingerprint, 205.0, "base", "it") is None
+
+    def test_model_and_language_must_match(self, cache):
+        """Modello e lingua fanno parte della chiave"""
+        fingerprint = audio_fingerprint(voice())
+        cache.put(fingerprint, 10.0, "base", "it", self.segments)
+
+        assert cache.get(fingerprint, 10.0, "small", "it") is None
+        assert cache.get(fingerprint, 10.0, "base", "en") is None
+
+    def test_eviction_at_max_entries(self, tmp_path, monkeypatch):
+        """Oltre max_entries si elimina la voce usata meno di recente"""
+        clock = itertools.count(1)
+        monkeypatch.setattr(transcript_cache.time, "time", lambda: float(next(clock)))
+        cache = TranscriptCache(str(tmp_path / "small.db"), max_entries=2)
+        first, second, third = (audio_fingerprint(signal) for signal in (voice(1), voice(5), bursts(7)))
+
+        cache.put(first, 10.0, "base", "it", [(0.0, 1.0, "primo")])
+        cache.put(second, 10.0, "base", "it", [(0.0, 1.0, "secondo")])
+        # Rileggere il primo lo rende il più recente: viene eliminato il secondo
+        assert cache.get(first, 10.0, "base", "it") == [(0.0, 1.0, "primo")]
+        cache.put(third, 10.0, "base", "it", [(0.0, 1.0, "terzo")])
+
+        assert cache.stats()["entries"] == 2
+        assert cache.get(second, 10.0, "base", "it") is None
+        assert cache.get(first, 10.0, "base", "it") is not None
+        assert cache.get(third, 10.0, "base", "it") is not None
+        cache.close()
+
+    def test_invalid_max_entries(self, tmp_path):
+        """max_entries deve essere positivo"""
+        with pytest.raises(ValueError):
+            TranscriptCache(str(tmp_path / "x.db"), max_entries=0)
+
+
+class CountingPool:
+    """Pool Whisper finto che conta le trascrizioni"""
+
+    size = 1
+
+    def __init__(self):
+        self.calls = 0
+
+    @contextmanager
+    def model(self, timeout=None):
+        yield self
+
+    def transcribe(self, audio, language=None):
+        self.calls += 1
+        return {"text": "ciao a tutti", "segments": [{"start": 0.0, "end": 1.5, "text": " ciao a tutti"}]}
+
+
+class TestAudioAgentCache:
+    """Test dell'uso della cache in AudioAgent"""
+
+    @pytest.fixture
+    def pool(self, cache, monkeypatch):
+        pool = CountingPool()
+        monkeypatch.setattr(audio_module, "get_whisper_pool", lambda *args, **kwargs: pool)
+        monkeypatch.setattr(audio_module, "get_transcript_cache", lambda *args, **kwargs: cache)
+        return pool
+
+    def test_hit_bypasses_whisper_pool(self, pool, monkeypatch):
+        """Un repost dello stesso audio non passa dal pool Whisper"""
+        monkeypatch.setattr(audio_module, "load_audio", lambda path: voice())
+        first = AudioAgent.transcribe_segments("video.mp4", vad=False)
+        monkeypatch.setattr(audio_module, "load_audio", lambda path: with_noise(voice()))
+        second = AudioAgent.transcribe_segments("repost.mp4", vad=False)
+
+        assert first == second == [(0.0, 1.5, "ciao a tutti")]
+        assert pool.calls == 1
+
+    def test_cache_disabled(self, pool, monkeypatch):
+        """Con cache=False si trascrive sempre"""
+        monkeypatch.setattr(audio_module, "load_audio", lambda path: voice())
+        AudioAgent.transcribe_segments("video.mp4", vad=False, cache=False)
+        AudioAgent.transcribe_segments("video.mp4", vad=False, cache=False)
+
+        assert pool.calls == 2
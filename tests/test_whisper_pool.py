@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Test per WhisperModelPool - pool di modelli Whisper condivisi tra i thread
+"""
+
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+# Aggiungi il path del progetto
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import agent.whisper_pool as whisper_pool
+from agent.whisper_pool import WhisperModelPool, get_whisper_pool, whisper_stats
+
+
+class StubParameter:
+    def numel(self):
+        return 1000
+
+    def element_size(self):
+        return 4
+
+
+class StubModel:
+    """Modello finto: registra le trascrizioni e rileva l'uso concorrente"""
+
+    def __init__(self, name, device):
+        self.name = name
+        self.device = device
+        self.audio = []
+        self.busy = False
+        self.overlapped = False
+
+    def parameters(self):
+        return [StubParameter(), StubParameter()]
+
+    def transcribe(self, audio, **kwargs):
+        if self.busy:
+            self.overlapped = True
+        self.busy = True
+        time.sleep(0.01)
+        self.audio.append((len(audio), kwargs))
+        self.busy = False
+        return {"text": "", "segments": []}
+
+
+@pytest.fixture
+def stub_whisper(monkeypatch):
+    """Modulo whisper finto che conta i modelli caricati"""
+    loaded = []
+
+    def load_model(name, device=None):
+        model = StubModel(name, device)
+        loaded.append(model)
+        return model
+
+    monkeypatch.setitem(sys.modules, "whisper", SimpleNamespace(load_model=load_model))
+    monkeypatch.setattr(whisper_pool, "_pools", {})
+    return loaded
+
+
+class TestWhisperModelPool:
+    """Test del pool di modelli Whisper"""
+
+    def test_invalid_size(self):
+        """size deve essere almeno 1"""
+        with pytest.raises(ValueError):
+            WhisperModelPool(size=0)
+
+    def test_lazy_loading(self, stub_whisper):
+        """I modelli si caricano alla prima richiesta e si riusano"""
+        pool = WhisperModelPool("tiny", size=2, device="cpu")
+        assert stub_whisper == []
+
+        with pool.model() as first:
+            pass
+        with pool.model() as second:
+            pass
+
+        assert first is second
+        assert len(stub_whisper) == 1
+        assert first.name == "tiny" and first.device == "cpu"
+
+    def test_contention_never_shares_a_model(self, stub_whisper):
+        """Con più thread che modelli, ognuno attende un modello libero e nessuno ne usa uno occupato"""
+        pool = WhisperModelPool(size=2)
+        errors = []
+
+        def worker():
+            try:
+                for _ in range(5):
+                    with pool.model(timeout=5) as model:
+                        model.transcribe(np.zeros(10, dtype=np.float32))
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=worker) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert len(stub_whisper) == 2
+        assert not any(model.overlapped for model in stub_whisper)
+        stats = pool.stats()
+        assert stats["transcriptions"] == 30
+        assert stats["loaded"] == 2 and stats["idle"] == 2 and stats["in_use"] == 0
+
+    def test_acquire_timeout(self, stub_whisper):
+        """A pool pieno e occupato acquire scade dopo il timeout"""
+        pool = WhisperModelPool(size=1)
+        model = pool.acquire()
+        with pytest.raises(queue.Empty):
+            pool.acquire(timeout=0.05)
+        pool.release(model)
+        assert pool.acquire(timeout=0.05) is model
+
+    def test_failed_load_frees_slot(self, monkeypatch):
+        """Un caricamento fallito non occupa un posto nel pool"""
+        def load_model(name, device=None):
+            raise RuntimeError("download fallito")
+
+        monkeypatch.setitem(sys.modules, "whisper", SimpleNamespace(load_model=load_model))
+        pool = WhisperModelPool(size=1)
+        with pytest.raises(RuntimeError):
+            pool.acquire()
+        assert pool.stats()["loaded"] == 0
+
+    def test_warm_up_and_stats(self, stub_whisper):
+        """warm_up carica tutti i modelli e li fa girare su un secondo di silenzio"""
+        pool = WhisperModelPool("base", size=3)
+
+        stats = pool.warm_up()
+
+        assert len(stub_whisper) == 3
+        assert all(model.audio == [(16000, {"fp16": False})] for model in stub_whisper)
+        assert stats["model"] == "base"
+        assert stats["size"] == 3
+        assert stats["loaded"] == 3 and stats["idle"] == 3 and stats["in_use"] == 0
+        assert stats["memory_bytes"] == 3 * 2 * 1000 * 4
+        assert stats["transcriptions"] == 0
+        assert stats["load_seconds"] >= 0
+
+    def test_warm_up_capped_at_size(self, stub_whisper):
+        """warm_up non carica più modelli della dimensione del pool"""
+        pool = WhisperModelPool(size=2)
+        pool.warm_up(5)
+        assert len(stub_whisper) == 2
+        assert pool.warm_up(1)["loaded"] == 2
+
+
+class TestSharedPools:
+    """Test dei pool condivisi nel processo"""
+
+    def test_size_from_environment(self, stub_whisper, monkeypatch):
+        """Senza size esplicita si usa TOKINTEL_WHISPER_POOL_SIZE"""
+        monkeypatch.setenv("TOKINTEL_WHISPER_POOL_SIZE", "3")
+        assert get_whisper_pool("base").size == 3
+
+    def test_default_size(self, stub_whisper, monkeypatch):
+        """Senza variabile d'ambiente il pool ha un solo modello"""
+        monkeypatch.delenv("TOKINTEL_WHISPER_POOL_SIZE", raising=False)
+        assert get_whisper_pool("base").size == 1
+
+    def test_explicit_size_wins(self, stub_whisper, monkeypatch):
+        """Una size esplicita prevale sulla variabile d'ambiente"""
+        monkeypatch.setenv("TOKINTEL_WHISPER_POOL_SIZE", "3")
+        assert get_whisper_pool("base", size=2).size == 2
+
+    def test_one_pool_per_model(self, stub_whisper):
+        """Lo stesso modello condivide il pool, modelli diversi no; whisper_stats li elenca tutti"""
+        base = get_whisper_pool("base", size=1)
+        assert get_whisper_pool("base", size=4) is base
+        small = get_whisper_pool("small", size=1)
+        assert small is not base
+
+        assert [stats["model"] for stats in whisper_stats()] == ["base", "small"]